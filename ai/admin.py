@@ -1,11 +1,44 @@
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import KnowledgeBaseEntry
+from .search_index import DUPLICATE_THRESHOLD, duplicate_clusters
 
 @admin.register(KnowledgeBaseEntry)
 class KnowledgeBaseEntryAdmin(admin.ModelAdmin):
-    list_display = ('question', 'answer', 'source', 'created_at')
+    list_display = ('question', 'answer', 'source', 'chunk_index', 'created_at')
     search_fields = ('question', 'answer')
     list_filter = ('created_at',)
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
-    list_per_page = 20
\ No newline at end of file
+    list_per_page = 20
+    raw_id_fields = ('parent',)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'duplicates/',
+                self.admin_site.admin_view(self.duplicates_view),
+                name='ai_knowledgebaseentry_duplicates',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def duplicates_view(self, request):
+        """Near-duplicate clusters of top-level entries, found with MinHash LSH."""
+        try:
+            threshold = min(max(float(request.GET.get('threshold', DUPLICATE_THRESHOLD)), 0.1), 1.0)
+        except ValueError:
+            threshold = DUPLICATE_THRESHOLD
+        groups = duplicate_clusters(threshold)
+        entries = KnowledgeBaseEntry.objects.only('question', 'source', 'created_at').in_bulk(
+            [pk for group in groups for pk in group]
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Duplicate knowledge base entries',
+            'threshold': threshold,
+            'clusters': [[entries[pk] for pk in group if pk in entries] for group in groups],
+        }
+        return TemplateResponse(request, 'admin/ai/knowledgebaseentry/duplicates.html', context)
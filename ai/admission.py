@@ -0,0 +1,246 @@
+"""
+Admission control for the university assistant.
+
+Two layers keep tail latency bounded under load:
+
+- ``AssistantRateThrottle`` is a DRF throttle with one token bucket per
+  client (user, else session, else IP). Clients that run dry get a 429
+  with ``Retry-After`` before any work is done.
+- ``AdmissionController`` caps how many LLM pipeline runs are in flight.
+  Further requests wait in a bounded priority queue; when the queue is
+  full, or a request waits too long, it is turned away with ``Overloaded``.
+  A run takes its slot at the first call the LLM response cache can't
+  answer (see ``AdmittedModel``), so FAQ hits, coalesced followers and
+  cache hits never queue behind real LLM work.
+
+Both are per worker process.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+# Lower runs first. Follow-ups in an ongoing conversation jump ahead of
+# new conversations.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# The pipeline run admitted on this thread, if any; see ``admission``.
+current_run = ContextVar('assistant_admission', default=None)
+
+
+def admission_settings():
+    return getattr(settings, 'ASSISTANT_ADMISSION', {})
+
+
+def parse_rate(rate):
+    """``'30/min'`` -> tokens per second."""
+    try:
+        count, period = rate.split('/')
+        return int(count) / PERIODS[period[0]]
+    except (ValueError, KeyError):
+        raise ImproperlyConfigured(f'Invalid assistant rate {rate!r}; use e.g. "30/min"')
+
+
+class Overloaded(Exception):
+    """No capacity for another LLM pipeline run; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Assistant overloaded, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class AssistantRateThrottle(BaseThrottle):
+    """
+    Token bucket per client: ``BURST`` requests at once, refilled at
+    ``RATE``. Buckets live in process memory, bounded to ``MAX_CLIENTS``.
+    """
+    lock = threading.Lock()
+    buckets = OrderedDict()
+
+    def __init__(self):
+        config = admission_settings()
+        self.rate = parse_rate(config.get('RATE', '30/min'))
+        self.burst = config.get('BURST', 10)
+        self.max_clients = config.get('MAX_CLIENTS', 100000)
+        self.wait_seconds = None
+
+    def get_client_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+        if session_key:
+            return f'session:{session_key}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        key = self.get_client_key(request)
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            while len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        self.wait_seconds = None if allowed else (1 - tokens) / self.rate
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AdmissionController:
+    """
+    At most ``max_in_flight`` concurrent holders of ``slot()``; up to
+    ``max_queue`` more wait, highest priority first, for ``queue_timeout``
+    seconds.
+    """
+
+    def __init__(self, max_in_flight=8, max_queue=32, queue_timeout=10.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = []
+        self.sequence = itertools.count()
+        # Moving average of run time, for Retry-After estimates.
+        self.average_seconds = 1.0
+        self.counters = Counter()
+
+    def retry_after(self):
+        backlog = len(self.waiting) + self.in_flight
+        return max(1, math.ceil(self.average_seconds * backlog / self.max_in_flight))
+
+    def acquire(self, priority):
+        with self.condition:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                return
+            if len(self.waiting) >= self.max_queue:
+                self.counters['rejected'] += 1
+                raise Overloaded(self.retry_after())
+
+            ticket = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            while self.waiting[0] != ticket or self.in_flight >= self.max_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiting.remove(ticket)
+                    heapq.heapify(self.waiting)
+                    self.condition.notify_all()
+                    self.counters['timed_out'] += 1
+                    raise Overloaded(self.retry_after())
+                self.condition.wait(remaining)
+            heapq.heappop(self.waiting)
+            self.in_flight += 1
+            self.counters['admitted'] += 1
+            self.counters['queued'] += 1
+            # The next waiter may fit too.
+            self.condition.notify_all()
+
+    def release(self, elapsed):
+        with self.condition:
+            self.in_flight -= 1
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * elapsed
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_NORMAL):
+        self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'in_flight': self.in_flight,
+                'waiting': len(self.waiting),
+                'average_seconds': round(self.average_seconds, 3),
+                **self.counters,
+            }
+
+
+class PipelineRun:
+    """One pipeline run's claim on a slot, taken on first use and held until the run ends."""
+
+    def __init__(self, controller, priority=PRIORITY_NORMAL):
+        self.controller = controller
+        self.priority = priority
+        self.started = None
+
+    def claim(self):
+        if self.started is None:
+            self.controller.acquire(self.priority)
+            self.started = time.monotonic()
+
+    def finish(self):
+        if self.started is not None:
+            self.controller.release(time.monotonic() - self.started)
+            self.started = None
+
+
+@contextmanager
+def admission(priority=PRIORITY_NORMAL, controller=None):
+    """
+    Admit a pipeline run. No slot is taken until an ``AdmittedModel`` makes
+    a real call; then ``Overloaded`` is raised if none comes free.
+    """
+    run = PipelineRun(controller or get_admission_controller(), priority)
+    token = current_run.set(run)
+    try:
+        yield run
+    finally:
+        current_run.reset(token)
+        run.finish()
+
+
+class AdmittedModel:
+    """
+    Wrap an LLM provider so each call first claims the current run's slot.
+    Put it inside ``CachedModel``, so cache hits never reach it.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def model_name(self):
+        return getattr(self.model, 'model_name', type(self.model).__name__)
+
+    def generate_content(self, *args, **kwargs):
+        run = current_run.get()
+        if run is not None:
+            run.claim()
+        return self.model.generate_content(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller():
+    """The controller configured by ``settings.ASSISTANT_ADMISSION``."""
+    config = admission_settings()
+    return AdmissionController(
+        max_in_flight=config.get('MAX_IN_FLIGHT', 8),
+        max_queue=config.get('MAX_QUEUE', 32),
+        queue_timeout=config.get('QUEUE_TIMEOUT', 10.0),
+    )
@@ -0,0 +1,319 @@
+"""
+Conversation state for the university assistant.
+
+Each conversation id maps to a small binary record: the last few turns in a
+ring buffer plus the entities gathered so far. Backends only store opaque
+bytes and offer compare-and-set, so ``ConversationStore.update`` is a
+single read-modify-write that retries instead of losing a turn when two
+tabs post at once.
+"""
+import json
+import re
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+
+from .models import Conversation as ConversationRecord
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+HISTORY_SIZE = 3
+CONVERSATION_TTL = 60 * 60
+CAS_RETRIES = 5
+# DatabaseBackend purges expired rows on every PURGE_EVERY-th new conversation.
+PURGE_EVERY = 100
+# Texts are kept for prompt context only; longer ones are cut.
+MAX_TEXT_BYTES = 2000
+MAX_USER_DATA_BYTES = 4000
+
+CONVERSATION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('!BB')      # format version, number of turns
+TURN = struct.Struct('!IHHH')      # unix time, query/response/intent byte lengths
+LENGTH = struct.Struct('!H')
+
+
+class ConversationConflict(Exception):
+    """Raised when a conversation keeps changing underneath an update."""
+
+
+@dataclass
+class Turn:
+    timestamp: int
+    query: str
+    response: str
+    intent: str = ''
+
+
+@dataclass
+class Conversation:
+    turns: deque = field(default_factory=lambda: deque(maxlen=HISTORY_SIZE))
+    user_data: dict = field(default_factory=dict)
+
+    def add_turn(self, query, response, intent=''):
+        self.turns.append(Turn(int(time.time()), query, response, intent or ''))
+
+    def remember(self, entities):
+        """Keep new, non-empty entity values for later turns."""
+        if not isinstance(entities, dict):
+            return
+        for key, value in entities.items():
+            if value and value not in self.user_data.values():
+                self.user_data[key] = value
+
+
+def _truncate(text, limit=MAX_TEXT_BYTES):
+    data = text.encode('utf-8')
+    if len(data) <= limit:
+        return data
+    return data[:limit].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def encode(conversation):
+    """Pack a conversation into bytes; see ``HEADER`` and ``TURN`` for the layout."""
+    turns = list(conversation.turns)
+    parts = [HEADER.pack(FORMAT_VERSION, len(turns))]
+    for turn in turns:
+        query, response, intent = (
+            _truncate(turn.query), _truncate(turn.response), _truncate(turn.intent, 255)
+        )
+        parts.append(TURN.pack(turn.timestamp, len(query), len(response), len(intent)))
+        parts.extend((query, response, intent))
+    user_data = json.dumps(conversation.user_data, separators=(',', ':'), default=str).encode('utf-8')
+    if len(user_data) > MAX_USER_DATA_BYTES:
+        user_data = b'{}'
+    parts.append(LENGTH.pack(len(user_data)))
+    parts.append(user_data)
+    return b''.join(parts)
+
+
+def decode(data, history_size=HISTORY_SIZE):
+    """Inverse of ``encode``; unreadable records decode as an empty conversation."""
+    conversation = Conversation(turns=deque(maxlen=history_size))
+    if not data:
+        return conversation
+    try:
+        version, count = HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION:
+            return conversation
+        offset = HEADER.size
+        for _ in range(count):
+            timestamp, query_len, response_len, intent_len = TURN.unpack_from(data, offset)
+            offset += TURN.size
+            texts = []
+            for length in (query_len, response_len, intent_len):
+                texts.append(bytes(data[offset:offset + length]).decode('utf-8'))
+                offset += length
+            conversation.turns.append(Turn(timestamp, *texts))
+        (user_data_len,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        conversation.user_data = json.loads(bytes(data[offset:offset + user_data_len]))
+    except (struct.error, UnicodeDecodeError, ValueError):
+        return Conversation(turns=deque(maxlen=history_size))
+    return conversation
+
+
+class LocalMemoryBackend:
+    """
+    Per-process store. Fast, but each worker sees its own conversations;
+    use it for development and single-process deployments.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None
+            revision, expires, data = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None, None
+            self.entries.move_to_end(key)
+            return data, revision
+
+    def compare_and_set(self, key, token, data, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+            current = entry[0] if entry and entry[1] >= time.monotonic() else None
+            if current != token:
+                return False
+            self.entries[key] = ((token or 0) + 1, time.monotonic() + ttl, data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return True
+
+
+class RedisBackend:
+    """
+    Store for any server speaking the Redis protocol. Compare-and-set uses
+    ``WATCH``/``MULTI``, so a concurrent write aborts the transaction.
+    """
+    key_prefix = 'assistant:conversation:'
+
+    def __init__(self, url='redis://localhost:6379/0', client=None):
+        if client is None:
+            if redis is None:
+                raise ImproperlyConfigured('RedisBackend requires the "redis" package')
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key):
+        data = self.client.get(self.key_prefix + key)
+        return data, data
+
+    def compare_and_set(self, key, token, data, ttl):
+        key = self.key_prefix + key
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != token:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(key, data, ex=ttl)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+
+class DatabaseBackend:
+    """
+    Store in the ``ai_conversation`` table. Shared by every worker with no
+    extra infrastructure; compare-and-set is a conditional ``UPDATE`` on
+    the row's revision. Expired rows are purged now and then, not on every
+    new conversation.
+    """
+
+    def __init__(self, purge_every=PURGE_EVERY):
+        self.purge_every = purge_every
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def get(self, key):
+        row = ConversationRecord.objects.filter(key=key, expires_at__gt=timezone.now()).values_list(
+            'data', 'revision'
+        ).first()
+        if row is None:
+            return None, None
+        return bytes(row[0]), row[1]
+
+    def compare_and_set(self, key, token, data, ttl):
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        if token is not None:
+            updated = ConversationRecord.objects.filter(key=key, revision=token).update(
+                data=data, revision=token + 1, expires_at=expires_at
+            )
+            return updated == 1
+        # New conversation, or one that expired: take over the key if nobody
+        # else has meanwhile.
+        now = timezone.now()
+        ConversationRecord.objects.filter(key=key, expires_at__lte=now).delete()
+        with self.lock:
+            self.created += 1
+            purge = self.created % self.purge_every == 0
+        if purge:
+            self.purge_expired(now)
+        try:
+            with transaction.atomic():
+                ConversationRecord.objects.create(
+                    key=key, data=data, revision=1, expires_at=expires_at
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def purge_expired(self, now=None):
+        return ConversationRecord.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
+
+
+class ConversationStore:
+    """Load and update conversations through a compare-and-set backend."""
+
+    def __init__(self, backend, history_size=HISTORY_SIZE, ttl=CONVERSATION_TTL, retries=CAS_RETRIES):
+        self.backend = backend
+        self.history_size = history_size
+        self.ttl = ttl
+        self.retries = retries
+
+    def load(self, conversation_id):
+        data, _token = self.backend.get(conversation_id)
+        return decode(data, self.history_size)
+
+    def update(self, conversation_id, mutate):
+        """
+        Apply ``mutate(conversation)`` and save, retrying on concurrent
+        writes. Returns the saved conversation.
+        """
+        for _ in range(self.retries):
+            data, token = self.backend.get(conversation_id)
+            conversation = decode(data, self.history_size)
+            mutate(conversation)
+            if self.backend.compare_and_set(conversation_id, token, encode(conversation), self.ttl):
+                return conversation
+        raise ConversationConflict(f'Conversation {conversation_id} kept changing during update')
+
+
+def new_conversation_id():
+    return uuid.uuid4().hex
+
+
+def session_conversation_id(session_key):
+    """
+    An opaque conversation id for a session. The id is sent back to the
+    client and stored as a row key, so it must not be the session key.
+    """
+    return salted_hmac('ai.conversation', session_key).hexdigest()
+
+
+def requested_conversation_id(request):
+    """
+    The conversation a request continues: an explicit ``conversation_id``
+    (body or ``X-Conversation-ID`` header), then one derived from the
+    session. ``None`` for a requester with neither.
+    """
+    candidates = (
+        request.data.get('conversation_id') if hasattr(request.data, 'get') else None,
+        request.headers.get('X-Conversation-ID'),
+    )
+    for candidate in candidates:
+        if isinstance(candidate, str) and CONVERSATION_ID_RE.match(candidate):
+            return candidate
+    session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+    if session_key:
+        return session_conversation_id(session_key)
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_conversation_store():
+    """The store configured by ``settings.ASSISTANT_CONVERSATIONS``."""
+    config = getattr(settings, 'ASSISTANT_CONVERSATIONS', {})
+    backend_class = import_string(config.get('BACKEND', 'ai.conversation.LocalMemoryBackend'))
+    return ConversationStore(
+        backend_class(**config.get('OPTIONS', {})),
+        history_size=config.get('HISTORY_SIZE', HISTORY_SIZE),
+        ttl=config.get('TTL', CONVERSATION_TTL),
+    )
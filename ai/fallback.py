@@ -0,0 +1,119 @@
+"""
+Degraded-mode pieces of the assistant pipeline.
+
+When an LLM stage runs out of its latency budget, fails, or the provider's
+circuit breaker is open, the pipeline carries on with these local
+stand-ins: a keyword intent classifier with a little entity extraction,
+and templated answers built straight from the data the pipeline fetched.
+"""
+import re
+import time
+
+from university.models import Department
+
+# Keywords are regular expressions matched as whole words, so "class" does
+# not claim "classroom"; the first intent with a match wins.
+INTENT_KEYWORDS = (
+    ('faculty_info', (
+        r'professors?', 'faculty', r'instructors?', r'teachers?', r'dr\.', 'works on', 'researches',
+        r'experts? in', 'specializes in',
+    )),
+    ('course_info', (r'courses?', r'class(?:es)?', r'prerequisites?', r'credits?')),
+    ('program_info', (r'programs?', r'majors?', r'degrees?', r'minors?')),
+    ('enrollment_info', (r'enroll\w*', r'register\w*', 'registration')),
+    ('department_info', (r'departments?', 'dept')),
+    ('room_info', (r'rooms?', r'classrooms?', r'labs?')),
+    ('building_info', (r'buildings?', r'halls?', 'where is')),
+    ('announcement', (r'announcements?', 'news', r'events?')),
+    ('student_info', (r'students?',)),
+)
+INTENT_PATTERNS = tuple(
+    (name, re.compile(r'\b(?:' + '|'.join(words) + r')(?!\w)')) for name, words in INTENT_KEYWORDS
+)
+COURSE_CODE_RE = re.compile(r'\b([A-Za-z]{2,4})\s*-?\s*(\d{3,4})\b')
+WORD_RE = re.compile(r'\w+')
+RESEARCH_RE = re.compile(
+    r'\b(?:works? on|research(?:es|ing)?|experts? (?:in|on)|speciali[sz]e?s? in)\s+(?P<topic>[\w\s-]+)', re.I
+)
+MAX_LISTED = 5
+
+
+class Deadline:
+    """
+    A request-wide time limit. ``budget(seconds)`` is the time a stage
+    may take: its own budget, cut short by whatever is left overall.
+    """
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def budget(self, seconds):
+        return min(seconds, self.remaining())
+
+
+def keyword_intent(text):
+    """The first intent with a keyword in ``text``, or ``'other'``."""
+    lowered = text.lower()
+    return next((name for name, pattern in INTENT_PATTERNS if pattern.search(lowered)), 'other')
+
+
+def classify_intent(query):
+    """Keyword-based stand-in for the LLM intent call, in the same shape."""
+    return {'intent': keyword_intent(query), 'entities': extract_entities(query), 'requires_followup': False}
+
+
+def extract_entities(query):
+    entities = {}
+    match = COURSE_CODE_RE.search(query)
+    if match:
+        entities['course_code'] = f'{match.group(1).upper()}{match.group(2)}'
+    match = RESEARCH_RE.search(query)
+    if match:
+        entities['research'] = match.group('topic').strip()
+    lowered = query.lower()
+    words = set(WORD_RE.findall(lowered))
+    for name, code in Department.objects.values_list('name', 'code'):
+        if name.lower() in lowered or code.lower() in words:
+            entities['department'] = name
+            break
+    return entities
+
+
+def describe(item):
+    """One line for a fetched record, from whichever naming fields it has."""
+    for key in ('name', 'title', 'question', 'course', 'building'):
+        if item.get(key):
+            label = str(item[key])
+            break
+    else:
+        label = ', '.join(f'{key}: {value}' for key, value in list(item.items())[:3])
+    detail = item.get('code') or item.get('department') or item.get('email')
+    return f'{label} ({detail})' if detail and detail not in label else label
+
+
+def templated_answer(response_template, result_data):
+    """A plain-text answer built from the pipeline's data without the LLM."""
+    if isinstance(result_data, list) and result_data:
+        first = result_data[0]
+        if first.get('type') == 'knowledge_base':
+            source = first.get('source')
+            return f"{first['answer']}" + (f"\n\nSource: {source}" if source else '')
+        lines = [f'- {describe(item)}' for item in result_data[:MAX_LISTED]]
+        more = len(result_data) - MAX_LISTED
+        if more > 0:
+            lines.append(f'- and {more} more')
+        return '\n'.join([response_template, *lines])
+    if isinstance(result_data, dict):
+        if 'message' in result_data:
+            parts = [result_data['message'], result_data.get('suggestion', '')]
+            if result_data.get('did_you_mean'):
+                parts.append('Did you mean: ' + '; '.join(result_data['did_you_mean']) + '?')
+            return ' '.join(part for part in parts if part)
+        facts = '\n'.join(
+            f"- {key.replace('_', ' ').capitalize()}: {value}" for key, value in result_data.items()
+        )
+        return f'{response_template}\n{facts}'
+    return "As far as I have information, I couldn't find anything specific. Please visit troy.edu for more."
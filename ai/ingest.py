@@ -0,0 +1,224 @@
+"""
+Ingest stage that cleans scraped knowledge base rows before import.
+
+The pipeline makes two streaming passes over the input:
+
+1. ``learn`` counts, per document, which word shingles and pipe-separated
+   question segments appear. Anything present in a large share of pages
+   is navigation chrome rather than content.
+2. ``process`` strips that boilerplate, drops near-duplicate pages with
+   MinHash/LSH and splits long answers into retrieval-sized chunks.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .minhash import LSHIndex, MinHasher, char_shingles, jaccard
+from .models import content_hash
+
+BOILERPLATE_SHINGLE_SIZE = 4
+# A shingle is boilerplate once it appears in this share of documents
+# (and in at least BOILERPLATE_MIN_DOCS of them).
+BOILERPLATE_DOC_RATIO = 0.1
+BOILERPLATE_MIN_DOCS = 5
+CHUNK_CHARS = 800
+DEDUP_THRESHOLD = 0.8
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+@dataclass
+class IngestedEntry:
+    question: str
+    answer: str
+    source: str = None
+    chunks: list = field(default_factory=list)
+
+
+class BoilerplateFilter:
+    """Learn shingles that recur across many documents and cut them out."""
+
+    def __init__(self, size=BOILERPLATE_SHINGLE_SIZE, doc_ratio=BOILERPLATE_DOC_RATIO,
+                 min_docs=BOILERPLATE_MIN_DOCS):
+        self.size = size
+        self.doc_ratio = doc_ratio
+        self.min_docs = min_docs
+        self.shingle_counts = Counter()
+        self.segment_counts = Counter()
+        self.documents = 0
+        self.frequent_shingles = frozenset()
+        self.frequent_segments = frozenset()
+
+    def observe(self, question, answer):
+        self.documents += 1
+        tokens = answer.split()
+        self.shingle_counts.update({
+            hash(tuple(tokens[i:i + self.size])) for i in range(len(tokens) - self.size + 1)
+        })
+        segments = [segment.strip() for segment in question.split('|')]
+        if len(segments) > 1:
+            self.segment_counts.update(set(segments))
+
+    def finish(self):
+        cutoff = max(self.min_docs, self.doc_ratio * self.documents)
+        self.frequent_shingles = frozenset(
+            shingle for shingle, count in self.shingle_counts.items() if count >= cutoff
+        )
+        # Menu labels repeat across a handful of pages, not a fixed share.
+        self.frequent_segments = frozenset(
+            segment for segment, count in self.segment_counts.items() if count > 1
+        )
+        self.shingle_counts.clear()
+        self.segment_counts.clear()
+
+    def clean_answer(self, answer):
+        tokens = answer.split()
+        size = self.size
+        keep = [True] * len(tokens)
+        for i in range(len(tokens) - size + 1):
+            if hash(tuple(tokens[i:i + size])) in self.frequent_shingles:
+                keep[i:i + size] = [False] * size
+        return ' '.join(token for token, kept in zip(tokens, keep) if kept)
+
+    def clean_question(self, question):
+        segments = [segment.strip() for segment in question.split('|')]
+        if len(segments) == 1:
+            return ' '.join(question.split())
+        content = [s for s in segments if s and s not in self.frequent_segments]
+        # A title made only of menu labels keeps its first label.
+        return ' | '.join(content) if content else next((s for s in segments if s), '')
+
+
+def chunk_text(text, max_chars=CHUNK_CHARS):
+    """
+    Split ``text`` into pieces of at most ``max_chars``, on sentence
+    boundaries where possible. Short text comes back as one piece.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    current = ''
+    for sentence in SENTENCE_RE.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class IngestPipeline:
+    """
+    Clean, deduplicate and chunk ``(question, answer, source)`` rows.
+
+    Call ``learn`` with one pass over the rows, then ``process`` with a
+    second, fresh pass; the boilerplate filter needs to see the whole corpus
+    before it can clean any of it. ``seed`` with already-imported entries
+    first to also drop rows that nearly duplicate the database.
+
+    Rows are near-duplicates when both their full text and their questions
+    are similar: many FAQ entries share a templated answer but ask about
+    different things. A seeded entry with the same source and question as
+    an incoming row, raw or cleaned, is an older version of it; it is
+    listed in ``superseded`` instead of causing the row to be dropped,
+    however much cleaning changed the text.
+    """
+
+    def __init__(self, chunk_chars=CHUNK_CHARS, dedup_threshold=DEDUP_THRESHOLD,
+                 boilerplate=None):
+        self.chunk_chars = chunk_chars
+        self.dedup_threshold = dedup_threshold
+        self.boilerplate = boilerplate or BoilerplateFilter()
+        self.hasher = MinHasher()
+        self.index = LSHIndex()
+        self.questions = {}
+        self.seeded = {}
+        self.seeded_by_question = {}
+        self.kept = set()
+        self.superseded = set()
+        self.stats = Counter()
+
+    def seed(self, entries):
+        """Index existing ``(content_hash, question, answer, source)`` rows."""
+        for digest, question, answer, source in entries:
+            self.seeded_by_question.setdefault((source, question), []).append(digest)
+            signature = self.hasher.text_signature(f'{question} {answer}')
+            if signature is not None:
+                self.index.insert(digest, signature)
+                self.questions[digest] = char_shingles(question)
+                self.seeded[digest] = (question, source)
+
+    def learn(self, rows):
+        for question, answer, _source in rows:
+            self.boilerplate.observe(question, answer)
+        self.boilerplate.finish()
+
+    def process(self, rows):
+        for raw_question, answer, source in rows:
+            self.stats['rows'] += 1
+            self.stats['chars_in'] += len(answer)
+            question = self.boilerplate.clean_question(raw_question)
+            answer = self.boilerplate.clean_answer(answer)
+            if not question or not answer:
+                self.stats['empty'] += 1
+                continue
+
+            digest = content_hash(question, answer)
+            for key in {(source, raw_question), (source, question)}:
+                self.supersede(self.seeded_by_question.get(key, ()), digest)
+
+            if self.is_near_duplicate(question, answer, source, {raw_question, question}):
+                self.stats['near_duplicates'] += 1
+                continue
+
+            self.kept.add(digest)
+            self.superseded.discard(digest)
+
+            chunks = chunk_text(answer, self.chunk_chars)
+            self.stats['chars_out'] += len(answer)
+            self.stats['chunks'] += len(chunks) if len(chunks) > 1 else 0
+            yield IngestedEntry(
+                question=question, answer=answer, source=source,
+                chunks=chunks if len(chunks) > 1 else []
+            )
+
+    def supersede(self, digests, current):
+        """Mark seeded ``digests`` as replaced, unless this import keeps them."""
+        self.superseded.update(
+            digest for digest in digests if digest != current and digest not in self.kept
+        )
+
+    def is_near_duplicate(self, question, answer, source, questions):
+        """
+        Check against earlier and seeded rows, and remember this one if it
+        is new.
+        """
+        digest = content_hash(question, answer)
+        if digest in self.index:
+            # Exact copies are left to the upsert.
+            return False
+        signature = self.hasher.text_signature(f'{question} {answer}')
+        if signature is None:
+            return False
+        shingled = char_shingles(question)
+        for key, _score in self.index.query(signature, threshold=self.dedup_threshold):
+            if jaccard(shingled, self.questions[key]) < self.dedup_threshold:
+                continue
+            stored_question, stored_source = self.seeded.get(key, (None, None))
+            if stored_source == source and stored_question in questions:
+                self.supersede([key], digest)
+                continue
+            return True
+        self.index.insert(digest, signature)
+        self.questions[digest] = shingled
+        return False
@@ -0,0 +1,322 @@
+"""
+Per-stage instrumentation for the university assistant.
+
+A request runs inside ``traced_request``, which sets the current ``Trace``
+and counts SQL queries. Pipeline steps are timed with ``Stage``, used as a
+context manager or with explicit ``start()``/``stop()`` around long
+branches; stages nest, and a query counts towards every open stage. LLM
+providers report prompt and response sizes with ``record_llm_call``.
+
+When the request ends the trace is logged as one JSON line on the
+``ai.assistant`` logger and folded into the Prometheus-style metrics
+rendered by ``render_metrics``. Metrics are per worker process.
+"""
+import bisect
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+logger = logging.getLogger('ai.assistant')
+
+TRACE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+current_trace = ContextVar('assistant_trace', default=None)
+
+
+@dataclass
+class StageRecord:
+    name: str
+    seconds: float = 0.0
+    queries: int = 0
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    started: float = field(default_factory=time.perf_counter)
+    intent: str = 'unknown'
+    outcome: str = 'ok'
+    stages: list = field(default_factory=list)
+    llm_calls: list = field(default_factory=list)
+    open_stages: list = field(default_factory=list)
+
+    def as_dict(self, total):
+        return {
+            'trace_id': self.trace_id,
+            'intent': self.intent,
+            'outcome': self.outcome,
+            'total_ms': round(total * 1000, 1),
+            'stages': [
+                {'stage': s.name, 'ms': round(s.seconds * 1000, 1), 'queries': s.queries}
+                for s in self.stages
+            ],
+            'llm_calls': self.llm_calls,
+        }
+
+
+class Stage:
+    def __init__(self, name):
+        self.record = StageRecord(name)
+        self.trace = None
+        self.started = None
+
+    def start(self):
+        self.trace = current_trace.get()
+        self.started = time.perf_counter()
+        if self.trace is not None:
+            self.trace.open_stages.append(self.record)
+        return self
+
+    def stop(self):
+        self.record.seconds = time.perf_counter() - self.started
+        if self.trace is not None:
+            if self.record in self.trace.open_stages:
+                self.trace.open_stages.remove(self.record)
+            self.trace.stages.append(self.record)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def record_llm_call(model, prompt, text, prompt_tokens, response_tokens, seconds):
+    trace = current_trace.get()
+    stage = trace.open_stages[-1].name if trace is not None and trace.open_stages else 'none'
+    call = {
+        'stage': stage,
+        'model': model,
+        'prompt_chars': len(prompt),
+        'response_chars': len(text),
+        'prompt_tokens': prompt_tokens,
+        'response_tokens': response_tokens,
+        'ms': round(seconds * 1000, 1),
+    }
+    if trace is not None:
+        trace.llm_calls.append(call)
+    for direction in ('prompt', 'response'):
+        LLM_CHARS.inc(call[f'{direction}_chars'], stage=stage, direction=direction)
+        LLM_TOKENS.inc(call[f'{direction}_tokens'] or 0, stage=stage, direction=direction)
+    LLM_CALL_SECONDS.observe(seconds, stage=stage, model=model)
+
+
+def count_query(execute, sql, params, many, context):
+    trace = current_trace.get()
+    if trace is not None:
+        for record in trace.open_stages:
+            record.queries += 1
+    return execute(sql, params, many, context)
+
+
+def trace_id_for(request):
+    candidate = request.headers.get('X-Request-ID', '')
+    return candidate if TRACE_ID_RE.match(candidate) else uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def traced_request(trace_id):
+    trace = Trace(trace_id)
+    token = current_trace.set(trace)
+    try:
+        with ExitStack() as wrappers:
+            for alias in connections:
+                wrappers.enter_context(connections[alias].execute_wrapper(count_query))
+            yield trace
+    except Exception:
+        trace.outcome = 'error'
+        raise
+    finally:
+        current_trace.reset(token)
+        finish(trace, time.perf_counter() - trace.started)
+
+
+def finish(trace, total):
+    REQUEST_SECONDS.observe(total, intent=trace.intent, outcome=trace.outcome)
+    for record in trace.stages:
+        STAGE_SECONDS.observe(record.seconds, stage=record.name, intent=trace.intent)
+        STAGE_QUERIES.observe(record.queries, stage=record.name, intent=trace.intent)
+    logger.info(json.dumps(trace.as_dict(total), separators=(',', ':')))
+
+
+# Metrics
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def label_values(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        with self.lock:
+            self.values[self.label_values(labels)] += amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [
+            f'{self.name}{format_labels(self.labelnames, values)} {amount:g}' for values, amount in items
+        ]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            counts, total = self.series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.series[key] = (counts, total + value)
+
+    def render(self):
+        lines = self.header()
+        names = self.labelnames + ('le',)
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.series.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{self.name}_bucket{format_labels(names, values + (le,))} {cumulative}')
+            labels = format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {total:g}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Collected(Metric):
+    """
+    Values kept elsewhere, read at scrape time from ``collect()``, which
+    returns ``{label values: value}``.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, kind='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        return self.header() + [
+            f'{self.name}{format_labels(self.labelnames, values)} {value:g}'
+            for values, value in sorted(self.collect().items())
+        ]
+
+
+REGISTRY = []
+
+REQUEST_SECONDS = Histogram(
+    'assistant_request_seconds', 'Assistant request latency.', ('intent', 'outcome')
+)
+STAGE_SECONDS = Histogram(
+    'assistant_stage_seconds', 'Time spent per pipeline stage.', ('stage', 'intent')
+)
+STAGE_QUERIES = Histogram(
+    'assistant_stage_queries', 'SQL queries per pipeline stage.', ('stage', 'intent'), COUNT_BUCKETS
+)
+LLM_CALL_SECONDS = Histogram(
+    'assistant_llm_call_seconds', 'Upstream LLM call latency, retries included.', ('stage', 'model')
+)
+LLM_TOKENS = Counter(
+    'assistant_llm_tokens_total', 'LLM tokens sent and received.', ('stage', 'direction')
+)
+LLM_CHARS = Counter(
+    'assistant_llm_chars_total', 'LLM prompt and response characters.', ('stage', 'direction')
+)
+
+
+def collect_admission():
+    from .admission import get_admission_controller
+    stats = get_admission_controller().stats()
+    return {(state,): stats[state] for state in ('in_flight', 'waiting')}
+
+
+def collect_circuit():
+    from django.core.exceptions import ImproperlyConfigured
+
+    from .llm import get_llm
+    try:
+        provider = get_llm()
+    except ImproperlyConfigured:
+        # No provider (e.g. no GEMINI_API_KEY), so no breaker to report.
+        return {}
+    return {(provider.model_name,): 0 if provider.breaker.state == 'closed' else 1}
+
+
+def collect_llm_cache():
+    from .llm_cache import llm_cache
+    with llm_cache.lock:
+        return {(event,): llm_cache.counters.get(event, 0) for event in ('hits', 'misses')}
+
+
+def collect_cache():
+    from django.core.cache import cache
+    stats = cache.stats() if hasattr(cache, 'stats') else {}
+    return {
+        (namespace, event): value
+        for namespace, counts in stats.items() for event, value in counts.items()
+    }
+
+
+Collected('assistant_admission_requests', 'Pipeline runs in flight or queued.', ('state',), collect_admission)
+Collected('assistant_llm_circuit_open', '1 while the LLM circuit breaker is open.', ('model',), collect_circuit)
+Collected(
+    'assistant_llm_cache_lookups_total', 'LLM response cache lookups.', ('result',), collect_llm_cache, 'counter'
+)
+Collected('cache_events_total', 'Cache events by key namespace.', ('namespace', 'event'), collect_cache, 'counter')
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        try:
+            lines.extend(metric.render())
+        except Exception:
+            # A broken collector must not take the whole scrape down.
+            logger.exception('Could not render metric %s', metric.name)
+    return '\n'.join(lines) + '\n'
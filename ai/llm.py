@@ -0,0 +1,298 @@
+"""
+LLM providers for the university assistant.
+
+Views ask ``get_llm()`` for the provider configured in
+``settings.ASSISTANT_LLM`` and call ``generate_content(prompt)`` on it, the
+same interface as ``genai.GenerativeModel``. Providers share the plumbing
+for timeouts, retries with jittered exponential backoff and a cap on
+concurrent calls; subclasses only implement ``call``.
+
+``FakeProvider`` answers deterministically after a configurable, randomly
+drawn delay, so the rest of the pipeline can be load-tested offline.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .fallback import keyword_intent
+from .instrumentation import record_llm_call
+
+try:
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - only needed for GeminiProvider
+    genai = None
+    google_exceptions = None
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+
+
+class LLMError(Exception):
+    """A provider call failed and will not be retried any further."""
+
+
+class LLMTimeout(LLMError):
+    """No call slot was free, or the provider did not answer, in time."""
+
+
+class SlotTimeout(LLMTimeout):
+    """No call slot came free in time: our own congestion, not the provider's."""
+
+
+class CircuitOpen(LLMError):
+    """Recent calls kept failing; calls fail fast until the breaker resets."""
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    latency: float
+    attempts: int = 1
+    prompt_tokens: int = None
+    response_tokens: int = None
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failed calls. While open,
+    calls fail at once with ``CircuitOpen``; after ``reset_timeout`` seconds
+    a single probe call is let through, and its outcome closes the breaker
+    or opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout or self.probing:
+                raise CircuitOpen(f'LLM circuit open, retry in {max(self.reset_timeout - waited, 0):.0f}s')
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """End a probe whose outcome says nothing about the upstream."""
+        with self.lock:
+            self.probing = False
+
+
+class BaseProvider:
+    """
+    Common call path: wait for one of ``max_concurrency`` slots, call the
+    provider and retry retryable failures up to ``max_retries`` times,
+    sleeping a random share ("full jitter") of an exponentially growing
+    backoff in between. ``timeout`` bounds the whole call, retries
+    included.
+
+    Calls that fail upstream count towards the circuit breaker: retryable
+    errors once retries run out, other ``upstream_errors`` at once. Waiting
+    too long for a local slot does not, nor do errors in our own code.
+    """
+    retryable = (LLMTimeout,)
+    upstream_errors = (LLMError,)
+
+    def __init__(self, model=DEFAULT_MODEL, api_key=None, timeout=30.0, max_retries=2, backoff=0.5,
+                 max_backoff=8.0, max_concurrency=8, failure_threshold=5, reset_timeout=30.0,
+                 seed=None):
+        self.model_name = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.random = random.Random(seed)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def call(self, prompt, generation_config, timeout):
+        """
+        Return ``(text, prompt_tokens, response_tokens)`` for ``prompt``;
+        token counts may be ``None`` when the provider doesn't report them.
+        """
+        raise NotImplementedError
+
+    def generate_content(self, prompt, generation_config=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self.breaker.before_call()
+        started = time.perf_counter()
+        for attempt in range(1, self.max_retries + 2):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.slots.acquire(timeout=remaining):
+                self.breaker.release_probe()
+                raise SlotTimeout(f'No free LLM call slot within {timeout}s')
+            try:
+                try:
+                    text, prompt_tokens, response_tokens = self.call(
+                        prompt, generation_config, max(deadline - time.monotonic(), 0.001)
+                    )
+                finally:
+                    self.slots.release()
+            except self.retryable as exc:
+                pause = self.random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                if attempt > self.max_retries or time.monotonic() + pause >= deadline:
+                    self.breaker.record_failure()
+                    raise LLMError(f'{self.model_name} failed after {attempt} attempts: {exc}') from exc
+                time.sleep(pause)
+            except self.upstream_errors:
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                latency = time.perf_counter() - started
+                record_llm_call(self.model_name, prompt, text, prompt_tokens, response_tokens, latency)
+                return Completion(
+                    text, self.model_name, latency, attempt, prompt_tokens, response_tokens
+                )
+
+
+class GeminiProvider(BaseProvider):
+    """Google Gemini through ``google.generativeai``; one client per process."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if genai is None:
+            raise ImproperlyConfigured('GeminiProvider requires the "google-generativeai" package')
+        if not self.api_key:
+            raise ImproperlyConfigured('Set GEMINI_API_KEY to use GeminiProvider')
+        genai.configure(api_key=self.api_key)
+        self.client = genai.GenerativeModel(self.model_name)
+        self.retryable = (
+            LLMTimeout,
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.InternalServerError,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+        )
+        self.upstream_errors = (LLMError, google_exceptions.GoogleAPIError)
+
+    def call(self, prompt, generation_config, timeout):
+        response = self.client.generate_content(
+            prompt, generation_config=generation_config, request_options={'timeout': timeout}
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        return (
+            response.text,
+            getattr(usage, 'prompt_token_count', None),
+            getattr(usage, 'candidates_token_count', None),
+        )
+
+
+QUERY_RE = re.compile(r'(?:Query:|The user asked:) "(.*?)"', re.DOTALL)
+WORD_RE = re.compile(r'[a-z0-9][a-z0-9-]+')
+
+
+class FakeProvider(BaseProvider):
+    """
+    Offline stand-in for load tests. Recognises the assistant's intent and
+    keyword prompts and answers them with plausible JSON chosen only from
+    the prompt text; anything else gets a short canned answer.
+
+    Each call sleeps for a delay drawn from ``latency``: ``constant``,
+    ``uniform`` (``mean_ms`` +/- ``spread_ms``), ``normal`` (``spread_ms``
+    standard deviation), ``lognormal`` (``sigma``) or ``exponential``.
+    ``failure_rate`` makes that share of calls time out, to exercise
+    retries. Pass ``seed`` for a repeatable sequence.
+    """
+    LATENCIES = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, latency='lognormal', mean_ms=400.0, spread_ms=100.0, sigma=0.5,
+                 failure_rate=0.0, model=DEFAULT_MODEL, **kwargs):
+        # Prefixed so fake answers never share LLM cache entries with real ones.
+        super().__init__(model=f'fake/{model}', **kwargs)
+        if latency not in self.LATENCIES:
+            raise ImproperlyConfigured(f'FakeProvider latency must be one of {", ".join(self.LATENCIES)}')
+        self.latency = latency
+        self.mean_ms = mean_ms
+        self.spread_ms = spread_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            rng = self.random
+            if self.latency == 'constant':
+                ms = self.mean_ms
+            elif self.latency == 'uniform':
+                ms = rng.uniform(self.mean_ms - self.spread_ms, self.mean_ms + self.spread_ms)
+            elif self.latency == 'normal':
+                ms = rng.gauss(self.mean_ms, self.spread_ms)
+            elif self.latency == 'lognormal':
+                # Parameterised so the distribution's mean is mean_ms.
+                ms = self.mean_ms * rng.lognormvariate(-self.sigma ** 2 / 2, self.sigma)
+            else:
+                ms = rng.expovariate(1 / self.mean_ms) if self.mean_ms > 0 else 0
+            failed = rng.random() < self.failure_rate
+        return max(ms, 0) / 1000, failed
+
+    def call(self, prompt, generation_config, timeout):
+        seconds, failed = self.delay()
+        time.sleep(min(seconds, timeout))
+        if failed or seconds > timeout:
+            raise LLMTimeout(f'Fake call exceeded {timeout}s')
+        text = self.respond(prompt)
+        # Roughly four characters per token, as for English text.
+        return text, len(prompt) // 4, len(text) // 4
+
+    @staticmethod
+    def respond(prompt):
+        match = QUERY_RE.search(prompt)
+        query = (match.group(1) if match else prompt).strip()
+        lowered = query.lower()
+        if 'ONLY a JSON object' in prompt:
+            return json.dumps({'intent': keyword_intent(query), 'entities': {}, 'requires_followup': False})
+        if 'JSON array of keywords' in prompt:
+            words = [word for word in WORD_RE.findall(lowered) if len(word) > 3]
+            return json.dumps(words[:5])
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return f'Here is what I found about "{query[:200]}". [fake:{digest}]'
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """The provider configured by ``settings.ASSISTANT_LLM``."""
+    config = getattr(settings, 'ASSISTANT_LLM', {})
+    provider_class = import_string(config.get('BACKEND', 'ai.llm.GeminiProvider'))
+    return provider_class(model=config.get('MODEL', DEFAULT_MODEL), **config.get('OPTIONS', {}))
@@ -0,0 +1,185 @@
+"""
+Persistent cache for deterministic LLM calls.
+
+Prompts such as intent classification and keyword extraction depend only on
+the user query, so identical prompts get identical answers. Responses are
+stored in the ``ai_llmresponse`` table under a SHA-256 of the model name,
+prompt and generation config; they survive restarts and are shared by every
+worker. Each entry records how long the original call took, so the cache
+can report the latency it saved.
+
+Hits are read-only for the database: they are tallied in process and
+written back in batches, and expired rows are purged on every
+``PURGE_EVERY``-th store rather than on each one, so cache traffic adds
+few writes to contend with enrollments and grade posting.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import LLMResponse
+
+LLM_CACHE_TTL = 60 * 60 * 24 * 7
+# Pending hit counts are written back once this many accumulate, or this
+# many seconds after the last write-back.
+HIT_FLUSH_SIZE = 100
+HIT_FLUSH_INTERVAL = 60
+PURGE_EVERY = 100
+
+
+@dataclass
+class CachedResponse:
+    """Stands in for a Gemini response; only ``text`` is kept."""
+    text: str
+    cached: bool = True
+
+
+def prompt_key(model_name, prompt, generation_config=None):
+    material = json.dumps(
+        {'model': model_name, 'prompt': prompt, 'config': generation_config},
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """Look up and store responses, counting hits and misses for this process."""
+
+    def __init__(self, ttl=LLM_CACHE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.pending_hits = Counter()
+        self.flushed_at = time.monotonic()
+        self.puts = 0
+
+    def count(self, **amounts):
+        with self.lock:
+            self.counters.update(amounts)
+
+    def get(self, key):
+        try:
+            row = LLMResponse.objects.filter(key=key, expires_at__gt=timezone.now()).values_list(
+                'response', 'latency'
+            ).first()
+        except DatabaseError:
+            # Treated as a miss; the call goes to the model.
+            return None
+        if row is None:
+            return None
+        with self.lock:
+            self.pending_hits[key] += 1
+            due = (sum(self.pending_hits.values()) >= HIT_FLUSH_SIZE
+                   or time.monotonic() - self.flushed_at >= HIT_FLUSH_INTERVAL)
+        if due:
+            self.flush_hits()
+        return row
+
+    def flush_hits(self):
+        """Add the hits counted since the last flush to the stored entries."""
+        with self.lock:
+            pending, self.pending_hits = self.pending_hits, Counter()
+            self.flushed_at = time.monotonic()
+        by_count = {}
+        for key, hits in pending.items():
+            by_count.setdefault(hits, []).append(key)
+        try:
+            for hits, keys in by_count.items():
+                LLMResponse.objects.filter(key__in=keys).update(hits=F('hits') + hits)
+        except DatabaseError:
+            # Hit counts are statistics; losing a batch is harmless.
+            pass
+
+    def put(self, key, model_name, text, latency):
+        now = timezone.now()
+        with self.lock:
+            self.puts += 1
+            purge = self.puts % PURGE_EVERY == 0
+        if purge:
+            self.purge_expired(now)
+        LLMResponse.objects.bulk_create(
+            [LLMResponse(
+                key=key, model=model_name[:100], response=text, latency=latency, hits=0,
+                expires_at=now + timedelta(seconds=self.ttl),
+            )],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['model', 'response', 'latency', 'hits', 'expires_at'],
+        )
+
+    def purge_expired(self, now=None):
+        return LLMResponse.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
+
+    def generate(self, model, prompt, generation_config=None, timeout=None):
+        """Return ``model.generate_content(prompt)``, or its cached text."""
+        model_name = getattr(model, 'model_name', type(model).__name__)
+        key = prompt_key(model_name, prompt, generation_config)
+        started = time.perf_counter()
+        row = self.get(key)
+        if row is not None:
+            text, latency = row
+            self.count(hits=1, saved_seconds=latency, lookup_seconds=time.perf_counter() - started)
+            return CachedResponse(text)
+
+        kwargs = {'generation_config': generation_config} if generation_config is not None else {}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        started = time.perf_counter()
+        response = model.generate_content(prompt, **kwargs)
+        latency = time.perf_counter() - started
+        # Reading .text raises for blocked or empty responses; those are
+        # never cached.
+        text = response.text
+        try:
+            self.put(key, model_name, text, latency)
+        except DatabaseError:
+            # A lost write only costs a later miss.
+            pass
+        self.count(misses=1, call_seconds=latency)
+        return response
+
+    def metrics(self):
+        with self.lock:
+            counters = dict(self.counters)
+        self.flush_hits()
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        stored = LLMResponse.objects.filter(expires_at__gt=timezone.now()).aggregate(
+            total_entries=Count('key'), total_hits=Sum('hits'), total_saved=Sum(F('hits') * F('latency')),
+        )
+        return {
+            'process': {
+                'hits': counters.get('hits', 0),
+                'misses': counters.get('misses', 0),
+                'hit_rate': counters.get('hits', 0) / lookups if lookups else None,
+                'saved_seconds': round(counters.get('saved_seconds', 0.0), 3),
+                'lookup_seconds': round(counters.get('lookup_seconds', 0.0), 3),
+                'call_seconds': round(counters.get('call_seconds', 0.0), 3),
+            },
+            'stored': {
+                'entries': stored['total_entries'],
+                'hits': stored['total_hits'] or 0,
+                'saved_seconds': round(stored['total_saved'] or 0.0, 3),
+            },
+        }
+
+
+llm_cache = LLMCache()
+
+
+class CachedModel:
+    """Wrap a ``GenerativeModel`` so ``generate_content`` goes through the cache."""
+
+    def __init__(self, model, cache=None):
+        self.model = model
+        self.cache = cache or llm_cache
+
+    def generate_content(self, prompt, generation_config=None, timeout=None):
+        return self.cache.generate(self.model, prompt, generation_config, timeout)
@@ -0,0 +1,303 @@
+import contextlib
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from ai.admission import get_admission_controller
+from ai.llm import FakeProvider, get_llm
+from ai.models import KnowledgeBaseEntry
+from ai.search_index import normalize_question, top_level_entries
+from ai.singleflight import get_single_flight
+from ai.views import search_knowledge_base
+from university.benchmark import (
+    BENCH_CACHES, compare_reports, default_report_path, read_report, report_header, run_concurrently,
+    scratch_database, summarize, timed, write_report
+)
+from university.models import AcademicProgram, Building, Course, Department, Faculty
+from university.synthetic import CampusGenerator
+
+# Question shapes students ask, filled in from the fixture's own rows.
+TEMPLATES = (
+    'Tell me about the {course_code} course',
+    'What {department} classes are offered at the {level} level?',
+    'What are the prerequisites for {course_title}?',
+    'Which professors teach in the {department} department?',
+    'Who is professor {last_name}?',
+    'Which faculty do research on {research}?',
+    'Where is the {department} department located?',
+    'What degree programs does {department} offer?',
+    'How do I register for {course_code}?',
+    'Where is {building}?',
+    'Is there a computer lab in {building_code}?',
+    'Is there any news about {topic}?',
+    'How many {department} students are there?',
+    'When does spring break start this year?',
+)
+TOPICS = ('registration', 'the career fair', 'library hours', 'scholarships', 'campus closures', 'advising week')
+# Share of the corpus that repeats a knowledge base question verbatim (FAQ
+# hits) and that asks about a KB topic in other words (full pipeline).
+FAQ_SHARE = 0.25
+PARAPHRASE_SHARE = 0.25
+
+
+class TraceCollector(logging.Handler):
+    """Keeps the assistant's per-request trace lines, keyed by trace id."""
+
+    def __init__(self):
+        super().__init__()
+        self.traces = {}
+
+    def emit(self, record):
+        trace = json.loads(record.getMessage())
+        self.traces[trace['trace_id']] = trace
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /assistant/ and knowledge base search on synthetic campus data with a fake LLM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,10', help='Comma-separated fixture scales (default: 1,10)')
+        parser.add_argument('--queries', type=int, default=200, help='Assistant requests per scale')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for fixtures, corpus and fake LLM')
+        parser.add_argument(
+            '--latency', default='lognormal', choices=FakeProvider.LATENCIES,
+            help='Fake LLM latency distribution (default: lognormal)'
+        )
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Mean fake LLM latency')
+        parser.add_argument('--spread-ms', type=float, default=20.0, help='Spread for uniform/normal latency')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of fake LLM calls that time out')
+        parser.add_argument('--output', help='Where to write the JSON report (default: benchmarks/assistant-<revision>.json)')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales must be comma-separated integers, e.g. 1,10,100')
+        baseline = read_report(options['compare']) if options['compare'] else None
+
+        report = report_header('assistant', {
+            key: options[key] for key in (
+                'scales', 'queries', 'concurrency', 'seed', 'latency', 'latency_ms', 'spread_ms', 'failure_rate'
+            )
+        })
+        report['results'] = {}
+        for scale in scales:
+            self.stdout.write(f'Scale {scale}x: building fixtures...')
+            with scratch_database(), self.bench_settings(options):
+                report['results'][f'{scale}x'] = self.run_scale(scale, options)
+            self.print_scale(scale, report['results'][f'{scale}x'])
+
+        path = write_report(report, options['output'] or default_report_path('assistant'))
+        self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+        if baseline is not None:
+            self.print_comparison(baseline, report)
+
+    @contextlib.contextmanager
+    def bench_settings(self, options):
+        """
+        Fake LLM, no client rate limit, and caches that start empty and stay
+        in memory; everything else as configured.
+        """
+        overrides = override_settings(
+            ASSISTANT_LLM={
+                'BACKEND': 'ai.llm.FakeProvider',
+                'OPTIONS': {
+                    'latency': options['latency'],
+                    'mean_ms': options['latency_ms'],
+                    'spread_ms': options['spread_ms'],
+                    'failure_rate': options['failure_rate'],
+                    'seed': options['seed'],
+                },
+            },
+            ASSISTANT_ADMISSION={'RATE': '1000000/s', 'BURST': 1000000, 'MAX_QUEUE': 100000},
+            CACHES=BENCH_CACHES,
+        )
+        factories = (get_llm, get_admission_controller, get_single_flight)
+        with overrides:
+            for factory in factories:
+                factory.cache_clear()
+            try:
+                yield
+            finally:
+                for factory in factories:
+                    factory.cache_clear()
+
+    def run_scale(self, scale, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull:
+            fixture = CampusGenerator(scale, seed=options['seed']).generate()
+            call_command('import_kb', stdout=devnull)
+        fixture['knowledgebaseentry'] = KnowledgeBaseEntry.objects.count()
+        setup_seconds = time.perf_counter() - started
+
+        corpus = self.build_corpus(rng, options['queries'])
+        self.stdout.write(f'  {sum(fixture.values())} rows in {setup_seconds:.1f}s; running {len(corpus)} queries...')
+        # The views print progress; keep it out of the report.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            kb_search = self.bench_kb_search(corpus)
+            assistant = self.bench_assistant(corpus, options['concurrency'])
+        return {
+            'fixture': fixture,
+            'setup_seconds': round(setup_seconds, 2),
+            'assistant': assistant,
+            'kb_search': kb_search,
+        }
+
+    # Corpus
+
+    def build_corpus(self, rng, size):
+        """``size`` queries as ``(kind, text)``, drawn reproducibly from the fixture."""
+        questions = list(top_level_entries().order_by('pk').values_list('question', flat=True))
+        values = {
+            'course': list(Course.objects.order_by('pk').values_list('code', 'title', 'level')),
+            'department': list(Department.objects.order_by('pk').values_list('name', flat=True)),
+            'last_name': list(Faculty.objects.order_by('pk').values_list('user__last_name', flat=True)),
+            'research': sorted({
+                interest.strip() for interests in Faculty.objects.values_list('research_interests', flat=True)
+                for interest in interests.split(',') if interest.strip()
+            }),
+            'building': list(Building.objects.order_by('pk').values_list('name', 'code')),
+            'program': list(AcademicProgram.objects.order_by('pk').values_list('name', flat=True)),
+        }
+        corpus = []
+        for _ in range(size):
+            draw = rng.random()
+            if questions and draw < FAQ_SHARE:
+                corpus.append(('faq', rng.choice(questions)))
+            elif questions and draw < FAQ_SHARE + PARAPHRASE_SHARE:
+                corpus.append(('paraphrase', self.paraphrase(rng, rng.choice(questions))))
+            else:
+                corpus.append(('template', self.fill(rng, rng.choice(TEMPLATES), values)))
+        return corpus
+
+    def paraphrase(self, rng, question):
+        """A few of the question's content words, so the exact-match path misses."""
+        words = normalize_question(question).split()
+        keep = sorted(rng.sample(range(len(words)), min(len(words), 3)))
+        return 'need info on ' + ' '.join(words[i] for i in keep)
+
+    def fill(self, rng, template, values):
+        code, title, level = rng.choice(values['course'])
+        building, building_code = rng.choice(values['building'])
+        return template.format(
+            course_code=code, course_title=title, level=level,
+            department=rng.choice(values['department']), last_name=rng.choice(values['last_name']),
+            research=rng.choice(values['research']), building=building, building_code=building_code,
+            topic=rng.choice(TOPICS),
+        )
+
+    # Measurements
+
+    def bench_kb_search(self, corpus):
+        """``search_knowledge_base`` on the KB-style queries, first cold and then cached."""
+        queries = list(dict.fromkeys(text for kind, text in corpus if kind != 'template'))
+        results = {}
+        for label in ('cold', 'warm'):
+            latencies, counts = [], []
+            for query in queries:
+                _, seconds, count = timed(lambda: list(search_knowledge_base(query)))
+                latencies.append(seconds)
+                counts.append(count)
+            results[label] = {
+                'latency_ms': summarize(latencies, scale=1000),
+                'queries': summarize(counts),
+            }
+        cache.clear()
+        return results
+
+    def bench_assistant(self, corpus, concurrency):
+        collector = TraceCollector()
+        logger = logging.getLogger('ai.assistant')
+        handlers, level = logger.handlers, logger.level
+        logger.handlers, logger.level = [collector], logging.INFO
+
+        def ask(item):
+            index, (kind, text) = item
+            trace_id = f'bench{index:08d}'
+            response, seconds, queries = timed(
+                Client().post, '/assistant/', {'query': text},
+                content_type='application/json', HTTP_X_REQUEST_ID=trace_id
+            )
+            return trace_id, response.status_code, seconds, queries
+
+        try:
+            started = time.perf_counter()
+            samples = run_concurrently(ask, enumerate(corpus), concurrency)
+            elapsed = time.perf_counter() - started
+        finally:
+            logger.handlers, logger.level = handlers, level
+
+        by_intent = defaultdict(list)
+        stages = defaultdict(lambda: ([], []))
+        for trace_id, status_code, seconds, queries in samples:
+            trace = collector.traces.get(trace_id, {})
+            by_intent[trace.get('intent', 'unknown')].append((status_code, seconds, queries, trace))
+            for stage in trace.get('stages', []):
+                stages[stage['stage']][0].append(stage['ms'])
+                stages[stage['stage']][1].append(stage['queries'])
+
+        return {
+            'requests': len(samples),
+            'corpus': dict(Counter(kind for kind, _ in corpus)),
+            'errors': sum(1 for sample in samples if sample[1] >= 500),
+            'seconds': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'latency_ms': summarize((sample[2] for sample in samples), scale=1000),
+            'queries': summarize(sample[3] for sample in samples),
+            'intents': {
+                intent: {
+                    'latency_ms': summarize((seconds for _, seconds, _, _ in rows), scale=1000),
+                    'queries': summarize(queries for _, _, queries, _ in rows),
+                    'llm_calls': summarize(len(trace.get('llm_calls', [])) for _, _, _, trace in rows),
+                    'outcomes': dict(Counter(trace.get('outcome', 'untraced') for _, _, _, trace in rows)),
+                }
+                for intent, rows in sorted(by_intent.items())
+            },
+            'stages': {
+                name: {'latency_ms': summarize(ms), 'queries': summarize(counts)}
+                for name, (ms, counts) in sorted(stages.items())
+            },
+        }
+
+    # Output
+
+    def print_scale(self, scale, results):
+        assistant = results['assistant']
+        latency = assistant['latency_ms']
+        self.stdout.write(
+            f"  /assistant/: {assistant['requests']} requests, {assistant['errors']} errors, "
+            f"{assistant['throughput_rps']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"p99 {latency['p99']} ms"
+        )
+        self.stdout.write(f"  {'intent':18} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL mean':>9} {'SQL max':>8}")
+        for intent, row in assistant['intents'].items():
+            latency, queries = row['latency_ms'], row['queries']
+            self.stdout.write(
+                f"  {intent:18} {latency['count']:5} {latency['p50']:9.1f} {latency['p95']:9.1f} "
+                f"{latency['p99']:9.1f} {queries['mean']:9.1f} {queries['max']:8.0f}"
+            )
+        for label, row in results['kb_search'].items():
+            if row['latency_ms']['count']:
+                self.stdout.write(
+                    f"  search_knowledge_base ({label}): p50 {row['latency_ms']['p50']} ms, "
+                    f"p95 {row['latency_ms']['p95']} ms, {row['queries']['mean']} queries on average"
+                )
+
+    def print_comparison(self, baseline, report):
+        rows = compare_reports(baseline, report)
+        self.stdout.write(f"Changes over 10% since {baseline.get('revision') or 'the baseline'}:")
+        if not rows:
+            self.stdout.write('  none')
+        for name, old, new, change in rows:
+            self.stdout.write(f'  {name:60} {old:>10} -> {new:<10} {change:+.0%}')
@@ -1,37 +1,219 @@
 import csv
-from django.core.management.base import BaseCommand
-from ai.models import KnowledgeBaseEntry
+import glob
+import time
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from ai.ingest import CHUNK_CHARS, DEDUP_THRESHOLD, IngestedEntry, IngestPipeline
+from ai.models import KnowledgeBaseEntry, content_hash
+from ai.search_index import rebuild_search_index, top_level_entries
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'data'
+DEFAULT_PATTERN = str(DATA_DIR / '*.csv')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class Command(BaseCommand):
-    help = 'Import knowledge base entries from a CSV file'
+    help = 'Import knowledge base entries from CSV files (question, answer, source columns)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help=f'CSV files or glob patterns (default: {DEFAULT_PATTERN})'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows written per INSERT and per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--clean', action='store_true',
+            help='Strip boilerplate, drop near-duplicates (of each other and of existing entries) and chunk long answers before import'
+        )
+        parser.add_argument(
+            '--chunk-chars', type=int, default=CHUNK_CHARS,
+            help=f'Maximum chunk length with --clean (default: {CHUNK_CHARS})'
+        )
+        parser.add_argument(
+            '--dedup-threshold', type=float, default=DEDUP_THRESHOLD,
+            help=f'Similarity at which --clean drops a near-duplicate (default: {DEDUP_THRESHOLD})'
+        )
 
-    def handle(self, *args, **kwargs):
-        file_path = 'ai/data/university_knowledge_base.csv'  # Adjust if needed
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        files = self.expand_paths(options['paths'] or [DEFAULT_PATTERN])
 
-        try:
-            with open(file_path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                count = 0
-                for i, row in enumerate(reader, 1):
-                    question = row.get('question', '').strip()
-                    answer = row.get('answer', '').strip()
-                    source = row.get('source', '').strip()
+        counts = Counter()
+        started = time.perf_counter()
+        if options['clean']:
+            pipeline = IngestPipeline(
+                chunk_chars=options['chunk_chars'], dedup_threshold=options['dedup_threshold']
+            )
+            pipeline.learn(self.read_rows(files))
+            pipeline.seed(
+                top_level_entries().values_list('content_hash', 'question', 'answer', 'source').iterator()
+            )
+            entries = pipeline.process(self.read_rows(files, counts))
+        else:
+            pipeline = None
+            entries = (IngestedEntry(*row) for row in self.read_rows(files, counts))
+        self.write(entries, batch_size, counts, prune_chunks=pipeline is not None)
+        if pipeline is not None:
+            counts['superseded'] = self.delete_superseded(pipeline.superseded)
+        elapsed = time.perf_counter() - started
 
+        if pipeline is not None:
+            stats = pipeline.stats
+            self.stdout.write(
+                f"Cleaning: {stats['near_duplicates']} near-duplicates and {stats['empty']} empty "
+                f"rows dropped, answer text {stats['chars_in']} -> {stats['chars_out']} chars, "
+                f"{stats['chunks']} chunks, {counts['superseded']} older versions replaced."
+            )
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['read']} rows from {len(files)} file(s) in {elapsed:.2f}s "
+            f"({counts['read'] / elapsed if elapsed else 0:.0f} rows/s): {counts['created']} created, "
+            f"{counts['updated']} updated, {counts['unchanged']} unchanged, {counts['skipped']} skipped, "
+            f"{counts['chunks']} chunks written, {counts['stale_chunks']} stale chunks removed."
+        ))
+
+    def expand_paths(self, patterns):
+        files = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            if not matches:
+                raise CommandError(f'No files match: {pattern}')
+            for match in matches:
+                if not Path(match).is_file():
+                    raise CommandError(f'File not found: {match}')
+                if match not in files:
+                    files.append(match)
+        return files
+
+    def read_rows(self, files, counts=None):
+        """
+        Yield ``(question, answer, source)`` one row at a time.
+
+        Rows are counted, and skips reported, only when ``counts`` is given,
+        so a learning pass over the same files stays silent.
+        """
+        for path in files:
+            with open(path, newline='', encoding='utf-8') as csvfile:
+                for i, row in enumerate(csv.DictReader(csvfile), 1):
+                    question = (row.get('question') or '').strip()
+                    answer = (row.get('answer') or '').strip()
+                    source = (row.get('source') or '').strip() or None
+                    if counts is not None:
+                        counts['read'] += 1
                     if not question or not answer:
-                        self.stdout.write(f'Skipping row {i}: Missing question or answer')
+                        if counts is not None:
+                            self.stdout.write(f'Skipping {path} row {i}: Missing question or answer')
+                            counts['skipped'] += 1
                         continue
+                    yield question, answer, source
 
-                    KnowledgeBaseEntry.objects.create(
-                        question=question,
-                        answer=answer,
-                        source=source
+    def write(self, entries, batch_size, counts, prune_chunks=False):
+        seen = set()
+        for batch in batched(entries, batch_size):
+            parents = []
+            for item in batch:
+                digest = content_hash(item.question, item.answer)
+                if digest in seen:
+                    counts['unchanged'] += 1
+                    continue
+                seen.add(digest)
+                parent = KnowledgeBaseEntry(
+                    question=item.question, answer=item.answer, source=item.source, content_hash=digest
+                )
+                parents.append((parent, item.chunks))
+
+            with transaction.atomic():
+                created, updated = self.upsert([parent for parent, _ in parents], ['source'])
+                counts['created'] += created
+                counts['updated'] += updated
+                counts['unchanged'] += len(parents) - created - updated
+
+                chunks = []
+                for parent, texts in parents:
+                    for index, text in enumerate(texts):
+                        digest = content_hash(parent.question, text)
+                        if digest in seen:
+                            continue
+                        seen.add(digest)
+                        chunks.append(KnowledgeBaseEntry(
+                            question=parent.question, answer=text, source=parent.source,
+                            content_hash=digest, parent_id=parent.pk, chunk_index=index
+                        ))
+                created, updated = self.upsert(chunks, ['source', 'parent', 'chunk_index'])
+                counts['chunks'] += created + updated
+                # Only a chunking import knows which chunks should exist.
+                if prune_chunks:
+                    counts['stale_chunks'] += self.delete_stale_chunks(
+                        [parent.pk for parent, _ in parents], {chunk.content_hash for chunk in chunks}
                     )
-                    count += 1
 
-            self.stdout.write(self.style.SUCCESS(f'Successfully imported {count} entries.'))
+    def upsert(self, entries, update_fields):
+        """
+        Insert new entries and rewrite changed ones, keyed on ``content_hash``.
+
+        Every entry has its primary key set afterwards. Returns the number
+        created and updated.
+        """
+        if not entries:
+            return 0, 0
+        existing = {
+            row[0]: row[1:] for row in KnowledgeBaseEntry.objects.filter(
+                content_hash__in=[entry.content_hash for entry in entries]
+            ).values_list('content_hash', 'pk', *update_fields)
+        }
+        pending = []
+        for entry in entries:
+            stored = existing.get(entry.content_hash)
+            if stored is None:
+                pending.append(entry)
+                continue
+            entry.pk = stored[0]
+            current = tuple(getattr(entry, KnowledgeBaseEntry._meta.get_field(name).attname)
+                            for name in update_fields)
+            if current != stored[1:]:
+                pending.append(entry)
+        KnowledgeBaseEntry.objects.bulk_create(
+            pending,
+            batch_size=len(pending) or None,
+            update_conflicts=True,
+            unique_fields=['content_hash'],
+            update_fields=update_fields,
+        )
+        created = sum(1 for entry in pending if entry.content_hash not in existing)
+        return created, len(pending) - created
 
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'File not found: {file_path}'))
+    def delete_superseded(self, digests):
+        """Remove stored entries replaced by a cleaned version of the same page."""
+        deleted = 0
+        with transaction.atomic():
+            for batch in batched(digests, 500):
+                stale = list(
+                    top_level_entries().filter(content_hash__in=batch).values_list('pk', flat=True)
+                )
+                KnowledgeBaseEntry.objects.filter(pk__in=stale).delete()
+                deleted += len(stale)
+        return deleted
 
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'An error occurred: {str(e)}'))
+    def delete_stale_chunks(self, parent_ids, current):
+        """Remove chunks left over from an earlier, differently chunked import."""
+        stale = [
+            pk for pk, digest in KnowledgeBaseEntry.objects.filter(parent_id__in=parent_ids)
+            .values_list('pk', 'content_hash') if digest not in current
+        ]
+        if not stale:
+            return 0
+        return KnowledgeBaseEntry.objects.filter(pk__in=stale).delete()[0]
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger('ai.migrations')
+
+# Exact duplicates removed before content_hash becomes unique are written
+# here, and put back (and the file removed) if the migration is reversed.
+EXPORT_FIELDS = ('id', 'question', 'answer', 'source', 'created_at', 'search_terms')
+
+
+def export_path():
+    return Path(os.environ.get('KB_DUPLICATES_EXPORT', Path(settings.BASE_DIR) / 'kb_duplicates_0003.json'))
+
+
+def content_hash(question, answer):
+    normalized = '\x1f'.join(' '.join(part.split()) for part in (question, answer))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def fill_content_hash(apps, schema_editor):
+    """Hash existing entries and drop exact duplicates, keeping the oldest."""
+    KnowledgeBaseEntry = apps.get_model('ai', 'KnowledgeBaseEntry')
+    kept = {}
+    duplicates = []
+    updated = []
+    for entry in KnowledgeBaseEntry.objects.order_by('id').iterator():
+        entry.content_hash = content_hash(entry.question, entry.answer)
+        if entry.content_hash in kept:
+            row = {field: getattr(entry, field) for field in EXPORT_FIELDS}
+            row['created_at'] = entry.created_at.isoformat()
+            row['duplicate_of'] = kept[entry.content_hash]
+            duplicates.append(row)
+        else:
+            kept[entry.content_hash] = entry.id
+            updated.append(entry)
+    if duplicates:
+        path = export_path()
+        path.write_text(json.dumps(duplicates, indent=1))
+        logger.warning(
+            'Removed %d duplicate knowledge base entries (ids %s); saved to %s',
+            len(duplicates), ', '.join(str(row['id']) for row in duplicates), path,
+        )
+    ids = [row['id'] for row in duplicates]
+    for start in range(0, len(ids), 500):
+        KnowledgeBaseEntry.objects.filter(id__in=ids[start:start + 500]).delete()
+    KnowledgeBaseEntry.objects.bulk_update(updated, ['content_hash'], batch_size=500)
+
+
+def restore_duplicates(apps, schema_editor):
+    """Put back the entries ``fill_content_hash`` exported."""
+    path = export_path()
+    if not path.exists():
+        return
+    KnowledgeBaseEntry = apps.get_model('ai', 'KnowledgeBaseEntry')
+    rows = json.loads(path.read_text())
+    KnowledgeBaseEntry.objects.bulk_create([
+        KnowledgeBaseEntry(**{field: row[field] for field in EXPORT_FIELDS}) for row in rows
+    ], batch_size=500)
+    # auto_now_add overwrote created_at on insert.
+    for row in rows:
+        KnowledgeBaseEntry.objects.filter(id=row['id']).update(created_at=row['created_at'])
+    path.unlink()
+    logger.warning('Restored %d duplicate knowledge base entries from %s', len(rows), path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_knowledgebaseentry_search_terms_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebaseentry',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_content_hash, restore_duplicates),
+        migrations.AlterField(
+            model_name='knowledgebaseentry',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_knowledgebaseentry_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebaseentry',
+            name='chunk_index',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='knowledgebaseentry',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='ai.knowledgebaseentry'),
+        ),
+    ]
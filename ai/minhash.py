@@ -0,0 +1,159 @@
+"""
+MinHash signatures and an LSH index for near-duplicate text.
+
+Two texts' signatures agree in a fraction of positions that estimates the
+Jaccard similarity of their shingle sets. The LSH index buckets signatures
+by bands so that lookups only compare against likely matches, which keeps
+whole-corpus deduplication close to linear instead of pairwise.
+"""
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+NUM_PERM = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 3
+
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Word ``size``-grams of ``text``; short texts fall back to the whole text."""
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def char_shingles(text, size=SHINGLE_SIZE):
+    """Character ``size``-grams, which tolerate typos in short strings."""
+    text = ' '.join(tokenize(text))
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(first, second):
+    """Exact Jaccard similarity of two sets."""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def stable_hash(value):
+    """64-bit hash of a string, stable across processes (unlike ``hash()``)."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class MinHasher:
+    """
+    Compute fixed-length MinHash signatures from shingle sets.
+
+    Each "permutation" XORs the 64-bit shingle hashes with a random mask.
+    Over well-mixed hashes that is as good as an affine hash family here and
+    about 3x cheaper in pure Python.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def signature(self, features):
+        """Return a tuple of ``num_perm`` ints, or ``None`` for an empty set."""
+        hashes = [stable_hash(feature) for feature in features]
+        if not hashes:
+            return None
+        return tuple(min([h ^ mask for h in hashes]) for mask in self.masks)
+
+    def text_signature(self, text, size=SHINGLE_SIZE):
+        return self.signature(shingles(text, size))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class LSHIndex:
+    """
+    Band-bucketed index of signatures.
+
+    With ``b`` bands of ``r`` rows, pairs with Jaccard similarity ``s`` become
+    candidates with probability ``1 - (1 - s**r)**b``; candidates are then
+    checked against the full signature.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=NUM_BANDS):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def band_keys(self, signature):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def insert(self, key, signature):
+        self.signatures[key] = signature
+        for band, band_key in self.band_keys(signature):
+            self.buckets[band][band_key].append(key)
+
+    def candidates(self, signature):
+        found = set()
+        for band, band_key in self.band_keys(signature):
+            found.update(self.buckets[band].get(band_key, ()))
+        return found
+
+    def query(self, signature, threshold=0.0, limit=None):
+        """Return ``(key, similarity)`` pairs at or above ``threshold``, best first."""
+        matches = []
+        for key in self.candidates(signature):
+            score = similarity(signature, self.signatures[key])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: (-match[1], str(match[0])))
+        return matches[:limit] if limit else matches
+
+
+def clusters(index, threshold, verify=None):
+    """
+    Group the keys of ``index`` whose signatures are at least ``threshold``
+    similar, transitively. ``verify(key, other)`` can veto a candidate pair.
+    Returns lists of two or more keys, largest first.
+    """
+    parent = {key: key for key in index.signatures}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, signature in index.signatures.items():
+        for other, _score in index.query(signature, threshold):
+            if other != key and (verify is None or verify(key, other)):
+                root, other_root = find(key), find(other)
+                if root != other_root:
+                    parent[other_root] = root
+
+    groups = defaultdict(list)
+    for key in index.signatures:
+        groups[find(key)].append(key)
+    found = [sorted(group) for group in groups.values() if len(group) > 1]
+    found.sort(key=lambda group: (-len(group), group[0]))
+    return found
@@ -1,10 +1,18 @@
 # models.py
+import hashlib
+
 from django.db import models
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
 
+def content_hash(question, answer):
+    """Stable fingerprint of an entry's text, ignoring whitespace differences."""
+    normalized = '\x1f'.join(' '.join(part.split()) for part in (question, answer))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
 class KnowledgeBaseEntry(models.Model):
     question = models.TextField()
     answer = models.TextField()
@@ -13,11 +21,45 @@ class KnowledgeBaseEntry(models.Model):
     
     # Optional: Add this if you want better search capabilities
     search_terms = models.TextField(blank=True, null=True)
-    
+
+    # sha256 of question + answer; lets imports upsert instead of duplicating
+    content_hash = models.CharField(max_length=64, unique=True, editable=False)
+
+    # Long answers are also stored as retrieval-sized chunks pointing back
+    # at the full entry; search runs over chunks and unchunked entries.
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='chunks'
+    )
+    chunk_index = models.PositiveSmallIntegerField(null=True, blank=True)
+
     def __str__(self):
         return self.question[:100]
     
     def save(self, *args, **kwargs):
-        # Auto-generate search terms if not provided
-        if not hasattr(self, 'search_terms') or not self.search_terms:
-            super().save(*args, **kwargs)
\ No newline at end of file
+        self.content_hash = content_hash(self.question, self.answer)
+        super().save(*args, **kwargs)
+
+
+class Conversation(models.Model):
+    """Packed assistant conversation state; see ai/conversation.py."""
+    key = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    revision = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class LLMResponse(models.Model):
+    """Cached model output, keyed by a hash of model, prompt and config; see ai/llm_cache.py."""
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    latency = models.FloatField(help_text='Seconds the original call took')
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.model} {self.key[:12]}'
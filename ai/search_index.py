@@ -0,0 +1,155 @@
+import re
+import threading
+import time
+
+from django.core.cache import cache
+
+from .minhash import LSHIndex, MinHasher, char_shingles, clusters, jaccard
+from .models import KnowledgeBaseEntry
+
+# Bumped whenever the knowledge base changes in bulk; cached searches embed
+# it in their keys, so old results simply stop matching.
+KB_VERSION_KEY = 'kb:version'
+KB_VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+DUPLICATE_THRESHOLD = 0.8
+DID_YOU_MEAN_THRESHOLD = 0.5
+# How long a process trusts its in-memory indexes before re-reading the KB
+# version from the shared cache.
+VERSION_CHECK_INTERVAL = 1.0
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+# Question words stay: "where is X" and "what is X" want different answers.
+STOPWORDS = frozenset('''
+    a an and are as at be can could do does for from i in is it me my of on or
+    please should tell the there to troy university was will with would you your
+'''.split())
+
+
+def kb_version():
+    version = cache.get(KB_VERSION_KEY)
+    if version is None:
+        cache.add(KB_VERSION_KEY, time.time_ns() // 1000, KB_VERSION_TIMEOUT)
+        version = cache.get(KB_VERSION_KEY, 0)
+    return version
+
+
+def rebuild_search_index():
+    """
+    Refresh everything derived from ``KnowledgeBaseEntry`` rows.
+
+    Call once after a bulk load rather than per row. Per-process indexes
+    notice the new version on their next lookup and rebuild themselves.
+    """
+    version = max(time.time_ns() // 1000, (cache.get(KB_VERSION_KEY) or 0) + 1)
+    cache.set(KB_VERSION_KEY, version, KB_VERSION_TIMEOUT)
+    return version
+
+
+def normalize_question(text):
+    """
+    Reduce a question to its content words: casefolded, without
+    punctuation, extra whitespace or stopwords. Questions made only of
+    stopwords keep all their words.
+    """
+    words = PUNCTUATION_RE.sub(' ', text.casefold()).split()
+    content = [word for word in words if word not in STOPWORDS]
+    return ' '.join(content or words)
+
+
+def top_level_entries():
+    """Entries that are not chunks of another entry."""
+    return KnowledgeBaseEntry.objects.filter(parent__isnull=True)
+
+
+class QuestionIndex:
+    """
+    In-process indexes over knowledge base questions.
+
+    ``exact`` maps normalized questions straight to an answer, for FAQ hits
+    that need no search at all. The LSH index shingles questions by
+    characters so misspelled queries still land in the right buckets. Both
+    are rebuilt lazily whenever the KB version moves.
+    """
+
+    def __init__(self):
+        self.hasher = MinHasher()
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0.0
+        self.index = LSHIndex()
+        self.questions = {}
+        self.exact = {}
+
+    def current(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked < VERSION_CHECK_INTERVAL:
+            return self
+        version = kb_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+        self.checked = now
+        return self
+
+    def build(self, version):
+        index = LSHIndex()
+        questions = {}
+        exact = {}
+        rows = top_level_entries().order_by('pk').values_list('pk', 'question', 'answer', 'source')
+        for pk, question, answer, source in rows.iterator():
+            # The oldest entry wins when several normalize the same way.
+            exact.setdefault(normalize_question(question), (pk, question, answer, source))
+            signature = self.hasher.signature(char_shingles(question))
+            if signature is not None:
+                index.insert(pk, signature)
+                questions[pk] = question
+        self.index, self.questions, self.exact, self.version = index, questions, exact, version
+
+    def answer(self, query):
+        """Return ``(entry_id, question, answer, source)`` for an exact hit, or ``None``."""
+        return self.exact.get(normalize_question(query))
+
+    def lookup(self, query, limit=3, threshold=DID_YOU_MEAN_THRESHOLD):
+        """Return ``(entry_id, question, similarity)`` for the closest questions."""
+        signature = self.hasher.signature(char_shingles(query))
+        if signature is None:
+            return []
+        index, questions = self.index, self.questions
+        return [
+            (pk, questions[pk], score)
+            for pk, score in index.query(signature, threshold=threshold, limit=limit)
+        ]
+
+
+question_index = QuestionIndex()
+
+
+def exact_answer(query):
+    return question_index.current().answer(query)
+
+
+def did_you_mean(query, limit=3, threshold=DID_YOU_MEAN_THRESHOLD):
+    return question_index.current().lookup(query, limit=limit, threshold=threshold)
+
+
+def duplicate_clusters(threshold=DUPLICATE_THRESHOLD):
+    """
+    Group top-level entries whose text and questions are both near
+    duplicates. Returns lists of entry ids, largest cluster first.
+    """
+    hasher = MinHasher()
+    index = LSHIndex()
+    questions = {}
+    rows = top_level_entries().values_list('pk', 'question', 'answer').iterator()
+    for pk, question, answer in rows:
+        signature = hasher.text_signature(f'{question} {answer}')
+        if signature is not None:
+            index.insert(pk, signature)
+            questions[pk] = char_shingles(question)
+
+    def same_question(key, other):
+        return jaccard(questions[key], questions[other]) >= threshold
+
+    return clusters(index, threshold, verify=same_question)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import KnowledgeBaseEntry
+from .search_index import rebuild_search_index
+
+
+@receiver(post_save, sender=KnowledgeBaseEntry)
+@receiver(post_delete, sender=KnowledgeBaseEntry)
+def knowledge_base_changed(sender, **kwargs):
+    rebuild_search_index()
@@ -0,0 +1,100 @@
+"""
+Single-flight coalescing for identical concurrent work.
+
+When many students ask the same thing at once, only one request per key
+runs the expensive computation; the others wait for it and share its
+result. Within a process, followers wait on an event. Across processes
+(``shared=True``) the leader holds a lock in the shared cache and publishes
+its result there for a few seconds, which other workers poll for.
+"""
+import hashlib
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+MISSING = object()
+KEY_PREFIX = 'singleflight:'
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    ``do(key, fn)`` returns ``(result, shared)``, where ``shared`` is true
+    when the result came from another request's computation.
+
+    Cross-process waiters give up after ``lock_timeout`` seconds and run
+    ``fn`` themselves, so a crashed leader only delays them.
+    """
+
+    def __init__(self, shared=False, lock_timeout=30, result_ttl=5, poll_interval=0.05):
+        self.shared = shared
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self.run(key, fn)
+            return call.result, shared
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def run(self, key, fn):
+        if not self.shared:
+            return fn(), False
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        lock_key = f'{KEY_PREFIX}lock:{digest}'
+        result_key = f'{KEY_PREFIX}result:{digest}'
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            result = cache.get(result_key, MISSING)
+            if result is not MISSING:
+                return result, True
+            if cache.add(lock_key, 1, self.lock_timeout):
+                try:
+                    result = fn()
+                    cache.set(result_key, result, self.result_ttl)
+                    return result, False
+                finally:
+                    cache.delete(lock_key)
+            if time.monotonic() >= deadline:
+                return fn(), False
+            time.sleep(self.poll_interval)
+
+
+@lru_cache(maxsize=None)
+def get_single_flight():
+    """The coalescer configured by ``settings.ASSISTANT_SINGLE_FLIGHT``."""
+    config = getattr(settings, 'ASSISTANT_SINGLE_FLIGHT', {})
+    return SingleFlight(
+        shared=config.get('SHARED', False),
+        lock_timeout=config.get('LOCK_TIMEOUT', 30),
+        result_ttl=config.get('RESULT_TTL', 5),
+    )
@@ -1,3 +1,725 @@
-from django.test import TestCase
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from university.models import Building
+
+from .admission import (
+    PRIORITY_HIGH, PRIORITY_NORMAL, AdmissionController, AdmittedModel, AssistantRateThrottle, Overloaded,
+    admission, get_admission_controller,
+)
+from .conversation import (
+    ConversationStore, LocalMemoryBackend, decode, get_conversation_store, session_conversation_id,
+)
+from .fallback import classify_intent, templated_answer
+from .ingest import IngestPipeline, chunk_text
+from .llm import (
+    BaseProvider, CircuitOpen, FakeProvider, LLMError, LLMTimeout, SlotTimeout, get_llm,
+)
+from .llm_cache import CachedModel, LLMCache
+from .minhash import LSHIndex, MinHasher, jaccard, shingles, similarity
+from .models import Conversation, KnowledgeBaseEntry, LLMResponse
+from .search_index import duplicate_clusters, exact_answer, normalize_question, top_level_entries
+from .singleflight import SingleFlight, get_single_flight
+from .views import extract_keywords_with_gemini
+
+FAKE_LLM = {'BACKEND': 'ai.llm.FakeProvider', 'OPTIONS': {'latency': 'constant', 'mean_ms': 0}}
+
+CHROME = 'Skip to main content Home Admissions Academics Contact Troy University'
+PAGES = [
+    ('How do I apply?', 'Submit the online application and pay the fee.'),
+    ('When is orientation?', 'Orientation runs the week before fall classes.'),
+    ('Where is the library?', 'The library is next to the student center.'),
+    ('How do I get a parking permit?', 'Permits are sold online by campus police.'),
+    ('Who do I ask about financial aid?', 'The financial aid office in Adams Center.'),
+    ('Can I change my major?', 'Meet your advisor and file a change of major form.'),
+]
+
+
+class ImportKnowledgeBaseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'kb.csv')
+        self.write_csv([(question, f'{CHROME} {answer}', 'troy.edu') for question, answer in PAGES])
+
+    def write_csv(self, rows):
+        with open(self.path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['question', 'answer', 'source'])
+            writer.writerows(rows)
+
+    def import_kb(self, *options):
+        out = StringIO()
+        call_command('import_kb', self.path, *options, stdout=out)
+        return out.getvalue()
+
+    def test_reimport_upserts_on_content(self):
+        self.import_kb()
+        before = dict(KnowledgeBaseEntry.objects.values_list('question', 'pk'))
+        self.assertEqual(len(before), len(PAGES))
+
+        rows = [(question, f'{CHROME} {answer}', 'troy.edu') for question, answer in PAGES]
+        rows[0] = (rows[0][0], rows[0][1], 'https://troy.edu/apply')
+        self.write_csv(rows)
+        output = self.import_kb()
+        self.assertIn('0 created, 1 updated, 5 unchanged', output)
+        self.assertEqual(dict(KnowledgeBaseEntry.objects.values_list('question', 'pk')), before)
+        self.assertEqual(KnowledgeBaseEntry.objects.get(pk=before[PAGES[0][0]]).source, 'https://troy.edu/apply')
+
+    def test_rows_are_written_in_batches(self):
+        self.write_csv([*PAGES[:5], ('No answer here', '', ''), PAGES[0]])
+        with CaptureQueriesContext(connection) as queries:
+            output = self.import_kb('--batch-size', '2')
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "ai_knowledgebaseentry"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertIn('5 created, 0 updated, 1 unchanged, 1 skipped', output)
+
+    def assert_one_entry_per_question(self):
+        pairs = Counter(top_level_entries().values_list('source', 'question'))
+        self.assertEqual(pairs, Counter(('troy.edu', question) for question, _ in PAGES))
+
+    def test_clean_reimport_replaces_raw_rows(self):
+        self.import_kb()
+        self.assertEqual(top_level_entries().count(), len(PAGES))
+
+        self.import_kb('--clean')
+        self.assert_one_entry_per_question()
+        answers = dict(top_level_entries().values_list('question', 'answer'))
+        self.assertEqual(answers, dict(PAGES))
+
+    def test_clean_reimport_is_idempotent(self):
+        self.import_kb('--clean')
+        before = set(KnowledgeBaseEntry.objects.values_list('pk', 'content_hash'))
+
+        self.import_kb('--clean')
+        self.assert_one_entry_per_question()
+        self.assertEqual(set(KnowledgeBaseEntry.objects.values_list('pk', 'content_hash')), before)
+
+    def test_long_answers_are_chunked(self):
+        long_answer = ' '.join(f'Sentence number {n} about tuition.' for n in range(12))
+        rows = [(question, f'{CHROME} {answer}', 'troy.edu') for question, answer in PAGES]
+        self.write_csv([*rows, ('What is tuition?', long_answer, 'troy.edu')])
+        self.import_kb('--clean', '--chunk-chars', '100')
+        entry = top_level_entries().get(question='What is tuition?')
+        chunks = list(entry.chunks.order_by('chunk_index').values_list('answer', flat=True))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 100 and chunk.endswith('.') for chunk in chunks))
+        self.assertEqual(' '.join(chunks), long_answer)
+
+        self.import_kb('--clean', '--chunk-chars', '200')
+        self.assertLess(entry.chunks.count(), len(chunks))
+
+    def test_chunk_text(self):
+        self.assertEqual(chunk_text('Short.', 100), ['Short.'])
+        self.assertEqual(chunk_text('One two. Three four.', 10), ['One two.', 'Three', 'four.'])
+        self.assertEqual(chunk_text('x' * 25, 10), ['x' * 10, 'x' * 10, 'x' * 5])
+
+    def test_bad_arguments(self):
+        with self.assertRaisesMessage(CommandError, 'File not found'):
+            self.import_kb('missing.csv')
+        with self.assertRaisesMessage(CommandError, '--batch-size'):
+            self.import_kb('--batch-size', '0')
+
+
+NOTICE = (
+    'Students must file the graduation application with the registrar by the published deadline in the '
+    'semester before they plan to graduate, pay the graduation fee online, meet with their advisor to '
+    'confirm that every degree requirement is complete, order regalia from the bookstore and register '
+    'for the commencement ceremony so that their name is printed in the program'
+)
+
+
+class NearDuplicateTests(TestCase):
+
+    def entry(self, question, answer):
+        return KnowledgeBaseEntry.objects.create(question=question, answer=answer, source='troy.edu')
+
+    def test_signatures_estimate_jaccard(self):
+        first, second = NOTICE, NOTICE.replace('bookstore', 'campus store')
+        hasher = MinHasher()
+        estimate = similarity(hasher.text_signature(first), hasher.text_signature(second))
+        self.assertAlmostEqual(estimate, jaccard(shingles(first), shingles(second)), delta=0.15)
+
+        index = LSHIndex()
+        index.insert('notice', hasher.text_signature(first))
+        index.insert('other', hasher.text_signature('Parking permits are sold online by campus police.'))
+        self.assertEqual([key for key, _ in index.query(hasher.text_signature(second), 0.5)], ['notice'])
+
+    def test_duplicate_clusters_need_similar_questions(self):
+        original = self.entry('How do I apply to graduate?', NOTICE)
+        copy = self.entry('How do I apply to graduate', NOTICE.replace('bookstore', 'campus store'))
+        # Same templated answer, different question: not a duplicate.
+        self.entry('When is commencement?', NOTICE)
+        self.entry('Where is the library?', 'The library is next to the student center.')
+        self.assertEqual(duplicate_clusters(), [[original.pk, copy.pk]])
+
+    def test_pipeline_drops_near_duplicates(self):
+        rows = [
+            ('How do I apply to graduate?', NOTICE, 'troy.edu/a'),
+            ('How do I apply to graduate', NOTICE.replace('bookstore', 'campus store'), 'troy.edu/b'),
+            ('When is commencement?', NOTICE, 'troy.edu/c'),
+        ]
+        pipeline = IngestPipeline()
+        pipeline.learn(rows)
+        kept = [entry.source for entry in pipeline.process(rows)]
+        self.assertEqual(kept, ['troy.edu/a', 'troy.edu/c'])
+        self.assertEqual(pipeline.stats['near_duplicates'], 1)
+
+        seeded = IngestPipeline()
+        seeded.learn(rows[1:2])
+        seeded.seed([('digest', 'How do I apply to graduate?', NOTICE, 'troy.edu/a')])
+        self.assertEqual(list(seeded.process(rows[1:2])), [])
+
+
+class ContentHashMigrationTests(TransactionTestCase):
+    before = [('ai', '0002_knowledgebaseentry_search_terms_and_more')]
+    after = [('ai', '0003_knowledgebaseentry_content_hash')]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.export = Path(directory.name) / 'duplicates.json'
+        environ = mock.patch.dict(os.environ, {'KB_DUPLICATES_EXPORT': str(self.export)})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.migrate(self.before)
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_duplicates_are_exported_and_restored(self):
+        Entry = self.migrate(self.before).get_model('ai', 'KnowledgeBaseEntry')
+        kept = Entry.objects.create(question='Where is the library?', answer='Next to the student center.')
+        duplicate = Entry.objects.create(
+            question='Where is the  library?', answer='Next to the student center.', source='https://troy.edu/a'
+        )
+        Entry.objects.create(question='Where is the library?', answer='In Wallace Hall.')
+
+        with self.assertLogs('ai.migrations', 'WARNING') as logs:
+            Entry = self.migrate(self.after).get_model('ai', 'KnowledgeBaseEntry')
+        self.assertIn(f'ids {duplicate.pk}', logs.output[0])
+        self.assertEqual(Entry.objects.count(), 2)
+        exported = json.loads(self.export.read_text())
+        self.assertEqual(
+            [(row['id'], row['source'], row['duplicate_of']) for row in exported],
+            [(duplicate.pk, 'https://troy.edu/a', kept.pk)]
+        )
+
+        with self.assertLogs('ai.migrations', 'WARNING'):
+            Entry = self.migrate(self.before).get_model('ai', 'KnowledgeBaseEntry')
+        restored = Entry.objects.get(pk=duplicate.pk)
+        self.assertEqual((restored.question, restored.source), ('Where is the  library?', 'https://troy.edu/a'))
+        self.assertEqual(restored.created_at, duplicate.created_at)
+        self.assertEqual(Entry.objects.count(), 3)
+        self.assertFalse(self.export.exists())
+
+
+class CountingEvent(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+
+    def wait(self, timeout=None):
+        self.waiters += 1
+        return super().wait(timeout)
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def coalesce(self, flight, followers, outcome):
+        """Run ``followers`` extra callers while a leader is inside ``outcome``."""
+        entered, release = threading.Event(), threading.Event()
+        runs = []
+
+        def leader_fn():
+            runs.append('leader')
+            entered.set()
+            release.wait(5)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        results = []
+
+        def call(fn):
+            try:
+                results.append(flight.do('where is the library', fn))
+            except Exception as exc:
+                results.append(exc)
+
+        leader = threading.Thread(target=call, args=(leader_fn,))
+        leader.start()
+        entered.wait(5)
+        done = flight.calls['where is the library'].done = CountingEvent()
+        threads = [
+            threading.Thread(target=call, args=(lambda: runs.append('follower'),)) for _ in range(followers)
+        ]
+        for thread in threads:
+            thread.start()
+        while done.waiters < followers:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader, *threads]:
+            thread.join(5)
+        return runs, results
+
+    def test_followers_share_the_leaders_result(self):
+        runs, results = self.coalesce(SingleFlight(), 4, 'answer')
+        self.assertEqual(runs, ['leader'])
+        self.assertEqual(sorted(results), [('answer', False)] + [('answer', True)] * 4)
+        self.assertEqual(SingleFlight().do('where is the library', lambda: 'again'), ('again', False))
+
+    def test_followers_see_the_leaders_error(self):
+        error = LLMError('down')
+        runs, results = self.coalesce(SingleFlight(), 2, error)
+        self.assertEqual(runs, ['leader'])
+        self.assertEqual(results, [error] * 3)
+
+    def test_shared_results_reach_other_workers(self):
+        first, second = SingleFlight(shared=True), SingleFlight(shared=True)
+        self.assertEqual(first.do('q', lambda: 'answer'), ('answer', False))
+        self.assertEqual(second.do('q', lambda: 'recomputed'), ('answer', True))
+
+    def test_waiters_stop_waiting_for_a_stuck_leader(self):
+        stuck = SingleFlight(shared=True, lock_timeout=0.05, poll_interval=0.01)
+        digest = hashlib.sha256(b'q').hexdigest()
+        cache.add(f'singleflight:lock:{digest}', 1, 60)
+        self.assertEqual(stuck.do('q', lambda: 'own'), ('own', False))
+
+
+class ContendedBackend(LocalMemoryBackend):
+    """Every write loses the compare-and-set, as if another tab always got there first."""
+
+    def compare_and_set(self, key, token, data, ttl):
+        return False
+
+
+class AssistantTestCase(TestCase):
+    """Fresh providers, stores and rate limits for each test."""
+
+    def setUp(self):
+        cache.clear()
+        for cached in (get_llm, get_single_flight, get_conversation_store, get_admission_controller):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        AssistantRateThrottle.buckets.clear()
+
+    def ask(self, query, **data):
+        return self.client.post('/assistant/', {'query': query, **data}, content_type='application/json')
+
+
+class ExactAnswerTests(AssistantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('ai.search_index.VERSION_CHECK_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.library = KnowledgeBaseEntry.objects.create(
+            question='Where is the library?', answer='Next to the student center.', source='troy.edu'
+        )
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question('Where is the Library?!'), 'where library')
+        self.assertEqual(normalize_question('  where   IS the library '), 'where library')
+        self.assertNotEqual(normalize_question('What is the library?'), normalize_question('Where is the library?'))
+        self.assertEqual(normalize_question('Is it?'), 'is it')
+
+    @override_settings(ASSISTANT_LLM={'BACKEND': 'ai.llm.GeminiProvider', 'OPTIONS': {'api_key': None}})
+    def test_known_questions_skip_the_pipeline(self):
+        with mock.patch('ai.views.admitted_answer') as pipeline:
+            response = self.ask('where is the library')
+        pipeline.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'][0]['content'], 'Next to the student center.')
+        self.assertEqual(response.data['data'][0]['meta']['id'], self.library.pk)
+
+    def test_index_follows_writes_and_keeps_the_oldest(self):
+        self.assertEqual(exact_answer('Where is the library')[0], self.library.pk)
+        KnowledgeBaseEntry.objects.create(question='where is library', answer='Elsewhere.')
+        self.assertEqual(exact_answer('Where is the library')[0], self.library.pk)
+
+        self.library.delete()
+        self.assertEqual(exact_answer('Where is the library')[2], 'Elsewhere.')
+        self.assertIsNone(exact_answer('Where is the gym?'))
+
+
+@override_settings(ASSISTANT_LLM=FAKE_LLM)
+class ConversationTests(AssistantTestCase):
+
+    def test_first_turn_is_recorded_under_the_returned_id(self):
+        response = self.ask('Which courses are offered this fall?')
+        self.assertEqual(response.status_code, 200)
+        conversation_id = response.data['conversation_id']
+
+        turns = get_conversation_store().load(conversation_id).turns
+        self.assertEqual([turn.query for turn in turns], ['Which courses are offered this fall?'])
+
+        self.ask('And in the spring?', conversation_id=conversation_id)
+        turns = get_conversation_store().load(conversation_id).turns
+        self.assertEqual(len(turns), 2)
+
+    def test_session_key_is_never_exposed(self):
+        session = self.client.session
+        session['seen'] = True
+        session.save()
+
+        response = self.ask('Which courses are offered this fall?')
+        conversation_id = response.data['conversation_id']
+        self.assertEqual(conversation_id, session_conversation_id(session.session_key))
+        self.assertNotIn(session.session_key, response.content.decode())
+        self.assertFalse(Conversation.objects.filter(key=session.session_key).exists())
+        self.assertTrue(Conversation.objects.filter(key=conversation_id).exists())
+
+    @override_settings(ASSISTANT_CONVERSATIONS={'BACKEND': 'ai.tests.ContendedBackend'})
+    def test_conflict_keeps_the_answer(self):
+        with self.assertLogs('ai.assistant', 'WARNING'):
+            response = self.ask('Which courses are offered this fall?')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['degraded'])
+
+
+class ConversationStoreTests(TestCase):
+
+    def test_retries_after_a_concurrent_write(self):
+        store = ConversationStore(LocalMemoryBackend(), history_size=2)
+        store.update('c1', lambda conversation: conversation.add_turn('first', 'answer'))
+        calls = []
+
+        def mutate(conversation):
+            calls.append(len(conversation.turns))
+            if len(calls) == 1:
+                # Another request saves its turn between our read and write.
+                store.update('c1', lambda other: other.add_turn('second', 'answer'))
+            conversation.add_turn('third', 'answer')
+
+        store.update('c1', mutate)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual([turn.query for turn in store.load('c1').turns], ['second', 'third'])
+
+    def test_round_trip_and_corrupt_records(self):
+        store = ConversationStore(LocalMemoryBackend())
+        store.update('c1', lambda conversation: (
+            conversation.remember({'course_code': 'CS3310'}), conversation.add_turn('q' * 5000, 'a', 'course_info')
+        ))
+        conversation = store.load('c1')
+        self.assertEqual(conversation.user_data, {'course_code': 'CS3310'})
+        self.assertEqual(len(conversation.turns[0].query), 2000)
+        self.assertEqual(list(decode(b'\x01\x05garbage').turns), [])
+
+
+class AssistantFallbackTests(AssistantTestCase):
+
+    def assert_degraded(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['degraded'])
+        self.assertTrue(response.data['data'])
+        self.assertEqual(response['X-Trace-ID'], response.data['trace_id'])
+
+    @override_settings(ASSISTANT_LLM={'BACKEND': 'ai.llm.GeminiProvider', 'OPTIONS': {'api_key': None}})
+    def test_unconfigured_provider(self):
+        self.assert_degraded(self.ask('Which courses are offered this fall?'))
+
+    @override_settings(ASSISTANT_LLM={
+        'BACKEND': 'ai.llm.FakeProvider',
+        'OPTIONS': {'latency': 'constant', 'mean_ms': 0, 'failure_rate': 1.0, 'max_retries': 0},
+    })
+    def test_failing_provider(self):
+        self.assert_degraded(self.ask('Which courses are offered this fall?'))
+
+    def test_missing_query(self):
+        self.assertEqual(self.ask('  ').status_code, 400)
+
+    @override_settings(ASSISTANT_LLM={'BACKEND': 'ai.llm.GeminiProvider', 'OPTIONS': {'api_key': None}})
+    def test_degraded_answer_lists_local_data(self):
+        Building.objects.create(name='Math and Science Complex', code='MSCX', location='Main campus')
+        with self.assertLogs('ai.assistant', 'WARNING') as logs:
+            response = self.ask('Tell me about the MSCX building')
+        self.assert_degraded(response)
+        self.assertIn('Math and Science Complex', response.data['data'][0]['content'])
+        self.assertTrue(all(record.exc_info for record in logs.records if record.levelname == 'WARNING'))
+
+    @override_settings(ASSISTANT_LLM={'BACKEND': 'ai.llm.GeminiProvider', 'OPTIONS': {'api_key': None}})
+    def test_keyword_fallback_is_logged(self):
+        with self.assertLogs('ai.assistant', 'WARNING') as logs:
+            keywords = extract_keywords_with_gemini('tuition payment deadline')
+        self.assertEqual(keywords, ['tuition', 'payment', 'deadline'])
+        self.assertIn('Keyword extraction failed', logs.output[0])
+
+    def test_templated_answers(self):
+        rows = [{'name': f'Hall {number}', 'code': f'H{number}'} for number in range(7)]
+        answer = templated_answer('Buildings:', rows)
+        self.assertEqual(answer.splitlines()[:2], ['Buildings:', '- Hall 0 (H0)'])
+        self.assertEqual(answer.splitlines()[-1], '- and 2 more')
+        self.assertIn('Did you mean: Where is the library?', templated_answer('', {
+            'message': 'No match.', 'did_you_mean': ['Where is the library?'],
+        }))
+
+    def test_intent_keywords_match_whole_words(self):
+        self.assertEqual(classify_intent('where is classroom 101')['intent'], 'room_info')
+        self.assertEqual(classify_intent('list my classes')['intent'], 'course_info')
+        self.assertNotEqual(classify_intent('what is a subclass')['intent'], 'course_info')
+
+
+class AdmissionTests(AssistantTestCase):
+
+    def test_priority_lanes(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+        controller.acquire(PRIORITY_NORMAL)
+        order = []
+
+        def wait(priority):
+            controller.acquire(priority)
+            order.append(priority)
+            controller.release(0)
+
+        threads = [threading.Thread(target=wait, args=(priority,)) for priority in (PRIORITY_NORMAL, PRIORITY_HIGH)]
+        for thread in threads:
+            thread.start()
+            # Queue them in this order: the normal request first.
+            while len(controller.waiting) < threads.index(thread) + 1:
+                threading.Event().wait(0.001)
+        with self.assertRaises(Overloaded):
+            controller.acquire(PRIORITY_HIGH)
+
+        controller.release(0)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [PRIORITY_HIGH, PRIORITY_NORMAL])
+        self.assertEqual(controller.stats()['rejected'], 1)
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+        controller.acquire(PRIORITY_NORMAL)
+        with self.assertRaises(Overloaded) as raised:
+            controller.acquire(PRIORITY_HIGH)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(controller.stats()['timed_out'], 1)
+
+    def test_cache_hits_take_no_slot(self):
+        provider = AdmittedModel(FakeProvider(latency='constant', mean_ms=0))
+        model = CachedModel(provider, cache=LLMCache())
+        model.generate_content('Hello')
+        full = AdmissionController(max_in_flight=1, max_queue=0)
+        full.acquire(PRIORITY_HIGH)
+
+        with admission(controller=full):
+            self.assertEqual(model.generate_content('Hello').cached, True)
+            with self.assertRaises(Overloaded):
+                model.generate_content('Something new')
+
+    def test_slot_is_held_once_per_run(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=0)
+        provider = AdmittedModel(FakeProvider(latency='constant', mean_ms=0))
+        with admission(controller=controller):
+            provider.generate_content('first')
+            provider.generate_content('second')
+            self.assertEqual(controller.stats()['in_flight'], 1)
+        self.assertEqual(controller.stats()['in_flight'], 0)
+
+    @override_settings(
+        ASSISTANT_LLM=FAKE_LLM, ASSISTANT_ADMISSION={'MAX_IN_FLIGHT': 1, 'MAX_QUEUE': 0, 'BURST': 2, 'RATE': '1/h'}
+    )
+    def test_overload_and_rate_limit_get_429(self):
+        get_admission_controller().acquire(PRIORITY_HIGH)
+        response = self.ask('Which courses are offered this fall?')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.ask('Where is the library?').status_code, 429)
+        limited = self.ask('Where is the library?')
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreater(int(limited['Retry-After']), 60)
+
+
+class ScriptedProvider(BaseProvider):
+    """Raises or returns each of ``outcomes`` in turn, then answers ``'ok'``."""
+
+    def __init__(self, *outcomes, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        super().__init__(**kwargs)
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def call(self, prompt, generation_config, timeout):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 'ok'
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, None, None
+
+
+class ProviderTests(TestCase):
+
+    def test_retries_then_succeeds(self):
+        provider = ScriptedProvider(LLMTimeout('slow'), 'answer', max_retries=2)
+        completion = provider.generate_content('prompt')
+        self.assertEqual((completion.text, completion.attempts), ('answer', 2))
+        self.assertEqual(provider.breaker.failures, 0)
+
+    def test_exhausted_retries_count_once(self):
+        provider = ScriptedProvider(*[LLMTimeout('slow')] * 3, max_retries=2)
+        with self.assertRaises(LLMError):
+            provider.generate_content('prompt')
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(provider.breaker.failures, 1)
+
+    def test_upstream_errors_open_the_breaker(self):
+        provider = ScriptedProvider(*[LLMError('rejected')] * 2, failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with self.assertRaises(LLMError):
+                provider.generate_content('prompt')
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(provider.breaker.state, 'open')
+        with self.assertRaises(CircuitOpen):
+            provider.generate_content('prompt')
+        self.assertEqual(provider.calls, 2)
+
+    def test_probe_closes_the_breaker(self):
+        provider = ScriptedProvider(LLMError('rejected'), failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(LLMError):
+            provider.generate_content('prompt')
+        self.assertEqual(provider.breaker.state, 'half_open')
+        self.assertEqual(provider.generate_content('prompt').text, 'ok')
+        self.assertEqual(provider.breaker.state, 'closed')
+
+    def test_local_congestion_is_not_an_upstream_failure(self):
+        provider = ScriptedProvider(max_concurrency=1, failure_threshold=1)
+        provider.slots.acquire()
+        with self.assertRaises(SlotTimeout):
+            provider.generate_content('prompt', timeout=0.01)
+        self.assertEqual(provider.calls, 0)
+        self.assertEqual(provider.breaker.state, 'closed')
+
+    def test_our_own_bugs_are_not_counted(self):
+        provider = ScriptedProvider(ValueError('bad prompt'), failure_threshold=1)
+        with self.assertRaises(ValueError):
+            provider.generate_content('prompt')
+        self.assertEqual(provider.breaker.state, 'closed')
+
+    @override_settings(ASSISTANT_LLM={**FAKE_LLM, 'MODEL': 'test-model'})
+    def test_get_llm_reads_settings(self):
+        get_llm.cache_clear()
+        self.addCleanup(get_llm.cache_clear)
+        provider = get_llm()
+        self.assertIsInstance(provider, FakeProvider)
+        self.assertEqual(provider.model_name, 'fake/test-model')
+        self.assertIs(get_llm(), provider)
+
+    def test_fake_provider_answers_intent_prompts(self):
+        provider = FakeProvider(latency='constant', mean_ms=0)
+        text = provider.generate_content('respond with ONLY a JSON object\nQuery: "where is room 101"').text
+        self.assertEqual(json.loads(text)['intent'], 'room_info')
+
+
+class Blocked:
+    """A response whose text can't be read, like a safety-blocked Gemini reply."""
+
+    @property
+    def text(self):
+        raise ValueError('blocked')
+
+
+class LLMCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = LLMCache()
+        self.provider = ScriptedProvider('first', 'second', 'third')
+        self.model = CachedModel(self.provider, cache=self.cache)
+
+    def test_identical_prompts_are_answered_from_the_table(self):
+        self.assertEqual(self.model.generate_content('classify: library').text, 'first')
+        hit = self.model.generate_content('classify: library')
+        self.assertEqual((hit.text, hit.cached), ('first', True))
+        self.assertEqual(self.provider.calls, 1)
+
+        # A new worker shares the stored answer.
+        other_worker = CachedModel(ScriptedProvider('other'), cache=LLMCache())
+        self.assertEqual(other_worker.generate_content('classify: library').text, 'first')
+
+        self.assertEqual(self.model.generate_content('classify: library', {'temperature': 0.5}).text, 'second')
+        self.assertEqual(self.model.generate_content('classify: gym').text, 'third')
+        self.assertEqual(self.provider.calls, 3)
+
+    def test_expired_and_unreadable_responses_are_misses(self):
+        self.model.generate_content('prompt')
+        LLMResponse.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.model.generate_content('prompt').text, 'second')
+
+        blocked = mock.Mock(model_name='blocked')
+        blocked.generate_content.return_value = Blocked()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.cache.generate(blocked, 'unsafe prompt')
+        self.assertEqual(blocked.generate_content.call_count, 2)
+
+    def test_hits_are_counted_in_batches(self):
+        self.model.generate_content('prompt')
+        for _ in range(3):
+            self.model.generate_content('prompt')
+        self.assertEqual(LLMResponse.objects.get().hits, 0)
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics['process']['hits'], metrics['process']['misses']), (3, 1))
+        self.assertEqual((metrics['stored']['entries'], metrics['stored']['hits']), (1, 3))
+        self.assertEqual(LLMResponse.objects.get().hits, 3)
+
+
+class InstrumentationTests(AssistantTestCase):
+
+    @override_settings(ASSISTANT_LLM=FAKE_LLM)
+    def test_request_log_and_trace_id(self):
+        with self.assertLogs('ai.assistant', 'INFO') as logs:
+            response = self.client.post(
+                '/assistant/', {'query': 'Which courses are offered this fall?'},
+                content_type='application/json', HTTP_X_REQUEST_ID='trace-1234',
+            )
+        self.assertEqual(response['X-Trace-ID'], 'trace-1234')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['trace_id'], line['outcome']), ('trace-1234', 'ok'))
+        stages = [stage['stage'] for stage in line['stages']]
+        self.assertIn('intent', stages)
+        self.assertIn('generation', stages)
+        # Each LLM call is attributed to the stage that made it.
+        self.assertTrue(line['llm_calls'])
+        self.assertLessEqual({call['stage'] for call in line['llm_calls']}, set(stages))
+
+    @override_settings(ASSISTANT_LLM={'BACKEND': 'ai.llm.GeminiProvider', 'OPTIONS': {'api_key': None}})
+    def test_metrics_without_a_provider(self):
+        with self.assertNoLogs('ai.assistant', 'ERROR'):
+            response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE assistant_llm_circuit_open gauge', body)
+        self.assertNotIn('assistant_llm_circuit_open{', body)
+        self.assertIn('assistant_admission_requests{state="in_flight"}', body)
+
+    @override_settings(ASSISTANT_LLM=FAKE_LLM)
+    def test_metrics_report_the_breaker(self):
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('assistant_llm_circuit_open{model="fake/gemini-1.5-flash"} 0', body)
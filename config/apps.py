@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ProjectConfig(AppConfig):
+    """Project-wide setup that belongs to no single app."""
+    name = 'config'
+
+    def ready(self):
+        # Connects the per-connection SQLite pragmas (SQLITE_PRAGMAS).
+        from . import sqlite  # noqa: F401
@@ -0,0 +1,232 @@
+"""
+Two-tier cache backend: a small per-process LRU in front of a shared cache.
+
+Every worker keeps recently used values in memory for a few seconds, so hot
+keys cost no network round trip, while the shared tier (Redis in production,
+``FileCache`` on local disk otherwise) keeps workers consistent. Keys listed in ``LOCAL_EXCLUDE`` always go to the shared tier;
+use it for version counters that other workers bump.
+
+Keys are namespaced by their first ``:``-separated segment (``kb:search:...``
+belongs to ``kb``), and hits and misses are counted per namespace.
+"""
+import itertools
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+MISSING = object()
+
+
+def namespace_of(key):
+    return key.split(':', 1)[0] if ':' in key else ''
+
+
+class FileCache(FileBasedCache):
+    """
+    ``FileBasedCache`` that checks whether to cull on every ``CULL_EVERY``-th
+    write (``OPTIONS``, default 100) instead of on each one. The stock check
+    lists the whole cache directory, which made every ``set`` cost a
+    directory scan. ``MAX_ENTRIES`` may be overshot by up to ``CULL_EVERY``
+    files per process between checks.
+    """
+
+    def __init__(self, dir, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.cull_every = max(1, int(options.pop('CULL_EVERY', 100)))
+        super().__init__(dir, {**params, 'OPTIONS': options})
+        self.writes = itertools.count(1)
+
+    def _cull(self):
+        if next(self.writes) % self.cull_every == 0:
+            super()._cull()
+
+
+class TieredCache(BaseCache):
+    """
+    ``OPTIONS``:
+
+    - ``SHARED``: alias of the shared cache in ``CACHES`` (default ``'shared'``)
+    - ``LOCAL_MAX_ENTRIES``: size of the in-process LRU (default 1000)
+    - ``LOCAL_TIMEOUT``: seconds a value may be served from memory (default 5)
+    - ``LOCAL_EXCLUDE``: key prefixes never held in memory
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.shared_alias = options.pop('SHARED', 'shared')
+        self.local_max_entries = options.pop('LOCAL_MAX_ENTRIES', 1000)
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        self.local_exclude = tuple(options.pop('LOCAL_EXCLUDE', ()))
+        super().__init__({**params, 'OPTIONS': options})
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = Counter()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def resolve_timeout(self, timeout):
+        # Passed on to the shared tier as seconds, not as an expiry time.
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def cacheable_locally(self, key):
+        return not key.startswith(self.local_exclude)
+
+    def count(self, key, event, n=1):
+        self.counters[namespace_of(key), event] += n
+
+    def stats(self):
+        """Per-namespace counters: local_hits, shared_hits, misses and sets."""
+        result = {}
+        for (namespace, event), value in list(self.counters.items()):
+            result.setdefault(namespace, Counter())[event] = value
+        return {namespace: dict(counts) for namespace, counts in result.items()}
+
+    def reset_stats(self):
+        self.counters.clear()
+
+    # In-process tier. Values are pickled, as in LocMemCache, so callers
+    # can't mutate what other requests will read.
+
+    def local_get(self, full_key):
+        with self.lock:
+            entry = self.local.get(full_key)
+            if entry is None:
+                return MISSING
+            expires, pickled = entry
+            if expires < time.monotonic():
+                del self.local[full_key]
+                return MISSING
+            self.local.move_to_end(full_key)
+        return pickle.loads(pickled)
+
+    def local_set(self, full_key, value, timeout):
+        local_timeout = self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+        if local_timeout <= 0:
+            self.local_delete(full_key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.local[full_key] = (time.monotonic() + local_timeout, pickled)
+            self.local.move_to_end(full_key)
+            while len(self.local) > self.local_max_entries:
+                self.local.popitem(last=False)
+
+    def local_delete(self, full_key):
+        with self.lock:
+            self.local.pop(full_key, None)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        if self.cacheable_locally(key):
+            value = self.local_get(full_key)
+            if value is not MISSING:
+                self.count(key, 'local_hits')
+                return value
+        value = self.shared.get(key, MISSING, version=self.version if version is None else version)
+        if value is MISSING:
+            self.count(key, 'misses')
+            return default
+        self.count(key, 'shared_hits')
+        if self.cacheable_locally(key):
+            self.local_set(full_key, value, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        version = self.version if version is None else version
+        found = {}
+        remote = []
+        for key in keys:
+            value = MISSING
+            if self.cacheable_locally(key):
+                value = self.local_get(self.make_and_validate_key(key, version=version))
+            if value is MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+                self.count(key, 'local_hits')
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            for key in remote:
+                if key in fetched:
+                    self.count(key, 'shared_hits')
+                    if self.cacheable_locally(key):
+                        self.local_set(self.make_key(key, version=version), fetched[key], self.local_timeout)
+                else:
+                    self.count(key, 'misses')
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self.version if version is None else version
+        full_key = self.make_and_validate_key(key, version=version)
+        timeout = self.resolve_timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self.count(key, 'sets')
+        if self.cacheable_locally(key):
+            self.local_set(full_key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self.version if version is None else version
+        timeout = self.resolve_timeout(timeout)
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self.count(key, 'sets')
+            full_key = self.make_and_validate_key(key, version=version)
+            if key in failed or not self.cacheable_locally(key):
+                self.local_delete(full_key)
+            else:
+                self.local_set(full_key, value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self.version if version is None else version
+        full_key = self.make_and_validate_key(key, version=version)
+        timeout = self.resolve_timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.count(key, 'sets')
+            if self.cacheable_locally(key):
+                self.local_set(full_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self.version if version is None else version
+        self.local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, self.resolve_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        version = self.version if version is None else version
+        self.local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        version = self.version if version is None else version
+        keys = list(keys)
+        for key in keys:
+            self.local_delete(self.make_and_validate_key(key, version=version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        version = self.version if version is None else version
+        self.local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
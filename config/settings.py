@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'config',
     'university',
     'corsheaders',
     'user',
@@ -85,6 +88,72 @@ DATABASES = {
     }
 }
 
+# SQLITE_PROFILE=production tunes SQLite for serving (config/sqlite.py): WAL
+# and pragmas applied per connection, persistent connections, IMMEDIATE write
+# transactions, and reads routed to a query-only 'read' connection to the
+# same file. The default profile is Django's stock setup.
+
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+
+SQLITE_PRAGMAS = {}
+
+if SQLITE_PROFILE == 'production':
+    SQLITE_BASE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,  # KiB, i.e. 64 MiB per connection
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,  # ms
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
+    SQLITE_PRAGMAS = {
+        'default': SQLITE_BASE_PRAGMAS,
+        'read': {**SQLITE_BASE_PRAGMAS, 'query_only': 'ON'},
+    }
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 5},
+    })
+    DATABASES['read'] = {
+        **DATABASES['default'],
+        'OPTIONS': {'timeout': 5},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['config.sqlite.ReadWriteRouter']
+
+
+# Caches
+# 'default' is two-tiered (config/cache.py): a short-lived per-process LRU in
+# front of 'shared', which every worker sees. 'shared' is Redis when
+# CACHE_URL is set and otherwise files under CACHE_DIR, which the workers
+# of one host share. Version counters stay out of the in-process tier so
+# bumps are seen immediately.
+
+CACHE_URL = os.environ.get('CACHE_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'config.cache.TieredCache',
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'LOCAL_EXCLUDE': ('catalog:version:', 'kb:version', 'singleflight:'),
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'config.cache.FileCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_EVERY': 100},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -131,4 +200,100 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 ALLOWED_HOSTS = ['*']
 
 
+# Django REST framework
+# List endpoints are cursor-paginated; see university/pagination.py
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'university.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+
 CORS_ALLOW_ALL_ORIGINS = True
+
+
+# University assistant conversations, keyed by conversation id or session.
+# DatabaseBackend works across workers out of the box; RedisBackend (with
+# OPTIONS {'url': ...}) is faster when Redis is available.
+
+ASSISTANT_CONVERSATIONS = {
+    'BACKEND': 'ai.conversation.DatabaseBackend',
+    'HISTORY_SIZE': 3,
+    'TTL': 60 * 60,
+}
+
+
+# LLM provider for the university assistant (see ai/llm.py). Set
+# ASSISTANT_LLM_BACKEND=ai.llm.FakeProvider to run without the Gemini API,
+# e.g. for load tests; FakeProvider OPTIONS configure its latency.
+
+ASSISTANT_LLM = {
+    'BACKEND': os.environ.get('ASSISTANT_LLM_BACKEND', 'ai.llm.GeminiProvider'),
+    'MODEL': 'gemini-1.5-flash',
+    'OPTIONS': {
+        'api_key': os.environ.get('GEMINI_API_KEY'),
+        'timeout': 30,
+        'max_retries': 2,
+        'max_concurrency': 8,
+        # Circuit breaker: fail fast after this many failed calls in a row,
+        # probing again after reset_timeout seconds.
+        'failure_threshold': 5,
+        'reset_timeout': 30,
+    },
+}
+
+# Latency budgets in seconds for the assistant's LLM stages, within an
+# overall deadline per request. A stage that overruns or fails degrades the
+# request to local classification and templated answers (ai/fallback.py).
+
+ASSISTANT_BUDGETS = {
+    'TOTAL': 15,
+    'INTENT': 4,
+    'KEYWORDS': 2,
+    'GENERATION': 8,
+}
+
+# Concurrent identical assistant queries share one pipeline run (see
+# ai/singleflight.py); SHARED extends this across workers via the cache.
+# The cross-worker lock is cache.add(), which is only atomic on Redis, so
+# SHARED is on only when CACHE_URL is set.
+
+ASSISTANT_SINGLE_FLIGHT = {
+    'SHARED': bool(CACHE_URL),
+    'LOCK_TIMEOUT': 30,
+    'RESULT_TTL': 5,
+}
+
+# Admission control for /assistant/ (see ai/admission.py), per worker:
+# a token bucket per client, and a cap on concurrent LLM pipeline runs with
+# a bounded wait queue. Over either limit the request gets a 429.
+
+ASSISTANT_ADMISSION = {
+    'RATE': '30/min',
+    'BURST': 10,
+    'MAX_IN_FLIGHT': 8,
+    'MAX_QUEUE': 32,
+    'QUEUE_TIMEOUT': 10,
+}
+
+
+# Logging: the assistant writes one JSON line per request (per-stage
+# timings, query counts, LLM sizes) to the ai.assistant logger. Under
+# `manage.py test` it is quiet unless ASSISTANT_LOG_LEVEL says otherwise.
+
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ai.assistant': {
+            'handlers': ['console'],
+            'level': os.environ.get('ASSISTANT_LOG_LEVEL', 'CRITICAL' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
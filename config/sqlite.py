@@ -0,0 +1,60 @@
+"""
+SQLite tuning for deployments that serve from a single database file.
+
+With ``SQLITE_PROFILE=production`` (see settings) every new connection is
+set up by ``apply_pragmas`` with the ``SQLITE_PRAGMAS`` of its alias: the
+write-ahead log, so readers and the writer no longer block each other,
+``synchronous=NORMAL``, which is durable in WAL mode except against power
+loss, a larger page cache, memory-mapped reads and a busy timeout. The
+``config`` app connects ``apply_pragmas`` when it is ready.
+
+Writes go to ``default``, whose transactions start ``IMMEDIATE`` so a
+writer waits for the lock up front instead of failing with "database is
+locked" when a read transaction tries to upgrade. ``ReadWriteRouter``
+sends reads to the ``read`` alias, a second connection to the same file
+opened ``query_only``, so they never take the write lock. Both keep their
+connections between requests (``CONN_MAX_AGE``), which saves reopening
+the file and re-running the pragmas on every request.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+READ_DB_ALIAS = 'read'
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {}).get(connection.alias, {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class ReadWriteRouter:
+    """
+    Reads on the ``read`` alias, everything else on ``default``.
+
+    Inside a transaction on ``default`` reads stay there, so they see the
+    transaction's own uncommitted writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return READ_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .cache import FileCache, TieredCache
+from .sqlite import READ_DB_ALIAS, ReadWriteRouter
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        shared = {'BACKEND': 'config.cache.FileCache', 'LOCATION': self.tmp.name}
+        override = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'config.cache.TieredCache',
+                'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 60, 'LOCAL_EXCLUDE': ('catalog:version:',)},
+            },
+            'shared': shared,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.cache = caches['default']
+        # A second worker: its own in-process tier over the same directory.
+        self.other = TieredCache(None, {'OPTIONS': {'LOCAL_TIMEOUT': 60, 'LOCAL_EXCLUDE': ('catalog:version:',)}})
+
+    def test_hits_are_served_locally_then_shared(self):
+        self.cache.set('kb:search:x', [1, 2])
+        self.assertEqual(self.cache.get('kb:search:x'), [1, 2])
+        self.assertEqual(self.other.get('kb:search:x'), [1, 2])
+        self.assertEqual(self.other.get('kb:search:y'), None)
+        self.assertEqual(self.cache.stats()['kb'], {'sets': 1, 'local_hits': 1})
+        self.assertEqual(self.other.stats()['kb'], {'shared_hits': 1, 'misses': 1})
+
+    def test_local_values_are_copies(self):
+        self.cache.set('kb:search:x', [1, 2])
+        self.cache.get('kb:search:x').append(3)
+        self.assertEqual(self.cache.get('kb:search:x'), [1, 2])
+
+    def test_writes_invalidate_the_local_tier(self):
+        self.cache.set('kb:search:x', 'old')
+        self.cache.delete('kb:search:x')
+        self.assertIsNone(self.cache.get('kb:search:x'))
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_excluded_keys_are_always_read_from_the_shared_tier(self):
+        self.cache.set('catalog:version:course', 1)
+        self.cache.set('catalog:page', 'a')
+        self.assertEqual(self.other.get('catalog:version:course'), 1)
+        self.assertEqual(self.other.get('catalog:page'), 'a')
+        self.other.set('catalog:version:course', 2)
+        self.other.set('catalog:page', 'b')
+        # The version bump is seen at once; the page is stale until LOCAL_TIMEOUT.
+        self.assertEqual(self.cache.get('catalog:version:course'), 2)
+        self.assertEqual(self.cache.get('catalog:page'), 'a')
+
+    def test_local_timeout_caps_how_long_memory_is_trusted(self):
+        self.cache.set('catalog:page', 'a')
+        self.other.set('catalog:page', 'b')
+        with mock.patch('config.cache.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(self.cache.get('catalog:page'), 'b')
+
+    def test_add_and_get_many(self):
+        self.assertTrue(self.cache.add('kb:lock', 1))
+        self.assertFalse(self.other.add('kb:lock', 2))
+        self.cache.set_many({'kb:a': 1, 'kb:b': 2})
+        self.assertEqual(self.other.get_many(['kb:a', 'kb:b', 'kb:c']), {'kb:a': 1, 'kb:b': 2})
+
+
+class FileCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make(self, **options):
+        return FileCache(self.tmp.name, {'OPTIONS': options})
+
+    def test_culls_every_nth_write(self):
+        cache = self.make(MAX_ENTRIES=5, CULL_EVERY=10)
+        with mock.patch.object(cache, '_list_cache_files', wraps=cache._list_cache_files) as listed:
+            for i in range(20):
+                cache.set(f'k{i}', i)
+        self.assertEqual(listed.call_count, 2)
+        self.assertLessEqual(len(cache._list_cache_files()), 5 + 10)
+
+    def test_instances_share_the_directory(self):
+        self.make().set('k', 'v')
+        self.assertEqual(self.make().get('k'), 'v')
+
+
+class SQLiteProfileTests(TestCase):
+
+    def open(self, alias=DEFAULT_DB_ALIAS):
+        connection = connections.create_connection(alias)
+        self.addCleanup(connection.close)
+        return connection.cursor()
+
+    def test_receiver_is_connected_at_startup(self):
+        self.assertEqual(apps.get_app_config('config').name, 'config')
+        # In a fresh interpreter: this module has already imported config.sqlite.
+        script = 'import sys, django; django.setup(); print("config.sqlite" in sys.modules)'
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+        )
+        self.assertEqual(result.stdout.strip(), 'True')
+
+    def test_pragmas_apply_to_new_connections(self):
+        with override_settings(SQLITE_PRAGMAS={DEFAULT_DB_ALIAS: {'cache_size': -1234, 'query_only': 'ON'}}):
+            cursor = self.open()
+        self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone(), (-1234,))
+        self.assertEqual(cursor.execute('PRAGMA query_only').fetchone(), (1,))
+        self.assertEqual(self.open().execute('PRAGMA query_only').fetchone(), (0,))
+
+    def test_router_reads_from_the_read_alias_outside_transactions(self):
+        router = ReadWriteRouter()
+        self.assertEqual(router.db_for_write(None), DEFAULT_DB_ALIAS)
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'university'))
+        self.assertFalse(router.allow_migrate(READ_DB_ALIAS, 'university'))
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(None), READ_DB_ALIAS)
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(None), DEFAULT_DB_ALIAS)
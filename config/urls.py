@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from university import views
-from ai.views import university_assistant
+from ai.views import llm_cache_metrics, metrics, university_assistant
 from django.contrib import admin
 
 # Create a router and register our viewsets with it
@@ -63,4 +63,6 @@ urlpatterns = [
 urlpatterns += [
     path('api-auth/', include('rest_framework.urls')),
     path('assistant/', university_assistant, name='university-assistant'),
+    path('assistant/llm-cache/', llm_cache_metrics, name='llm-cache-metrics'),
+    path('metrics/', metrics, name='metrics'),
 ]
\ No newline at end of file
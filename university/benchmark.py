@@ -0,0 +1,245 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks run against a throwaway database (``scratch_database``), record
+latencies and SQL query counts, and store their results as JSON stamped
+with the git revision, so runs on two commits can be compared with
+``compare_reports``.
+"""
+import json
+import math
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection, connections
+
+# Caches for benchmark runs: the configured tiers, but in memory and empty
+# at the start of each run.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'config.cache.TieredCache',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_EXCLUDE': ('catalog:version:', 'kb:version', 'singleflight:')},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+}
+
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of ``values``; ``None`` when empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values, scale=1, digits=2):
+    """Count, mean, p50/p95/p99 and max of ``values``, multiplied by ``scale``."""
+    values = list(values)
+    if not values:
+        return {'count': 0}
+
+    def rounded(value):
+        return round(value * scale, digits)
+
+    return {
+        'count': len(values),
+        'mean': rounded(sum(values) / len(values)),
+        'p50': rounded(percentile(values, 50)),
+        'p95': rounded(percentile(values, 95)),
+        'p99': rounded(percentile(values, 99)),
+        'max': rounded(max(values)),
+    }
+
+
+class QueryCounter:
+    """Count SQL queries run on this thread's connections inside the block."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.count = 0
+        self.wrappers = ExitStack()
+        for alias in connections:
+            self.wrappers.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wrappers.__exit__(*exc_info)
+
+
+def timed(fn, *args, **kwargs):
+    """Run ``fn`` and return ``(result, seconds, queries)``."""
+    with QueryCounter() as queries:
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+    return result, elapsed, queries.count
+
+
+def run_concurrently(fn, items, workers):
+    """
+    Call ``fn(item)`` for every item from ``workers`` threads; returns the
+    results in item order. Each thread closes its database connections
+    when it runs out of work.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    position = iter(range(len(items)))
+    lock = threading.Lock()
+    errors = []
+
+    def work():
+        try:
+            while True:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    return
+                results[index] = fn(items[index])
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+@contextmanager
+def scratch_database():
+    """
+    Create an empty test database for the duration of the block, so real
+    data is never touched. SQLite test databases are put in a temporary
+    file rather than in memory, so worker threads see the same data and
+    lock it the way a deployment would. Aliases configured as test mirrors
+    of ``default`` use the scratch database too.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    tmpdir = None
+    if connection.vendor == 'sqlite' and not old_test_name:
+        tmpdir = tempfile.TemporaryDirectory(prefix='bench-')
+        test_settings['NAME'] = str(Path(tmpdir.name) / 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    mirrors = {
+        alias: connections[alias].settings_dict['NAME'] for alias in connections
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias
+    }
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        for alias, name in mirrors.items():
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+def git_revision():
+    """Short hash of HEAD, suffixed with ``-dirty`` for uncommitted changes."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{revision}-dirty' if dirty else revision
+
+
+def report_header(name, options):
+    return {
+        'benchmark': name,
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'options': options,
+    }
+
+
+def default_report_path(name):
+    revision = git_revision() or 'unknown'
+    return Path(settings.BASE_DIR) / 'benchmarks' / f'{name}-{revision}.json'
+
+
+def write_report(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    return path
+
+
+def read_report(path):
+    try:
+        with open(path) as report:
+            return json.load(report)
+    except (OSError, ValueError) as exc:
+        raise CommandError(f'Cannot read {path}: {exc}')
+
+
+def flatten(report, prefix=''):
+    """``{'a': {'b': 1}}`` -> ``{'a.b': 1}``, numeric leaves only."""
+    flat = {}
+    for key, value in report.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_reports(old, new, metrics=('p95', 'mean', 'throughput_rps'), threshold=0.1):
+    """
+    Rows of ``(metric, old, new, relative change)`` for the numeric results
+    present in both reports whose last path segment is in ``metrics`` and
+    which moved by more than ``threshold``.
+    """
+    before = flatten(old.get('results', {}))
+    after = flatten(new.get('results', {}))
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        if name.rsplit('.', 1)[-1] not in metrics:
+            continue
+        old_value, new_value = before[name], after[name]
+        if old_value == new_value:
+            continue
+        change = (new_value - old_value) / old_value if old_value else math.inf
+        if abs(change) > threshold:
+            rows.append((name, old_value, new_value, change))
+    return rows
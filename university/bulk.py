@@ -0,0 +1,430 @@
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .caching import bump_versions
+from .expertise import index_faculty
+from .models import CourseOffering, Enrollment, Transcript
+from .signals import CATALOG_MODELS
+from .trigram import INDEXED_FIELDS, bump_names
+
+MAX_BATCH_SIZE = 5000
+# Rows per INSERT/UPDATE statement and per ``IN (...)`` lookup; kept under
+# SQLite's bound-parameter limit.
+WRITE_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 900
+USER_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+class BulkEntry:
+    """One item of a batch: its position, the unsaved instance and any errors."""
+
+    def __init__(self, index, instance=None, user=None):
+        self.index = index
+        self.instance = instance
+        self.user = user
+        self.provided = []
+        self.user_provided = []
+        # Field values before an update, for hooks that move counters.
+        self.original = {}
+        self.errors = {}
+
+    def add_errors(self, errors, prefix=None):
+        target = self.errors.setdefault(prefix, {}) if prefix else self.errors
+        for field, messages in errors.items():
+            target.setdefault(field, []).extend(messages)
+
+
+def chunked(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class BulkWriter:
+    """
+    Validate and write a batch of plain dicts for one model.
+
+    Field-level validation runs per item without touching the database.
+    Foreign keys and uniqueness are then checked with one query per field
+    (per chunk) for the whole batch, and every valid item is written with
+    ``bulk_create``/``bulk_update`` in a single transaction. Invalid items
+    are reported by index and skipped; they never abort the batch.
+
+    Models with a ``user`` one-to-one take a nested ``user`` object. Users
+    are created in bulk with unusable passwords, skipping the per-row
+    password hashing of ``create_user``; people set a password through the
+    normal reset flow.
+    """
+
+    def __init__(self, model, fields, user_field=None):
+        self.model = model
+        self.user_field = user_field
+        opts = model._meta
+        self.fields = {}
+        for name in fields:
+            field = opts.get_field(name)
+            self.fields[field.attname] = field
+
+    # Entry points
+
+    def create(self, items):
+        entries = [self.build(index, item) for index, item in enumerate(items)]
+        self.check_relations(entries, partial=False)
+        self.check_unique(entries)
+        valid = [entry for entry in entries if not entry.errors]
+
+        with transaction.atomic():
+            if self.user_field:
+                User.objects.bulk_create([entry.user for entry in valid], batch_size=WRITE_BATCH_SIZE)
+                for entry in valid:
+                    setattr(entry.instance, self.user_field, entry.user)
+            self.model.objects.bulk_create(
+                [entry.instance for entry in valid], batch_size=WRITE_BATCH_SIZE
+            )
+            self.after_create(valid)
+        self.invalidate(valid)
+        return entries
+
+    def update(self, items):
+        entries = []
+        ids = []
+        invalid = set()
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if pk is not None:
+                try:
+                    pk = self.model._meta.pk.to_python(pk)
+                except ValidationError:
+                    invalid.add(index)
+                    pk = None
+            ids.append(pk)
+        queryset = self.model.objects.all()
+        if self.user_field:
+            queryset = queryset.select_related(self.user_field)
+        instances = {}
+        for chunk in chunked({pk for pk in ids if pk is not None}):
+            instances.update(queryset.in_bulk(chunk))
+        seen = Counter(ids)
+
+        for index, (item, pk) in enumerate(zip(items, ids)):
+            instance = instances.get(pk)
+            if index in invalid:
+                entry = BulkEntry(index)
+                entry.add_errors({'id': ['A valid integer is required.']})
+                entries.append(entry)
+                continue
+            if pk is None or instance is None or seen[pk] > 1:
+                entry = BulkEntry(index)
+                message = 'This field is required.' if pk is None else (
+                    'Not found.' if instance is None else 'Duplicate id in batch.'
+                )
+                entry.add_errors({'id': [message]})
+                entries.append(entry)
+                continue
+            entries.append(self.build(index, item, instance=instance))
+
+        self.check_relations(entries, partial=True)
+        self.check_unique(entries)
+        valid = [entry for entry in entries if not entry.errors]
+
+        with transaction.atomic():
+            fields = sorted({self.fields[attname].name for entry in valid for attname in entry.provided})
+            if fields:
+                self.model.objects.bulk_update(
+                    [entry.instance for entry in valid if entry.provided],
+                    fields, batch_size=WRITE_BATCH_SIZE
+                )
+            user_fields = sorted({name for entry in valid for name in entry.user_provided})
+            if user_fields:
+                User.objects.bulk_update(
+                    [entry.user for entry in valid if entry.user_provided],
+                    user_fields, batch_size=WRITE_BATCH_SIZE
+                )
+            self.after_update([entry for entry in valid if entry.provided], fields)
+        self.invalidate(valid, fields, user_fields)
+        return entries
+
+    def after_create(self, entries):
+        """Hook for denormalized counters kept up to date by single-object writes."""
+
+    def after_update(self, entries, fields):
+        """Like ``after_create``, for the entries whose ``fields`` were rewritten."""
+
+    # Per-item validation
+
+    def build(self, index, item, instance=None):
+        partial = instance is not None
+        entry = BulkEntry(index, instance if partial else self.model())
+        if not isinstance(item, dict):
+            entry.add_errors({'non_field_errors': ['Expected an object.']})
+            return entry
+
+        if partial:
+            entry.original = {attname: getattr(instance, attname) for attname in self.fields}
+
+        allowed = set(self.fields) | {'id'} | ({self.user_field} if self.user_field else set())
+        for key in set(item) - allowed:
+            entry.add_errors({key: ['Unknown field.']})
+
+        for attname, field in self.fields.items():
+            if attname not in item:
+                continue
+            value = item[attname]
+            if field.is_relation and value is not None:
+                try:
+                    value = field.target_field.to_python(value)
+                except ValidationError as exc:
+                    entry.add_errors({attname: exc.messages})
+                    continue
+            setattr(entry.instance, attname, value)
+            entry.provided.append(attname)
+
+        # Relations are checked for the whole batch in check_relations().
+        exclude = [field.name for field in self.model._meta.concrete_fields if field.is_relation]
+        if partial:
+            exclude += [
+                field.name for field in self.model._meta.concrete_fields
+                if field.attname not in entry.provided
+            ]
+        try:
+            entry.instance.clean_fields(exclude=exclude)
+        except ValidationError as exc:
+            entry.add_errors(exc.message_dict)
+
+        if self.user_field:
+            self.build_user(entry, item, partial)
+        return entry
+
+    def build_user(self, entry, item, partial):
+        data = item.get(self.user_field)
+        if data is None and partial:
+            entry.user = getattr(entry.instance, self.user_field)
+            return
+        if not isinstance(data, dict):
+            entry.add_errors({self.user_field: ['Expected an object.']})
+            return
+
+        for key in set(data) - set(USER_FIELDS):
+            message = ('Passwords cannot be set in bulk.' if key == 'password' else 'Unknown field.')
+            entry.add_errors({key: [message]}, prefix=self.user_field)
+
+        if partial:
+            user = getattr(entry.instance, self.user_field)
+        else:
+            user = User(password=make_password(None))
+        for name in USER_FIELDS:
+            if name in data:
+                setattr(user, name, data[name])
+                entry.user_provided.append(name)
+        entry.user = user
+
+        if not partial and not user.email:
+            entry.add_errors({'email': ['This field is required.']}, prefix=self.user_field)
+        exclude = ['password', 'last_login', 'date_joined']
+        if partial:
+            exclude += [name for name in USER_FIELDS if name not in entry.user_provided]
+        try:
+            user.clean_fields(exclude=exclude)
+        except ValidationError as exc:
+            entry.add_errors(exc.message_dict, prefix=self.user_field)
+
+    # Batch validation
+
+    def check_relations(self, entries, partial):
+        for attname, field in self.fields.items():
+            if not field.is_relation:
+                continue
+            pending = [entry for entry in entries if not entry.errors]
+            if partial:
+                pending = [entry for entry in pending if attname in entry.provided]
+            ids = {getattr(entry.instance, attname) for entry in pending} - {None}
+            existing = set()
+            for chunk in chunked(ids):
+                existing.update(
+                    field.related_model._default_manager.filter(pk__in=chunk).values_list('pk', flat=True)
+                )
+            for entry in pending:
+                value = getattr(entry.instance, attname)
+                if value is None:
+                    if not field.null:
+                        entry.add_errors({attname: ['This field is required.']})
+                elif value not in existing:
+                    entry.add_errors({attname: [f'Invalid pk "{value}" - object does not exist.']})
+
+    def check_unique(self, entries):
+        opts = self.model._meta
+        for attname, field in self.fields.items():
+            if field.unique and not field.primary_key:
+                self.check_unique_together(entries, self.model, [attname], [attname])
+        for together in opts.unique_together:
+            attnames = [opts.get_field(name).attname for name in together]
+            if any(name in self.fields for name in attnames):
+                self.check_unique_together(entries, self.model, attnames, list(together))
+        if self.user_field:
+            self.check_unique_together(entries, User, ['username'], ['username'], on_user=True)
+
+    def check_unique_together(self, entries, model, attnames, label, on_user=False):
+        """Reject items that clash with each other or with existing rows."""
+        pending = []
+        for entry in entries:
+            if entry.errors:
+                continue
+            target = entry.user if on_user else entry.instance
+            provided = entry.user_provided if on_user else entry.provided
+            if entry.instance.pk is not None and not any(name in provided for name in attnames):
+                continue
+            pending.append((entry, target, tuple(getattr(target, name) for name in attnames)))
+
+        message = f"{model._meta.verbose_name.capitalize()} with this {', '.join(label)} already exists."
+        counts = Counter(key for _, _, key in pending)
+        existing = {}
+        keys = [key for key in counts if None not in key]
+        for chunk in chunked(keys, LOOKUP_CHUNK_SIZE // len(attnames)):
+            condition = Q()
+            for key in chunk:
+                condition |= Q(**dict(zip(attnames, key)))
+            for row in model._default_manager.filter(condition).values_list(*attnames, 'pk'):
+                existing[tuple(row[:-1])] = row[-1]
+
+        seen = set()
+        for entry, target, key in pending:
+            clash = key in existing and existing[key] != target.pk
+            if clash or (counts[key] > 1 and key in seen):
+                errors = {label[-1] if len(label) == 1 else 'non_field_errors': [message]}
+                entry.add_errors(errors, prefix=self.user_field if on_user else None)
+            seen.add(key)
+
+    def invalidate(self, entries, fields=None, user_fields=None):
+        """Bump versions after a write; ``fields`` are what an update rewrote, ``None`` after a create."""
+        if not entries:
+            return
+        written = {self.model: fields}
+        if self.user_field:
+            written[User] = user_fields
+        bump_versions(*[model for model in written if model in CATALOG_MODELS])
+        renamed = [
+            model for model, names in written.items()
+            if model in INDEXED_FIELDS and (names is None or set(names) & set(INDEXED_FIELDS[model]))
+        ]
+        if renamed:
+            bump_names(*renamed)
+
+
+class EnrollmentBulkWriter(BulkWriter):
+    """
+    Keeps ``CourseOffering.enrolled`` in step, as the ``enroll`` action does,
+    and transcripts in step with grade changes, as ``update_grade`` does.
+    """
+    transcript_fields = {'student', 'grade', 'status', 'credits_attempted', 'credits_earned'}
+
+    def after_create(self, entries):
+        added = Counter(entry.instance.course_offering_id for entry in entries)
+        self.move_enrolled(added)
+
+    def after_update(self, entries, fields):
+        if 'course_offering' in fields:
+            moved = Counter()
+            for entry in entries:
+                old, new = entry.original['course_offering_id'], entry.instance.course_offering_id
+                if old != new:
+                    moved[old] -= 1
+                    moved[new] += 1
+            self.move_enrolled(moved)
+        if self.transcript_fields & set(fields):
+            students = {entry.instance.student_id for entry in entries}
+            students |= {entry.original['student_id'] for entry in entries}
+            self.update_transcripts(students)
+
+    def move_enrolled(self, changes):
+        for offering_id, count in changes.items():
+            if count:
+                CourseOffering.objects.filter(pk=offering_id).update(enrolled=F('enrolled') + count)
+
+    def update_transcripts(self, student_ids):
+        """``Transcript.update_transcript()`` for many students, a chunk at a time."""
+        now = timezone.now()
+        for chunk in chunked(student_ids):
+            totals = {
+                row['student_id']: row for row in Enrollment.objects.filter(student_id__in=chunk)
+                .values('student_id').annotate(attempted=Sum('credits_attempted'), earned=Sum('credits_earned'))
+            }
+            transcripts = list(Transcript.objects.filter(student_id__in=chunk))
+            for transcript in transcripts:
+                row = totals.get(transcript.student_id, {})
+                transcript.total_credits_attempted = row.get('attempted') or 0
+                transcript.total_credits_earned = row.get('earned') or 0
+                transcript.last_updated = now
+            Transcript.objects.bulk_update(
+                transcripts, ['total_credits_attempted', 'total_credits_earned', 'last_updated'],
+                batch_size=WRITE_BATCH_SIZE
+            )
+
+
+class FacultyBulkWriter(BulkWriter):
+    """Keeps the research-expertise index in step, as ``Faculty.save()`` does."""
+
+    def after_create(self, entries):
+        index_faculty(entry.instance for entry in entries)
+
+    def after_update(self, entries, fields):
+        if {'research_interests', 'bio'} & set(fields):
+            index_faculty(entry.instance for entry in entries)
+
+
+class BulkWriteMixin:
+    """
+    Add ``POST``/``PATCH <resource>/bulk/`` taking a JSON array of objects.
+
+    ``POST`` creates every valid item; ``PATCH`` updates existing rows by
+    ``id`` with the fields given. The response lists a result per item,
+    in request order, and is a 207 when some items were rejected.
+    """
+    bulk_fields = ()
+    bulk_user_field = None
+    bulk_writer_class = BulkWriter
+
+    def get_bulk_writer(self):
+        return self.bulk_writer_class(
+            self.queryset.model, self.bulk_fields, user_field=self.bulk_user_field
+        )
+
+    @action(detail=False, methods=['post', 'patch'])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'At most {MAX_BATCH_SIZE} items can be sent in one batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        writer = self.get_bulk_writer()
+        creating = request.method == 'POST'
+        entries = writer.create(items) if creating else writer.update(items)
+
+        results = []
+        for entry in entries:
+            if entry.errors:
+                results.append({'index': entry.index, 'errors': entry.errors})
+            else:
+                results.append({'index': entry.index, 'id': entry.instance.pk})
+        failed = sum(1 for entry in entries if entry.errors)
+        if failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED if creating else status.HTTP_200_OK
+        return Response({
+            'succeeded': len(entries) - failed,
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
@@ -0,0 +1,134 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+# Rendered bodies outlive any sensible edit interval; they are invalidated
+# through the version counters rather than by expiry.
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY_PREFIX = 'catalog:version:'
+BODY_KEY_PREFIX = 'catalog:body:'
+
+
+def version_key(model, prefix=VERSION_KEY_PREFIX):
+    return f'{prefix}{model._meta.label_lower}'
+
+
+def catalog_version(model, prefix=VERSION_KEY_PREFIX):
+    """The current version of ``model``, started now if it was never set."""
+    key = version_key(model, prefix)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, CATALOG_CACHE_TIMEOUT)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_versions(*models, prefix=VERSION_KEY_PREFIX):
+    """
+    Mark ``models`` as changed.
+
+    Versions are microsecond timestamps forced to move forward, so they
+    double as the Last-Modified time of anything built from them. Call this
+    after writes that skip model signals (``update()``, ``bulk_create()``).
+    ``prefix`` selects another family of counters under the same scheme.
+    """
+    now = time.time_ns() // 1000
+    keys = [version_key(model, prefix) for model in models]
+    current = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        CATALOG_CACHE_TIMEOUT
+    )
+
+
+class CatalogCacheMixin:
+    """
+    Conditional GET and a rendered-body cache for read-mostly viewsets.
+
+    ``list`` and ``retrieve`` responses are keyed on the full URL and the
+    negotiated media type. Each viewset lists the models its serializers
+    read in ``cache_dependencies``; any save or delete on those models bumps
+    their version and so changes the ETag. A warm hit costs a single cache
+    round trip and no SQL.
+
+    The cache backend must be shared between worker processes, otherwise a
+    write in one worker is invisible to the others.
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if request.method not in ('GET', 'HEAD') or renderer is None or renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        material = f'{request.build_absolute_uri()}|{request.accepted_media_type}'
+        body_key = BODY_KEY_PREFIX + hashlib.sha1(material.encode('utf-8')).hexdigest()
+        version_keys = [version_key(model) for model in self.cache_dependencies]
+        found = cache.get_many(version_keys + [body_key])
+
+        missing = [key for key in version_keys if key not in found]
+        if missing:
+            # Counters were evicted or never set: start them now so nothing
+            # cached under the old values can match again.
+            now = time.time_ns() // 1000
+            for key in missing:
+                cache.add(key, now, CATALOG_CACHE_TIMEOUT)
+            found.update(cache.get_many(missing))
+        versions = tuple(found.get(key, 0) for key in version_keys)
+
+        etag = '"%s"' % hashlib.sha1(f'{material}|{versions}'.encode('utf-8')).hexdigest()
+        last_modified = max(versions, default=0) // 1_000_000
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+            self.add_validators(response, etag, last_modified)
+            return response
+
+        cached = found.get(body_key)
+        if cached is not None and cached['versions'] == versions:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(body_key, {
+                'versions': versions,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+            }, CATALOG_CACHE_TIMEOUT)
+
+        self.add_validators(response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            candidates = {tag.strip() for tag in if_none_match.split(',')}
+            return etag in candidates or '*' in candidates
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            since = parse_http_date_safe(if_modified_since)
+            return since is not None and last_modified <= since
+        return False
+
+    @staticmethod
+    def add_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep the body but must revalidate before reusing it.
+        patch_cache_control(response, no_cache=True)
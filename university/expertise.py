@@ -0,0 +1,244 @@
+"""
+Research-expertise search over faculty research interests and bios.
+
+Both fields are split into phrases at punctuation, tokenized, stripped of
+stopwords and stemmed. Each stem and each pair of adjacent stems within a
+phrase (so "machine learning" outranks "learning" on its own) becomes an
+``ExpertiseTerm`` posting: one row per faculty member and term, weighted
+by field (interests count more than the bio) and normalized for length.
+
+A search stems the query the same way and adds the terms of known
+synonyms at a discount. It then reads only the postings for those terms,
+through the ``(term, faculty)`` index, and ranks faculty by summed
+weight times inverse document frequency. No faculty row is scanned.
+
+Saves and deletes keep postings current through signals, and bulk
+writers reindex what they wrote. After raw ``update()`` calls, and once
+after migrating a database that already has faculty, run
+``manage.py rebuild_expertise_index``.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ExpertiseTerm, Faculty
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+PHRASE_SPLIT_RE = re.compile(r'[,;:.!?()\[\]/\n]+')
+MAX_TERM_LENGTH = 64
+FIELD_BOOSTS = (('research_interests', 3.0), ('bio', 1.0))
+SYNONYM_WEIGHT = 0.6
+# Hits read back before any other filters apply; the tail is noise.
+MAX_CANDIDATES = 500
+WRITE_BATCH_SIZE = 500
+
+# Words that say nothing about what someone works on, in questions
+# ("who works on ...") or bios ("teaches in ...").
+STOPWORDS = frozenset('''
+    a about all an and any are as at be by can could do does doing for from
+    has have he her his i in into is it its me my of on or our she should
+    show tell that the their them they this to troy university was we what
+    which who whom whose will with would you your
+    area areas expert experts expertise faculty field fields focus focuses
+    interest interested interests member members professor professors
+    research researcher researchers researches researching specialist
+    specializes specializing studies study teach teaches teaching work
+    working works
+'''.split())
+
+SUFFIXES = sorted((
+    'ational', 'ization', 'fulness', 'iveness', 'ations', 'ation', 'ities', 'ments',
+    'ness', 'ment', 'ical', 'ings', 'ing', 'ies', 'ied', 'ity', 'ics', 'ers', 'er',
+    'ed', 'al', 'ic', 'es', 'ly', 's',
+), key=len, reverse=True)
+
+# Each group lists interchangeable phrasings of one field of study.
+SYNONYMS = (
+    ('machine learning', 'ml', 'artificial intelligence', 'ai', 'deep learning', 'neural networks'),
+    ('cybersecurity', 'computer security', 'information security', 'network security', 'infosec'),
+    ('databases', 'database systems', 'data management', 'sql'),
+    ('computer networks', 'networking'),
+    ('software engineering', 'software development', 'programming'),
+    ('statistics', 'data analysis', 'biostatistics'),
+    ('genetics', 'genomics', 'heredity'),
+    ('ecology', 'environmental science', 'ecosystems'),
+    ('marine biology', 'oceanography', 'marine science'),
+    ('biochemistry', 'molecular biology'),
+    ('astrophysics', 'astronomy', 'cosmology'),
+    ('condensed matter', 'solid state physics'),
+    ('creative writing', 'fiction', 'poetry'),
+    ('cognitive psychology', 'cognition', 'cognitive science'),
+    ('clinical psychology', 'mental health', 'psychotherapy'),
+    ('public health', 'epidemiology'),
+    ('gerontology', 'aging', 'elder care'),
+    ('forensic science', 'forensics', 'crime scene investigation'),
+    ('criminology', 'crime'),
+    ('exercise physiology', 'exercise science', 'sports science'),
+    ('international relations', 'foreign policy', 'global politics'),
+    ('econometrics', 'quantitative economics'),
+    ('entrepreneurship', 'startups', 'small business'),
+    ('supply chain management', 'logistics', 'operations management'),
+    ('taxation', 'tax'),
+)
+
+
+def stem(word):
+    """
+    Strip one common English suffix: "networks", "networking" -> "network".
+    Crude next to a full stemmer, but it only has to agree with itself.
+    """
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # "planning" -> "plann" -> "plan"
+            if suffix in ('ing', 'ed', 'er') and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]
+            break
+    if len(word) > 3 and word[-1] in 'ey':
+        word = word[:-1]
+    return word
+
+
+def analyze(text):
+    """Stemmed content words of ``text``, as one list per phrase."""
+    phrases = []
+    for phrase in PHRASE_SPLIT_RE.split((text or '').casefold()):
+        stems = [stem(word) for word in WORD_RE.findall(phrase) if word not in STOPWORDS]
+        if stems:
+            phrases.append(stems)
+    return phrases
+
+
+def phrase_terms(stems):
+    """Unigram and adjacent-pair terms of one phrase."""
+    terms = list(stems)
+    terms.extend(f'{first} {second}' for first, second in zip(stems, stems[1:]))
+    return [term[:MAX_TERM_LENGTH] for term in terms]
+
+
+def synonym_terms(phrase):
+    """The most specific terms of a synonym phrase: its pairs, or its only word."""
+    stems = [stem(word) for word in WORD_RE.findall(phrase.casefold())]
+    if len(stems) == 1:
+        return stems
+    return [f'{first} {second}' for first, second in zip(stems, stems[1:])]
+
+
+SYNONYM_GROUPS = [[synonym_terms(phrase) for phrase in group] for group in SYNONYMS]
+
+
+def postings(member):
+    """``{term: weight}`` for one faculty member."""
+    weights = Counter()
+    for field, boost in FIELD_BOOSTS:
+        phrases = analyze(getattr(member, field))
+        length = sum(len(stems) for stems in phrases)
+        for stems in phrases:
+            for term in phrase_terms(stems):
+                weights[term] += boost / math.sqrt(length)
+    return {term: round(weight, 4) for term, weight in weights.items()}
+
+
+def query_terms(query):
+    """``{term: weight}`` for a search: its own terms, plus discounted synonyms."""
+    weights = {}
+    for stems in analyze(query):
+        for term in phrase_terms(stems):
+            weights[term] = 1.0
+    present = set(weights)
+    for group in SYNONYM_GROUPS:
+        if not any(terms and set(terms) <= present for terms in group):
+            continue
+        for terms in group:
+            for term in terms:
+                weights.setdefault(term, SYNONYM_WEIGHT)
+    return weights
+
+
+def expertise_rows(faculty):
+    return [
+        ExpertiseTerm(faculty_id=member.pk, term=term, weight=weight)
+        for member in faculty
+        for term, weight in postings(member).items()
+    ]
+
+
+def index_faculty(faculty):
+    """Replace the postings of ``faculty`` (saved ``Faculty`` instances)."""
+    faculty = list(faculty)
+    with transaction.atomic():
+        for start in range(0, len(faculty), WRITE_BATCH_SIZE):
+            batch = faculty[start:start + WRITE_BATCH_SIZE]
+            ExpertiseTerm.objects.filter(faculty_id__in=[member.pk for member in batch]).delete()
+        ExpertiseTerm.objects.bulk_create(expertise_rows(faculty), batch_size=WRITE_BATCH_SIZE)
+
+
+def rebuild_expertise_index():
+    """Reindex every faculty member; returns the number of postings written."""
+    written = 0
+    with transaction.atomic():
+        ExpertiseTerm.objects.all().delete()
+        faculty = Faculty.objects.only('pk', 'research_interests', 'bio').order_by('pk')
+        batch = []
+        for member in faculty.iterator(chunk_size=WRITE_BATCH_SIZE):
+            batch.append(member)
+            if len(batch) == WRITE_BATCH_SIZE:
+                written += len(ExpertiseTerm.objects.bulk_create(expertise_rows(batch), batch_size=WRITE_BATCH_SIZE))
+                batch = []
+        written += len(ExpertiseTerm.objects.bulk_create(expertise_rows(batch), batch_size=WRITE_BATCH_SIZE))
+    return written
+
+
+def search_expertise(query, limit=MAX_CANDIDATES, faculty=None):
+    """
+    ``(faculty_id, score)`` pairs for ``query``, best first. Runs two
+    queries: the matching postings and the number of faculty.
+
+    ``faculty``, a ``Faculty`` queryset, restricts the postings read to its
+    members, so ``limit`` applies after that filter. Document frequencies
+    stay corpus-wide, which costs a third query, so scores do not depend
+    on the filter.
+    """
+    weights = query_terms(query)
+    if not weights:
+        return []
+    matching = ExpertiseTerm.objects.filter(term__in=list(weights))
+    if faculty is None:
+        rows = list(matching.values_list('term', 'faculty_id', 'weight'))
+        frequency = Counter(term for term, _, _ in rows)
+    else:
+        members = faculty.order_by().values('pk')
+        rows = list(matching.filter(faculty__in=members).values_list('term', 'faculty_id', 'weight'))
+        frequency = dict(
+            matching.filter(term__in={term for term, _, _ in rows}).order_by().values('term')
+            .annotate(count=Count('pk')).values_list('term', 'count')
+        ) if rows else {}
+    if not rows:
+        return []
+    total = Faculty.objects.count()
+    scores = Counter()
+    for term, faculty_id, weight in rows:
+        scores[faculty_id] += weights[term] * weight * math.log(1 + total / frequency[term])
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(faculty_id, round(score, 4)) for faculty_id, score in ranked[:limit]]
+
+
+def rank_faculty(queryset, query, limit=None):
+    """
+    Members of ``queryset`` matching ``query``, best first, each with an
+    ``expertise_score``. Other filters on ``queryset`` still apply, before
+    candidates are cut to ``MAX_CANDIDATES``.
+    """
+    scores = dict(search_expertise(query, faculty=queryset))
+    if not scores:
+        return []
+    members = sorted(
+        queryset.filter(pk__in=list(scores)),
+        key=lambda member: (-scores[member.pk], member.pk)
+    )
+    for member in members:
+        member.expertise_score = scores[member.pk]
+    return members[:limit] if limit is not None else members
@@ -0,0 +1,189 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_fields(value):
+    """
+    Turn ``id,course.code,course.title`` into ``{'id': {}, 'course': {'code': {}, 'title': {}}}``.
+
+    An empty subtree means "keep everything below this field".
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def parse_expand(value):
+    """Return the set of dotted relation paths named in ``?expand=``."""
+    expanded = set()
+    for path in (value or '').split(','):
+        parts = [part for part in path.strip().split('.') if part]
+        # Expanding ``course.department`` implies expanding ``course``.
+        for i in range(1, len(parts) + 1):
+            expanded.add('.'.join(parts[:i]))
+    return expanded
+
+
+def wants_sparse(request):
+    """True if the client asked for a trimmed or expanded representation."""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return False
+    params = request.query_params
+    return FIELDS_PARAM in params or EXPAND_PARAM in params
+
+
+class DynamicFieldsMixin:
+    """
+    Shape the output with ``?fields=`` and ``?expand=``.
+
+    ``fields`` keeps only the named fields; dotted names reach into nested
+    serializers (``?fields=id,course.code``). Once ``expand`` is present,
+    nested relations that are not listed in it collapse to their primary
+    key (``?expand=course`` keeps ``course`` nested but turns ``semester``
+    and ``instructor`` into ids).
+
+    Only serializers built with a request in their context are shaped, so
+    nested serializers declared on a parent are handled through the root.
+    Write requests are left alone to keep validation intact.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get('request')
+        if not wants_sparse(request):
+            return
+        params = request.query_params
+        expand = parse_expand(params[EXPAND_PARAM]) if EXPAND_PARAM in params else None
+        shape_fields(self, parse_fields(params.get(FIELDS_PARAM)), expand)
+
+
+def shape_fields(serializer, tree, expand, prefix=''):
+    fields = serializer.fields
+    # Ignore the filter entirely if none of its names apply at this level.
+    if tree and tree.keys() & fields.keys():
+        for name in list(fields):
+            if name not in tree:
+                fields.pop(name)
+
+    for name, field in list(fields.items()):
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(nested, serializers.BaseSerializer):
+            continue
+        path = f'{prefix}{name}'
+        if expand is not None and path not in expand:
+            kwargs = {'many': nested is not field, 'read_only': True}
+            if field.source != name:
+                kwargs['source'] = field.source
+            fields[name] = serializers.PrimaryKeyRelatedField(**kwargs)
+            continue
+        shape_fields(nested, tree.get(name, {}), expand, prefix=f'{path}.')
+
+
+def plan_queryset(queryset, serializer, restrict=False, extra_fields=()):
+    """
+    Add the joins a serializer needs to ``queryset``.
+
+    Nested single-valued relations become ``select_related`` and many-valued
+    ones ``prefetch_related``. With ``restrict`` the columns are cut down to
+    what the (already shaped) serializer reads, plus ``extra_fields`` such
+    as the pagination ordering.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    plan = _QueryPlan()
+    plan.collect(serializer, queryset.model, '')
+
+    if restrict:
+        # Joins requested upstream may point at columns we are about to defer.
+        queryset = queryset.select_related(None)
+    if plan.select_related:
+        queryset = queryset.select_related(*sorted(plan.select_related))
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*sorted(plan.prefetch_related))
+    if restrict and not plan.unbounded:
+        columns = plan.columns | {name.lstrip('-') for name in extra_fields}
+        queryset = queryset.only(*sorted(columns))
+    return queryset
+
+
+class _QueryPlan:
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.columns = set()
+        # Set when a top-level attribute could not be traced to a column.
+        self.unbounded = False
+
+    def collect(self, serializer, model, prefix):
+        self.columns.add(f'{prefix}{model._meta.pk.name}')
+        hints = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                if name in hints:
+                    for source in hints[name]:
+                        self.trace(model, prefix, source.split('.'))
+                elif isinstance(field, serializers.SerializerMethodField):
+                    self.load_all(model, prefix)
+                continue
+
+            attrs = field.source_attrs
+            if isinstance(field, serializers.ListSerializer) or isinstance(field, ManyRelatedField):
+                self.prefetch_related.add(prefix + '__'.join(attrs))
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                related = self.trace(model, prefix, attrs, relation=True)
+                if related is not None:
+                    self.collect(field, related, f"{prefix}{'__'.join(attrs)}__")
+                continue
+            self.trace(model, prefix, attrs)
+
+    def trace(self, model, prefix, attrs, relation=False):
+        """
+        Follow ``attrs`` through the model graph, recording joins and columns.
+
+        Returns the model at the end of the path when ``relation`` is set.
+        """
+        path = prefix
+        for index, attr in enumerate(attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # A method or property: we can't tell which columns it reads.
+                self.load_all(model, path)
+                return None
+            last = index == len(attrs) - 1
+            if model_field.many_to_many or model_field.one_to_many:
+                self.prefetch_related.add(path + attr)
+                return None
+            if not model_field.is_relation or (last and not relation):
+                self.columns.add(path + attr)
+                return None
+            if not model_field.concrete:
+                # Reverse one-to-one, e.g. ``user.student``.
+                self.load_all(model, path)
+                return None
+            self.columns.add(path + attr)
+            self.select_related.add(path + attr)
+            path = f'{path}{attr}__'
+            model = model_field.related_model
+        return model
+
+    def load_all(self, model, path):
+        if not path:
+            self.unbounded = True
+            return
+        for model_field in model._meta.concrete_fields:
+            self.columns.add(path + model_field.name)
@@ -0,0 +1,228 @@
+import random
+import re
+import time
+import tracemalloc
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import get_resolver
+from rest_framework.viewsets import ViewSetMixin
+
+from university.benchmark import (
+    BENCH_CACHES, compare_reports, default_report_path, read_report, report_header,
+    run_concurrently, scratch_database, summarize, timed, write_report
+)
+from university.models import Student
+from university.synthetic import DEPARTMENTS, CampusGenerator
+
+PK_RE = re.compile(r'\(\?P<pk>[^)]*\)|<(?:int:)?pk>')
+# Writes the benchmark knows how to send; other writes are listed as skipped.
+WRITE_ACTIONS = ('enroll', 'update_grade')
+GRADES = ('A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F')
+SEARCH_TOPICS = tuple(area for *_, areas in DEPARTMENTS for area in areas) + ('ai', 'deep learning', 'tax law')
+
+
+class Endpoint:
+    """One method on one URL pattern, e.g. ``GET students/{pk}/transcript/``."""
+
+    def __init__(self, method, template, view, action):
+        self.method = method
+        self.template = template
+        self.view = view
+        self.action = action
+
+    @property
+    def label(self):
+        return f'{self.method.upper()} /{self.template}'
+
+    @property
+    def detail(self):
+        return '{pk}' in self.template
+
+    @property
+    def model(self):
+        return self.view.queryset.model
+
+
+def viewset_endpoints():
+    """Every method of every viewset route in the URLconf, format suffixes aside."""
+    endpoints = []
+
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern.url_patterns, prefix + str(pattern.pattern))
+                continue
+            view = getattr(pattern.callback, 'cls', None)
+            actions = getattr(pattern.callback, 'actions', None)
+            route = prefix + str(pattern.pattern)
+            if view is None or not issubclass(view, ViewSetMixin) or not actions or 'format' in route:
+                continue
+            template = PK_RE.sub('{pk}', route.lstrip('^').rstrip('$'))
+            for method, action in actions.items():
+                endpoints.append(Endpoint(method, template, view, action))
+
+    walk(get_resolver().url_patterns)
+    return endpoints
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every REST API endpoint on campus-scale synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='100', help='Comma-separated fixture scales (default: 100, ~30k students)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for fixtures and request parameters')
+        parser.add_argument('--only', help='Only endpoints whose label contains this text')
+        parser.add_argument('--read-only', action='store_true', help='Skip the write actions')
+        parser.add_argument(
+            '--max-queries', type=int, default=10,
+            help='Flag endpoints that run more SQL queries than this per request (default: 10)'
+        )
+        parser.add_argument('--output', help='Where to write the JSON report (default: benchmarks/api-<revision>.json)')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales must be comma-separated integers, e.g. 10,100')
+        baseline = read_report(options['compare']) if options['compare'] else None
+
+        endpoints = viewset_endpoints()
+        if options['only']:
+            endpoints = [endpoint for endpoint in endpoints if options['only'] in endpoint.label]
+        if not endpoints:
+            raise CommandError('No endpoints to benchmark')
+
+        report = report_header('api', {
+            key: options[key] for key in ('scales', 'requests', 'concurrency', 'seed', 'only', 'read_only')
+        })
+        report['results'] = {}
+        for scale in scales:
+            self.stdout.write(f'Scale {scale}x: building fixtures...')
+            with scratch_database(), override_settings(CACHES=BENCH_CACHES):
+                started = time.perf_counter()
+                fixture = CampusGenerator(scale, seed=options['seed']).generate()
+                setup_seconds = time.perf_counter() - started
+                self.stdout.write(f'  {sum(fixture.values())} rows in {setup_seconds:.1f}s')
+                results, skipped = self.run_scale(endpoints, options)
+            report['results'][f'{scale}x'] = {
+                'fixture': fixture,
+                'setup_seconds': round(setup_seconds, 2),
+                'endpoints': results,
+                'skipped': skipped,
+            }
+            self.print_scale(results, skipped, options['max_queries'])
+
+        path = write_report(report, options['output'] or default_report_path('api'))
+        self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+        if baseline is not None:
+            rows = compare_reports(baseline, report)
+            self.stdout.write(f"Changes over 10% since {baseline.get('revision') or 'the baseline'}:")
+            if not rows:
+                self.stdout.write('  none')
+            for name, old, new, change in rows:
+                self.stdout.write(f'  {name:70} {old:>10} -> {new:<10} {change:+.0%}')
+
+    def run_scale(self, endpoints, options):
+        rng = random.Random(options['seed'])
+        ids = {}
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+        results = {}
+        skipped = []
+        # Reads first, so the writes don't change what they measure.
+        for endpoint in sorted(endpoints, key=lambda endpoint: endpoint.method != 'get'):
+            writes = endpoint.method != 'get'
+            if writes and (options['read_only'] or endpoint.action not in WRITE_ACTIONS):
+                skipped.append(endpoint.label)
+                continue
+            if endpoint.detail and endpoint.model not in ids:
+                ids[endpoint.model] = list(endpoint.model.objects.order_by('pk').values_list('pk', flat=True))
+            pks = ids.get(endpoint.model) if endpoint.detail else None
+            if endpoint.detail and not pks:
+                skipped.append(endpoint.label)
+                continue
+            requests = [
+                (endpoint.template.format(pk=rng.choice(pks) if pks else None), self.payload(endpoint, rng, student_ids))
+                for _ in range(options['requests'] + 1)
+            ]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {endpoint.label}')
+            results[endpoint.label] = self.measure(endpoint, requests[:-1], requests[-1], options['concurrency'])
+        return results, skipped
+
+    def payload(self, endpoint, rng, student_ids):
+        if endpoint.action == 'enroll':
+            return {'student_id': rng.choice(student_ids)}
+        if endpoint.action == 'update_grade':
+            return {'grade': rng.choice(GRADES)}
+        if endpoint.action == 'search':
+            return {'q': rng.choice(SEARCH_TOPICS)}
+        return None
+
+    def send(self, client, method, path, payload):
+        """One request; returns ``(status, body size)`` with streamed bodies read to the end."""
+        if payload is None:
+            kwargs = {}
+        elif method == 'get':
+            kwargs = {'data': payload}
+        else:
+            kwargs = {'data': payload, 'content_type': 'application/json'}
+        response = getattr(client, method)(f'/{path}', **kwargs)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def measure(self, endpoint, requests, probe, concurrency):
+        def run(request):
+            path, payload = request
+            (status, size), seconds, queries = timed(self.send, Client(), endpoint.method, path, payload)
+            return status, size, seconds, queries
+
+        started = time.perf_counter()
+        samples = run_concurrently(run, requests, concurrency)
+        elapsed = time.perf_counter() - started
+
+        # tracemalloc slows allocation-heavy code down a lot, so memory is
+        # measured on a separate, untimed request.
+        tracemalloc.start()
+        self.send(Client(), endpoint.method, *probe)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'status': dict(Counter(str(status) for status, _, _, _ in samples)),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'latency_ms': summarize((seconds for _, _, seconds, _ in samples), scale=1000),
+            'queries': summarize(queries for _, _, _, queries in samples),
+            'body_kib': summarize((size for _, size, _, _ in samples), scale=1 / 1024),
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+    def print_scale(self, results, skipped, max_queries):
+        self.stdout.write(
+            f"  {'endpoint':52} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>6} {'peak MiB':>9} {'body KiB':>9}"
+        )
+        over_budget = []
+        for label, row in sorted(results.items(), key=lambda item: -item[1]['latency_ms']['p95']):
+            latency, queries = row['latency_ms'], row['queries']
+            self.stdout.write(
+                f"  {label:52} {latency['p50']:9.1f} {latency['p95']:9.1f} {latency['p99']:9.1f} "
+                f"{queries['max']:6.0f} {row['peak_memory_kib'] / 1024:9.1f} {row['body_kib']['mean']:9.1f}"
+            )
+            errors = sum(count for status, count in row['status'].items() if status.startswith('5'))
+            if errors:
+                self.stdout.write(self.style.ERROR(f'    {errors} server errors'))
+            if queries['max'] > max_queries:
+                over_budget.append(f"{label} ({queries['max']:.0f} queries)")
+        if over_budget:
+            self.stdout.write(self.style.WARNING(
+                f'  Over {max_queries} queries per request: ' + ', '.join(over_budget)
+            ))
+        if skipped:
+            self.stdout.write(f'  Skipped {len(skipped)} writes with no benchmark payload; see the report.')
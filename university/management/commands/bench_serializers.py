@@ -0,0 +1,122 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from university.fastpath import FlatRowSerializer, iter_json_array
+from university.fieldsets import plan_queryset
+from university.models import (
+    AcademicProgram, Course, CourseOffering, Department, Enrollment,
+    Faculty, Semester, Student
+)
+from university.serializers import EnrollmentSerializer
+from university.views import EnrollmentViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare the DRF ModelSerializer list path with the values() fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Enrollments to generate')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        # Work in a throwaway test database so real data is never touched.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options['rows'])
+            queryset = Enrollment.objects.order_by('student_id', 'course_offering_id')
+            results = {
+                'ModelSerializer': self.measure(lambda: self.drf_path(queryset), options['repeat']),
+                'FlatRowSerializer': self.measure(lambda: self.fast_path(queryset), options['repeat']),
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        rows = options['rows']
+        for name, (seconds, peak, size) in results.items():
+            self.stdout.write(
+                f'{name:18} {seconds * 1000:9.1f} ms  {rows / seconds:10.0f} rows/s  '
+                f'peak {peak / 1024 / 1024:7.1f} MiB  body {size / 1024:9.1f} KiB'
+            )
+        speedup = results['ModelSerializer'][0] / results['FlatRowSerializer'][0]
+        self.stdout.write(self.style.SUCCESS(f'Fast path is {speedup:.1f}x faster'))
+
+    def drf_path(self, queryset):
+        serializer = EnrollmentSerializer(many=True)
+        queryset = plan_queryset(queryset, serializer)
+        data = EnrollmentSerializer(queryset, many=True).data
+        return len(JSONRenderer().render(data))
+
+    def fast_path(self, queryset):
+        serializer = FlatRowSerializer(EnrollmentViewSet.fast_columns)
+        return sum(len(chunk) for chunk in iter_json_array(serializer.iter_rows(queryset)))
+
+    def measure(self, run, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        # tracemalloc slows allocation-heavy code down a lot, so memory is
+        # measured in a separate, untimed run.
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return best, peak, size
+
+    def seed(self, rows):
+        students = max(rows // 5, 1)
+        offerings = max(rows // students + 1, 5)
+        password = make_password(None)
+        dept = Department.objects.create(
+            name='Computer Science', code='CS', location='MSCX', contact_email='cs@troy.edu'
+        )
+        program = AcademicProgram.objects.create(
+            name='Computer Science', code='BSCS', description='', department=dept,
+            program_type='MAJ', degree='BS', total_credits_required=120, duration_years=4
+        )
+        advisor_user = User.objects.create(username='advisor', password=password)
+        advisor = Faculty.objects.create(
+            user=advisor_user, department=dept, rank='PROF', office_location='MSCX 100',
+            phone='334-670-3000', hire_date=date(2010, 8, 1)
+        )
+        semester = Semester.objects.create(
+            name='Fall 2024', code='FA24', year=2024, season='FA', start_date=date(2024, 8, 19),
+            end_date=date(2024, 12, 13), registration_start=date(2024, 4, 1),
+            registration_end=date(2024, 8, 23), is_current=True
+        )
+        courses = Course.objects.bulk_create([
+            Course(code=f'CS{1000 + i}', title=f'Course {i}', description='', department=dept, level=100)
+            for i in range(offerings)
+        ])
+        course_offerings = CourseOffering.objects.bulk_create([
+            CourseOffering(course=course, semester=semester, instructor=advisor, section='01',
+                           capacity=500, schedule='MWF 10:00-10:50')
+            for course in courses
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'student{i}', first_name=f'First{i}', last_name=f'Last{i}',
+                 email=f'student{i}@troy.edu', password=password)
+            for i in range(students)
+        ], batch_size=1000)
+        student_rows = Student.objects.bulk_create([
+            Student(user=user, student_id=f'S{i:07d}', date_of_birth=date(2003, 1, 1),
+                    admission_date=date(2021, 8, 1), expected_graduation=date(2025, 5, 1),
+                    current_program=program, degree_type='UG', advisor=advisor)
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student_rows[i % students],
+                       course_offering=course_offerings[i // students],
+                       credits_attempted=3, grade='A')
+            for i in range(rows)
+        ], batch_size=2000)
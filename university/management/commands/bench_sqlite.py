@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from university.benchmark import (
+    BENCH_CACHES, compare_reports, default_report_path, read_report, report_header,
+    run_concurrently, scratch_database, summarize, timed, write_report
+)
+from university.models import CourseOffering, Enrollment, Student
+from university.synthetic import CampusGenerator
+
+GRADES = ('A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F')
+READ_PATHS = (
+    ('students', 'students/{pk}/enrollments/'),
+    ('students', 'students/{pk}/transcript/'),
+    ('offerings', 'offerings/{pk}/'),
+    ('enrollments', 'enrollments/{pk}/'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare SQLite profiles (SQLITE_PROFILE) under concurrent API reads and writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='default,production', help='Comma-separated SQLITE_PROFILE values')
+        parser.add_argument('--scale', type=int, default=10, help='Fixture scale (default: 10, ~3k students)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per profile')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of requests that write')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for fixtures and requests')
+        parser.add_argument('--output', help='Where to write the JSON report (default: benchmarks/sqlite-<revision>.json)')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+        # Set on the per-profile subprocesses, which print their results as JSON.
+        parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'SQLite profiles only apply to SQLite, not {connection.vendor}')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_profile(options)))
+            return
+
+        profiles = [profile for profile in options['profiles'].split(',') if profile]
+        if not profiles:
+            raise CommandError('No profiles to benchmark')
+        baseline = read_report(options['compare']) if options['compare'] else None
+
+        report = report_header('sqlite', {
+            key: options[key] for key in ('profiles', 'scale', 'requests', 'concurrency', 'write_ratio', 'seed')
+        })
+        report['results'] = {}
+        for profile in profiles:
+            self.stdout.write(f'Profile {profile}: {options["requests"]} requests from {options["concurrency"]} threads...')
+            report['results'][profile] = self.spawn(profile, options)
+        self.print_results(report['results'])
+
+        path = write_report(report, options['output'] or default_report_path('sqlite'))
+        self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+        if baseline is not None:
+            rows = compare_reports(baseline, report)
+            self.stdout.write(f"Changes over 10% since {baseline.get('revision') or 'the baseline'}:")
+            if not rows:
+                self.stdout.write('  none')
+            for name, old, new, change in rows:
+                self.stdout.write(f'  {name:50} {old:>10} -> {new:<10} {change:+.0%}')
+
+    def spawn(self, profile, options):
+        """Run one profile in a fresh process, since settings are read at startup."""
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'bench_sqlite', '--worker',
+            '--scale', str(options['scale']), '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']), '--write-ratio', str(options['write_ratio']),
+            '--seed', str(options['seed']),
+        ]
+        finished = subprocess.run(
+            command, env={**os.environ, 'SQLITE_PROFILE': profile}, stdin=subprocess.DEVNULL,
+            capture_output=True, text=True
+        )
+        lines = [line for line in finished.stdout.splitlines() if line.startswith('{')]
+        if finished.returncode or not lines:
+            raise CommandError(f'Profile {profile} failed:\n{finished.stderr[-2000:]}')
+        return json.loads(lines[-1])
+
+    def run_profile(self, options):
+        opened = Counter()
+
+        def count_connection(sender, connection, **kwargs):
+            opened[connection.alias] += 1
+
+        with scratch_database(), override_settings(CACHES=BENCH_CACHES):
+            fixture = CampusGenerator(options['scale'], seed=options['seed']).generate()
+            requests = self.requests(options)
+            connection_created.connect(count_connection)
+            try:
+                started = time.perf_counter()
+                samples = run_concurrently(self.send, requests, options['concurrency'])
+                elapsed = time.perf_counter() - started
+            finally:
+                connection_created.disconnect(count_connection)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+
+        result = {
+            'profile': settings.SQLITE_PROFILE,
+            'journal_mode': journal_mode,
+            'fixture': fixture,
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'connections_opened': dict(opened),
+        }
+        for kind in ('read', 'write'):
+            rows = [sample for sample in samples if sample[0] == kind]
+            result[kind] = {
+                'status': dict(Counter(status for _, status, _, _ in rows)),
+                'latency_ms': summarize((seconds for _, _, seconds, _ in rows), scale=1000),
+                'queries': summarize(queries for _, _, _, queries in rows),
+            }
+        return result
+
+    def requests(self, options):
+        """``(kind, method, path, payload)`` for a shuffled mix of reads and writes."""
+        rng = random.Random(options['seed'])
+        ids = {
+            'students': list(Student.objects.order_by('pk').values_list('pk', flat=True)),
+            'offerings': list(CourseOffering.objects.order_by('pk').values_list('pk', flat=True)),
+            'enrollments': list(Enrollment.objects.order_by('pk').values_list('pk', flat=True)),
+        }
+        requests = []
+        for _ in range(options['requests']):
+            if rng.random() >= options['write_ratio']:
+                ids_of, template = rng.choice(READ_PATHS)
+                requests.append(('read', 'get', template.format(pk=rng.choice(ids[ids_of])), None))
+            elif rng.random() < 0.5:
+                requests.append(('write', 'post', f"offerings/{rng.choice(ids['offerings'])}/enroll/",
+                                 {'student_id': rng.choice(ids['students'])}))
+            else:
+                requests.append(('write', 'patch', f"enrollments/{rng.choice(ids['enrollments'])}/update_grade/",
+                                 {'grade': rng.choice(GRADES)}))
+        return requests
+
+    def send(self, request):
+        """One request, ended the way the WSGI handler ends it; returns ``(kind, status, seconds, queries)``."""
+        kind, method, path, payload = request
+        kwargs = {} if payload is None else {'data': payload, 'content_type': 'application/json'}
+
+        def call():
+            try:
+                return str(getattr(Client(), method)(f'/{path}', **kwargs).status_code)
+            except OperationalError as exc:
+                return 'locked' if 'locked' in str(exc) else 'error'
+            finally:
+                # The test client keeps connections open; a server closes
+                # them here unless CONN_MAX_AGE allows reuse.
+                close_old_connections()
+
+        status, seconds, queries = timed(call)
+        return kind, status, seconds, queries
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"  {'profile':12} {'journal':8} {'req/s':>8} {'read p50':>9} {'read p95':>9} "
+            f"{'write p50':>10} {'write p95':>10} {'locked':>7} {'conns':>6}"
+        )
+        for profile, row in results.items():
+            read, write = row['read']['latency_ms'], row['write']['latency_ms']
+            locked = sum(row[kind]['status'].get('locked', 0) for kind in ('read', 'write'))
+            self.stdout.write(
+                f"  {profile:12} {row['journal_mode']:8} {row['throughput_rps']:8.1f} "
+                f"{read.get('p50', 0):9.1f} {read.get('p95', 0):9.1f} "
+                f"{write.get('p50', 0):10.1f} {write.get('p95', 0):10.1f} "
+                f"{locked:7} {sum(row['connections_opened'].values()):6}"
+            )
+            errors = sum(
+                count for kind in ('read', 'write') for status, count in row[kind]['status'].items()
+                if status == 'error' or status.startswith('5')
+            )
+            if errors:
+                self.stdout.write(self.style.ERROR(f'    {errors} server errors'))
+        if len(results) > 1:
+            first, *others = results
+            for profile in others:
+                before, after = results[first]['throughput_rps'], results[profile]['throughput_rps']
+                if before:
+                    self.stdout.write(f'  {profile} vs {first}: {after / before:.2f}x throughput')
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from university.models import Department
+from university.synthetic import SIZES, CampusGenerator
+
+
+class Command(BaseCommand):
+    help = 'Fill an empty database with a synthetic campus, offline and reproducibly'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=1,
+            help='Campus size; 1 is 40 faculty, 300 students and 120 courses, the rest grow with it (default: 1)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='The same seed always produces the same rows')
+        for size in SIZES:
+            parser.add_argument(f'--{size}', type=int, help=f'Number of {size}, overriding --scale')
+        parser.add_argument(
+            '--courses-per-student', type=int, default=4,
+            help='Enrollments per student in each semester (default: 4)'
+        )
+        parser.add_argument(
+            '--password',
+            help='Password for every generated user (default: unusable, so nobody can log in as them)'
+        )
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1:
+            raise CommandError('--scale must be at least 1')
+        for size in SIZES:
+            if options[size] is not None and options[size] < 0:
+                raise CommandError(f'--{size} cannot be negative')
+        if options['faculty'] == 0:
+            raise CommandError('--faculty must be at least 1: every course needs an instructor')
+        if Department.objects.exists():
+            raise CommandError(
+                'The database already has university data; run this against a fresh database '
+                '(e.g. after manage.py flush).'
+            )
+
+        generator = CampusGenerator(
+            options['scale'], seed=options['seed'], courses_per_student=options['courses_per_student'],
+            password=options['password'], progress=self.progress if options['verbosity'] > 1 else None,
+            **{size: options[size] for size in SIZES}
+        )
+        self.stdout.write(
+            'Generating ' + ', '.join(f'{count} {name}' for name, count in generator.sizes().items()) + '...'
+        )
+        started = time.perf_counter()
+        counts = generator.generate()
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        for name, count in counts.items():
+            self.stdout.write(f'  {name:16} {count:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s).'
+        ))
+
+    def progress(self, name, rows):
+        self.stdout.write(f'  {name}: {rows} rows')
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from university.expertise import rebuild_expertise_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the faculty research-expertise index from research interests and bios'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_expertise_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} postings in {time.perf_counter() - started:.1f}s.'
+        ))
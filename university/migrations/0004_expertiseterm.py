@@ -0,0 +1,24 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0003_alter_programcourse_course_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpertiseTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('faculty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expertise_terms', to='university.faculty')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'faculty'), name='expertise_term_faculty_unique')],
+            },
+        ),
+    ]
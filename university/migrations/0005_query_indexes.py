@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0004_expertiseterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['-publish_date'], name='announcement_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('is_urgent', True)), fields=['-publish_date'], name='announcement_urgent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['target_audience', '-publish_date'], name='announcement_audience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['level', 'code'], name='course_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['status'], name='enrollment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['grade'], name='enrollment_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['status'], name='student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='semester',
+            index=models.Index(condition=models.Q(('is_current', True)), fields=['is_current'], name='semester_current_idx'),
+        ),
+    ]
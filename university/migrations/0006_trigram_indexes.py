@@ -0,0 +1,52 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Columns matched through university.trigram.fuzzy_q. Each gets two GIN
+# trigram indexes: on the column, for the %> similarity operator, and on
+# UPPER(column), which is what Django's icontains compares.
+TRIGRAM_COLUMNS = (
+    ('university_department', 'name'),
+    ('university_department', 'code'),
+    ('university_course', 'code'),
+    ('university_course', 'title'),
+    ('university_building', 'name'),
+    ('university_building', 'code'),
+    ('auth_user', 'first_name'),
+    ('auth_user', 'last_name'),
+    ('auth_user', 'username'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_upper_trgm '
+            f'ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_upper_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('university', '0005_query_indexes'),
+    ]
+
+    operations = [
+        # A no-op outside PostgreSQL.
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -55,6 +56,21 @@ class Faculty(models.Model):
         ordering = ['user__last_name', 'user__first_name']
 
 
+class ExpertiseTerm(models.Model):
+    """One posting of the faculty research-expertise index; see university/expertise.py."""
+    term = models.CharField(max_length=64)
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='expertise_terms')
+    weight = models.FloatField()
+
+    def __str__(self):
+        return f"{self.term} ({self.faculty_id})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'faculty'], name='expertise_term_faculty_unique'),
+        ]
+
+
 class Student(models.Model):
     """Model representing a student"""
     DEGREE_CHOICES = [
@@ -93,6 +109,9 @@ class Student(models.Model):
 
     class Meta:
         ordering = ['user__last_name', 'user__first_name']
+        indexes = [
+            models.Index(fields=['status'], name='student_status_idx'),
+        ]
 
 
 class AcademicProgram(models.Model):
@@ -161,6 +180,10 @@ class Course(models.Model):
 
     class Meta:
         ordering = ['code']
+        indexes = [
+            # The assistant lists courses by level, in code order.
+            models.Index(fields=['level', 'code'], name='course_level_idx'),
+        ]
 
 
 class ProgramCourse(models.Model):
@@ -204,6 +227,10 @@ class Semester(models.Model):
     class Meta:
         ordering = ['-year', 'season']
         unique_together = ('year', 'season')
+        indexes = [
+            # Behind every "current semester" lookup; only that row is indexed.
+            models.Index(fields=['is_current'], condition=Q(is_current=True), name='semester_current_idx'),
+        ]
 
 
 class CourseOffering(models.Model):
@@ -260,6 +287,10 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = ('student', 'course_offering')
         ordering = ['course_offering', 'student']
+        indexes = [
+            models.Index(fields=['status'], name='enrollment_status_idx'),
+            models.Index(fields=['grade'], name='enrollment_grade_idx'),
+        ]
 
 
 class Transcript(models.Model):
@@ -303,6 +334,13 @@ class Announcement(models.Model):
 
     class Meta:
         ordering = ['-publish_date']
+        indexes = [
+            models.Index(fields=['-publish_date'], name='announcement_recent_idx'),
+            models.Index(
+                fields=['-publish_date'], condition=Q(is_urgent=True), name='announcement_urgent_idx'
+            ),
+            models.Index(fields=['target_audience', '-publish_date'], name='announcement_audience_idx'),
+        ]
 
 
 class Building(models.Model):
@@ -0,0 +1,179 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a stable ordering.
+
+    Pages are fetched with a ``WHERE (ordering) > (last row seen)`` filter
+    instead of an OFFSET, so every page costs the same no matter how deep
+    into the table it is. Views choose the ordering with ``cursor_ordering``;
+    it should be backed by an index and made of non-nullable columns. A
+    primary key tie-breaker is appended unless the ordering is already unique.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None, ordering=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        if ordering is None:
+            ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        ordering = self.get_unique_ordering(queryset.model, ordering)
+        position, reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        if reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        self.ordering_fields = ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            if len(position) != len(ordering):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        # Fetch one extra row to find out whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.reverse = reverse
+        if reverse:
+            self.page.reverse()
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.page:
+            return None
+        # Paging backwards always has a next page: the one we came from.
+        if self.has_more or self.reverse:
+            return self.encode_cursor(self.page[-1], reverse=False)
+        return None
+
+    def get_previous_link(self):
+        if not self.page:
+            return None
+        if (self.reverse and self.has_more) or (not self.reverse and self.has_cursor):
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    def get_unique_ordering(self, model, ordering):
+        ordering = tuple(ordering)
+        opts = model._meta
+        names = set()
+        for field in ordering:
+            name = field.lstrip('-')
+            if name == 'pk':
+                return ordering
+            for model_field in opts.concrete_fields:
+                if name in (model_field.name, model_field.attname):
+                    if model_field.unique:
+                        return ordering
+                    names.add(model_field.name)
+        if any(set(together) <= names for together in opts.unique_together):
+            return ordering
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        return ordering + ('-pk' if descending else 'pk',)
+
+    def keyset_filter(self, ordering, position):
+        """
+        Build ``(a > x) OR (a = x AND b > y) OR ...`` for the given position.
+        """
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for prev_field, prev_value in zip(ordering[:index], position[:index]):
+                clause &= Q(**{prev_field.lstrip('-'): prev_value})
+            condition |= clause
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, instance, reverse):
+        # The stored position always follows the forward ordering.
+        ordering = self.ordering_fields
+        if self.reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        position = [self._value(instance, field.lstrip('-')) for field in ordering]
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _value(self, instance, path):
+        value = instance
+        for attr in path.split('__'):
+            value = getattr(value, attr)
+            if value is None:
+                return None
+        if isinstance(value, Model):
+            return value.pk
+        return value
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
@@ -5,8 +5,9 @@ from .models import (
     ProgramCourse, Semester, CourseOffering, Enrollment,
     Transcript, Announcement, Building, Room
 )
+from .fieldsets import DynamicFieldsMixin
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
@@ -19,7 +20,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     head_of_department_name = serializers.CharField(source='head_of_department.user.get_full_name', read_only=True)
     
     class Meta:
@@ -30,7 +31,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
             'head_of_department_name'
         ]
 
-class FacultySerializer(serializers.ModelSerializer):
+class FacultySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
     department = DepartmentSerializer(read_only=True)
     department_id = serializers.PrimaryKeyRelatedField(
@@ -48,6 +49,8 @@ class FacultySerializer(serializers.ModelSerializer):
             'research_interests', 'bio', 'profile_picture', 'full_name'
         ]
         read_only_fields = ['profile_picture']
+        # Columns read by method fields, used to plan the query
+        field_sources = {'full_name': ['user.first_name', 'user.last_name']}
     
     def get_full_name(self, obj):
         return obj.user.get_full_name()
@@ -71,7 +74,7 @@ class FacultySerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class AcademicProgramSerializer(serializers.ModelSerializer):
+class AcademicProgramSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     department_id = serializers.PrimaryKeyRelatedField(
         queryset=Department.objects.all(),
@@ -87,7 +90,7 @@ class AcademicProgramSerializer(serializers.ModelSerializer):
             'is_active', 'created_date', 'updated_date'
         ]
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
     current_program = AcademicProgramSerializer(read_only=True)
     current_program_id = serializers.PrimaryKeyRelatedField(
@@ -115,6 +118,11 @@ class StudentSerializer(serializers.ModelSerializer):
             'profile_picture', 'full_name', 'age'
         ]
         read_only_fields = ['gpa', 'profile_picture']
+        # Columns read by method fields, used to plan the query
+        field_sources = {
+            'full_name': ['user.first_name', 'user.last_name'],
+            'age': ['date_of_birth'],
+        }
     
     def get_full_name(self, obj):
         return obj.user.get_full_name()
@@ -145,7 +153,7 @@ class StudentSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     department_id = serializers.PrimaryKeyRelatedField(
         queryset=Department.objects.all(),
@@ -166,7 +174,7 @@ class CourseSerializer(serializers.ModelSerializer):
             'learning_outcomes', 'syllabus'
         ]
 
-class ProgramCourseSerializer(serializers.ModelSerializer):
+class ProgramCourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     program = AcademicProgramSerializer(read_only=True)
     program_id = serializers.PrimaryKeyRelatedField(
         queryset=AcademicProgram.objects.all(),
@@ -187,7 +195,7 @@ class ProgramCourseSerializer(serializers.ModelSerializer):
             'is_required', 'semester_offered'
         ]
 
-class SemesterSerializer(serializers.ModelSerializer):
+class SemesterSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Semester
         fields = [
@@ -195,7 +203,7 @@ class SemesterSerializer(serializers.ModelSerializer):
             'registration_start', 'registration_end', 'is_current'
         ]
 
-class CourseOfferingSerializer(serializers.ModelSerializer):
+class CourseOfferingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     course_id = serializers.PrimaryKeyRelatedField(
         queryset=Course.objects.all(),
@@ -224,7 +232,7 @@ class CourseOfferingSerializer(serializers.ModelSerializer):
             'classroom', 'schedule', 'is_active'
         ]
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
     student_id = serializers.PrimaryKeyRelatedField(
         queryset=Student.objects.all(),
@@ -247,7 +255,7 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['enrollment_date']
 
-class TranscriptSerializer(serializers.ModelSerializer):
+class TranscriptSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
     
     class Meta:
@@ -258,7 +266,7 @@ class TranscriptSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
-class AnnouncementSerializer(serializers.ModelSerializer):
+class AnnouncementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     
     class Meta:
@@ -269,13 +277,13 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['author', 'publish_date']
 
-class BuildingSerializer(serializers.ModelSerializer):
+class BuildingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Building
         fields = ['id', 'name', 'code', 'location', 'description', 'image']
         read_only_fields = ['image']
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     building = BuildingSerializer(read_only=True)
     building_id = serializers.PrimaryKeyRelatedField(
         queryset=Building.objects.all(),
@@ -291,34 +299,43 @@ class RoomSerializer(serializers.ModelSerializer):
         ]
 
 # Simplified serializers for nested representations
-class SimpleDepartmentSerializer(serializers.ModelSerializer):
+class SimpleDepartmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = ['id', 'name', 'code']
 
-class SimpleFacultySerializer(serializers.ModelSerializer):
+class SimpleFacultySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     name = serializers.CharField(source='user.get_full_name')
     
     class Meta:
         model = Faculty
         fields = ['id', 'name']
 
-class SimpleAcademicProgramSerializer(serializers.ModelSerializer):
+class FacultySearchResultSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='user.get_full_name')
+    department = serializers.CharField(source='department.name', default=None)
+    score = serializers.FloatField(source='expertise_score')
+
+    class Meta:
+        model = Faculty
+        fields = ['id', 'name', 'department', 'rank', 'research_interests', 'score']
+
+class SimpleAcademicProgramSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AcademicProgram
         fields = ['id', 'name', 'code']
 
-class SimpleCourseSerializer(serializers.ModelSerializer):
+class SimpleCourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'code', 'title']
 
-class SimpleSemesterSerializer(serializers.ModelSerializer):
+class SimpleSemesterSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Semester
         fields = ['id', 'name', 'code', 'year', 'season']
 
-class SimpleStudentSerializer(serializers.ModelSerializer):
+class SimpleStudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     name = serializers.CharField(source='user.get_full_name')
     
     class Meta:
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .caching import bump_versions
+from .expertise import index_faculty
+from .models import (
+    AcademicProgram, Building, Course, Department, Faculty, Room, Semester
+)
+from .trigram import INDEXED_FIELDS, bump_names, indexed_names
+
+# Models rendered by the cached catalog endpoints, directly or nested.
+CATALOG_MODELS = (
+    Department, AcademicProgram, Course, Building, Room, Semester, Faculty, User
+)
+
+
+@receiver(post_save)
+def catalog_saved(sender, update_fields=None, **kwargs):
+    if sender not in CATALOG_MODELS:
+        return
+    # Logging in touches last_login only, which no catalog response shows.
+    if sender is User and update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_versions(sender)
+
+
+@receiver(post_delete)
+def catalog_deleted(sender, **kwargs):
+    if sender in CATALOG_MODELS:
+        bump_versions(sender)
+
+
+@receiver(post_save, sender=Faculty)
+def faculty_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'research_interests', 'bio'} & set(update_fields):
+        index_faculty([instance])
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+def prerequisites_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_versions(Course)
+
+
+def names_loaded(sender, instance, **kwargs):
+    instance._indexed_names = indexed_names(instance)
+
+
+def names_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Trigram indexes cover a few name fields; rebuilding them in every
+    # process is only worth it when one of those changed.
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS[sender]):
+        return
+    names = indexed_names(instance)
+    if created or names != getattr(instance, '_indexed_names', None):
+        bump_names(sender)
+    instance._indexed_names = names
+
+
+def names_deleted(sender, **kwargs):
+    bump_names(sender)
+
+
+for model in INDEXED_FIELDS:
+    post_init.connect(names_loaded, sender=model)
+    post_save.connect(names_saved, sender=model)
+    post_delete.connect(names_deleted, sender=model)
@@ -0,0 +1,425 @@
+"""
+Synthetic campus data for benchmarks and local development.
+
+``CampusGenerator(scale, seed).generate()`` fills an empty database with a
+plausible university: departments, faculty, programs, courses with
+prerequisites, two semesters of offerings and enrollments, buildings,
+rooms and announcements. Scale 1 is a small campus (300 students); sizes
+grow linearly with ``scale``, so 1x/10x/100x fixtures differ only in
+volume. The same seed always produces the same rows.
+
+Rows are built in memory and written with ``bulk_create`` in dependency
+order, in one transaction; students and their enrollments are built a
+chunk at a time, so memory stays flat up to millions of enrollments.
+``bulk_create`` skips model signals, so catalog cache versions are bumped
+once at the end. Users share one password hash, unusable by default.
+"""
+import math
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .caching import bump_versions
+from .expertise import expertise_rows
+from .models import (
+    AcademicProgram, Announcement, Building, Course, CourseOffering, Department,
+    Enrollment, ExpertiseTerm, Faculty, ProgramCourse, Room, Semester, Student, Transcript
+)
+from .signals import CATALOG_MODELS
+from .trigram import INDEXED_FIELDS, bump_names
+
+BATCH_SIZE = 1000
+STUDENT_CHUNK_SIZE = 5000
+SIZES = ('faculty', 'students', 'courses', 'buildings', 'announcements')
+
+# name, code, location, research areas
+DEPARTMENTS = (
+    ('Computer Science', 'CS', 'MSCX', ('machine learning', 'computer networks', 'cybersecurity', 'databases', 'software engineering')),
+    ('Mathematics', 'MTH', 'MSCX', ('algebra', 'statistics', 'numerical analysis', 'topology')),
+    ('Biology', 'BIO', 'MSCX', ('genetics', 'ecology', 'microbiology', 'marine biology')),
+    ('Chemistry', 'CHM', 'MSCX', ('organic chemistry', 'biochemistry', 'materials science')),
+    ('Physics', 'PHY', 'MSCX', ('astrophysics', 'condensed matter', 'optics')),
+    ('English', 'ENG', 'Smith Hall', ('american literature', 'rhetoric', 'creative writing')),
+    ('History', 'HIS', 'Smith Hall', ('civil war history', 'southern history', 'world history')),
+    ('Psychology', 'PSY', 'Hawkins Hall', ('cognitive psychology', 'child development', 'clinical psychology')),
+    ('Business Administration', 'BUS', 'Bibb Graves Hall', ('marketing', 'supply chain management', 'entrepreneurship')),
+    ('Accounting', 'ACT', 'Bibb Graves Hall', ('auditing', 'taxation', 'forensic accounting')),
+    ('Economics', 'ECO', 'Bibb Graves Hall', ('labor economics', 'econometrics', 'public finance')),
+    ('Nursing', 'NSG', 'Collegiate Hall', ('public health', 'nursing education', 'gerontology')),
+    ('Criminal Justice', 'CJ', 'Wallace Hall', ('criminology', 'forensic science', 'homeland security')),
+    ('Music', 'MUS', 'Long Hall', ('music theory', 'jazz performance', 'music education')),
+    ('Kinesiology', 'KHP', 'Trojan Center', ('exercise physiology', 'sports management', 'athletic training')),
+    ('Political Science', 'POL', 'Wallace Hall', ('international relations', 'public policy', 'comparative politics')),
+)
+SUBJECTS = (
+    'Introduction to', 'Foundations of', 'Principles of', 'Topics in', 'Methods in',
+    'Advanced', 'Applied', 'Seminar in', 'Research in', 'Theory of',
+)
+FIRST_NAMES = (
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William',
+    'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+    'Charles', 'Karen', 'Anil', 'Priya', 'Wei', 'Mei', 'Carlos', 'Maria', 'Ahmed', 'Fatima',
+    'Kwame', 'Amara', 'Hiroshi', 'Yuki', 'Ivan', 'Olga', 'Luca', 'Sofia', 'Shankar', 'Bishal',
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+    'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson',
+    'Martin', 'Lee', 'Thompson', 'White', 'Harris', 'Clark', 'Lewis', 'Walker', 'Hall', 'Young',
+    'Khatiwada', 'Bhattarai', 'Awasthi', 'Nguyen', 'Kim', 'Patel', 'Okafor', 'Tanaka', 'Rossi',
+)
+BUILDING_NAMES = (
+    'Hall', 'Center', 'Building', 'Annex', 'Pavilion', 'Library', 'Complex',
+)
+ROOM_TYPES = ('Classroom', 'Classroom', 'Classroom', 'Lab', 'Office', 'Lecture Hall', 'Seminar Room')
+ROOM_FEATURES = ('Projector', 'Whiteboard', 'Smart board', 'Computers', 'Video conferencing')
+ANNOUNCEMENT_TOPICS = (
+    'Registration opens for', 'Career fair during', 'Library hours change for',
+    'Scholarship deadline for', 'Campus closure during', 'Advising week for',
+)
+PAST_GRADES = ('A', 'A', 'A-', 'B+', 'B', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F', 'W')
+GRADE_POINTS = {'A': 4.0, 'A-': 3.7, 'B+': 3.3, 'B': 3.0, 'B-': 2.7, 'C+': 2.3, 'C': 2.0, 'C-': 1.7, 'D': 1.0, 'F': 0.0}
+SCHEDULES = ('MWF 08:00-08:50', 'MWF 09:00-09:50', 'MWF 10:00-10:50', 'MWF 13:00-13:50',
+             'TR 08:00-09:15', 'TR 09:30-10:45', 'TR 11:00-12:15', 'TR 14:00-15:15')
+
+
+class CampusGenerator:
+    """
+    Per unit of ``scale``: 40 faculty, 300 students, 120 courses and
+    ``courses_per_student`` enrollments per student in each of two
+    semesters. Departments are fixed; buildings grow with the square root
+    of the scale. Any size can be set directly, e.g. ``students=200000``.
+
+    ``progress(model_name, rows_written)`` is called after each write.
+    """
+
+    def __init__(self, scale=1, seed=0, courses_per_student=4, password=None, progress=None, **sizes):
+        unknown = set(sizes) - set(SIZES)
+        if unknown:
+            raise TypeError(f"Unknown sizes: {', '.join(sorted(unknown))}")
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.courses_per_student = courses_per_student
+        # Hashing is deliberately slow; one hash serves every user.
+        self.password = make_password(password)
+        self.progress = progress
+        self.overrides = {name: value for name, value in sizes.items() if value is not None}
+        self.counts = {}
+
+    def sizes(self):
+        scale = self.scale
+        return {
+            'faculty': 40 * scale,
+            'students': 300 * scale,
+            'courses': 120 * scale,
+            'buildings': max(4, round(8 * math.sqrt(scale))),
+            'announcements': 20 * scale,
+            **self.overrides,
+        }
+
+    def generate(self):
+        sizes = self.sizes()
+        with transaction.atomic():
+            departments = self.departments()
+            faculty = self.faculty(departments, sizes['faculty'])
+            programs = self.programs(departments)
+            courses = self.courses(departments, sizes['courses'])
+            self.program_courses(programs, courses)
+            semesters = self.semesters()
+            buildings = self.buildings(sizes['buildings'])
+            offerings = self.offerings(courses, semesters, faculty, buildings)
+            self.students(programs, faculty, offerings, sizes['students'])
+            self.announcements(sizes['announcements'])
+        bump_versions(*CATALOG_MODELS)
+        bump_names(*INDEXED_FIELDS)
+        return self.counts
+
+    def save(self, model, rows):
+        model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        name = model._meta.model_name
+        self.counts[name] = self.counts.get(name, 0) + len(rows)
+        if self.progress is not None:
+            self.progress(name, self.counts[name])
+        return rows
+
+    def person(self, index, domain):
+        first = self.rng.choice(FIRST_NAMES)
+        last = self.rng.choice(LAST_NAMES)
+        return User(
+            username=f'{first}.{last}{index}'.lower(), first_name=first, last_name=last,
+            email=f'{first}.{last}{index}@{domain}'.lower(), password=self.password
+        )
+
+    # Catalog
+
+    def departments(self):
+        return self.save(Department, [
+            Department(
+                name=name, code=code, location=location, contact_email=f'{code.lower()}@troy.edu',
+                description=f'The Department of {name} offers undergraduate and graduate study in '
+                            f'{", ".join(areas[:-1])} and {areas[-1]}.',
+                website=f'https://www.troy.edu/{code.lower()}', established_date=date(1950 + i * 3, 8, 15)
+            )
+            for i, (name, code, location, areas) in enumerate(DEPARTMENTS)
+        ])
+
+    def faculty(self, departments, count):
+        users = self.save(User, [self.person(i, 'troy.edu') for i in range(count)])
+        ranks = [code for code, _ in Faculty.RANK_CHOICES]
+        rows = []
+        for i, user in enumerate(users):
+            department = departments[i % len(departments)]
+            areas = DEPARTMENTS[i % len(departments)][3]
+            interests = self.rng.sample(areas, min(2, len(areas)))
+            rows.append(Faculty(
+                user=user, department=department, rank=self.rng.choice(ranks),
+                office_location=f'{department.location} {100 + i % 300}',
+                office_hours=self.rng.choice(('MW 10:00-12:00', 'TR 13:00-15:00', 'By appointment')),
+                phone=f'334-670-{3000 + i % 7000:04d}',
+                hire_date=date(1990 + i % 34, 1 + i % 12, 1),
+                research_interests=', '.join(interests),
+                bio=f'{user.first_name} {user.last_name} teaches in {department.name} and studies '
+                    f'{interests[0]}.',
+            ))
+        rows = self.save(Faculty, rows)
+        self.save(ExpertiseTerm, expertise_rows(rows))
+        # The first member of each department heads it; small campuses
+        # share faculty across departments.
+        for department, head in zip(departments, rows):
+            department.head_of_department = head
+        Department.objects.bulk_update(departments, ['head_of_department'])
+        return rows
+
+    def programs(self, departments):
+        rows = []
+        for department in departments:
+            rows.append(AcademicProgram(
+                name=department.name, code=f'BS{department.code}', department=department,
+                description=f'Bachelor of Science in {department.name}.', program_type='MAJ',
+                degree='BS', total_credits_required=120, duration_years=4
+            ))
+            rows.append(AcademicProgram(
+                name=f'{department.name} Minor', code=f'MIN{department.code}', department=department,
+                description=f'Minor in {department.name}.', program_type='MIN',
+                total_credits_required=18, duration_years=2
+            ))
+            rows.append(AcademicProgram(
+                name=f'{department.name} (Graduate)', code=f'MS{department.code}', department=department,
+                description=f'Master of Science in {department.name}.', program_type='MAJ',
+                degree='MS', total_credits_required=36, duration_years=2
+            ))
+        return self.save(AcademicProgram, rows)
+
+    def courses(self, departments, count):
+        rows = []
+        levels = [level for level, _ in Course.LEVEL_CHOICES]
+        for i in range(count):
+            department = departments[i % len(departments)]
+            areas = DEPARTMENTS[i % len(departments)][3]
+            # Spread each department's courses over the levels: CS1000,
+            # CS2000, ... CS7000, CS1001, ...; codes stay unique at any size.
+            position = i // len(departments)
+            level = levels[position % len(levels)]
+            number = f'{level // 100}{position // len(levels):03d}'
+            area = areas[position % len(areas)]
+            rows.append(Course(
+                code=f'{department.code}{number}', department=department, level=level,
+                title=f'{self.rng.choice(SUBJECTS)} {area.title()}',
+                description=f'A {level}-level course on {area} in {department.name}.',
+                credits=self.rng.choice((3, 3, 3, 4, 1)), is_core=level == 100,
+                is_active=self.rng.random() > 0.05,
+                learning_outcomes=f'Students will be able to apply {area} concepts.',
+            ))
+        rows = self.save(Course, rows)
+
+        # Upper-level courses require a lower-level course of their department.
+        by_level = {}
+        for course in rows:
+            by_level.setdefault((course.department_id, course.level), []).append(course)
+        through = Course.prerequisites.through
+        links = []
+        for course in rows:
+            lower = [
+                level for level in levels
+                if level < course.level and (course.department_id, level) in by_level
+            ]
+            if lower and self.rng.random() < 0.6:
+                required = self.rng.choice(by_level[course.department_id, self.rng.choice(lower)])
+                links.append(through(from_course_id=course.pk, to_course_id=required.pk))
+        through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+        self.counts['prerequisite'] = len(links)
+        return rows
+
+    def program_courses(self, programs, courses):
+        by_department = {}
+        for course in courses:
+            by_department.setdefault(course.department_id, []).append(course)
+        rows = []
+        for program in programs:
+            graduate = program.degree == 'MS'
+            pool = [
+                course for course in by_department.get(program.department_id, [])
+                if (course.level >= 500) == graduate
+            ]
+            for semester, course in enumerate(self.rng.sample(pool, min(len(pool), 12)), 1):
+                rows.append(ProgramCourse(
+                    program=program, course=course, is_required=semester <= 8,
+                    semester_offered=1 + (semester - 1) % 8
+                ))
+        return self.save(ProgramCourse, rows)
+
+    def semesters(self):
+        return self.save(Semester, [
+            Semester(
+                name='Fall 2024', code='FA24', year=2024, season='FA', start_date=date(2024, 8, 19),
+                end_date=date(2024, 12, 13), registration_start=date(2024, 4, 1),
+                registration_end=date(2024, 8, 23)
+            ),
+            Semester(
+                name='Spring 2025', code='SP25', year=2025, season='SP', start_date=date(2025, 1, 13),
+                end_date=date(2025, 5, 9), registration_start=date(2024, 10, 28),
+                registration_end=date(2025, 1, 17), is_current=True
+            ),
+        ])
+
+    def buildings(self, count):
+        rows = []
+        for i in range(count):
+            last = LAST_NAMES[i % len(LAST_NAMES)]
+            kind = BUILDING_NAMES[(i // len(LAST_NAMES)) % len(BUILDING_NAMES)]
+            rows.append(Building(
+                name=f'{last} {kind}', code=f'{last[:3].upper()}{i}',
+                location=f'{100 + i} University Avenue, Troy, AL',
+                description=f'{last} {kind} houses classrooms, labs and offices.'
+            ))
+        buildings = self.save(Building, rows)
+        rooms = []
+        for building in buildings:
+            for floor in range(1, 4):
+                for number in range(1, 6):
+                    rooms.append(Room(
+                        building=building, room_number=f'{floor}{number:02d}',
+                        capacity=self.rng.choice((20, 30, 40, 60, 120)),
+                        room_type=self.rng.choice(ROOM_TYPES),
+                        features=', '.join(self.rng.sample(ROOM_FEATURES, 2))
+                    ))
+        self.save(Room, rooms)
+        return buildings
+
+    def offerings(self, courses, semesters, faculty, buildings):
+        by_department = {}
+        for member in faculty:
+            by_department.setdefault(member.department_id, []).append(member)
+        rows = []
+        for semester in semesters:
+            for course in courses:
+                if not course.is_active:
+                    continue
+                building = self.rng.choice(buildings)
+                rows.append(CourseOffering(
+                    course=course, semester=semester, section='01',
+                    instructor=self.rng.choice(by_department.get(course.department_id) or faculty),
+                    capacity=self.rng.choice((30, 40, 60, 120)),
+                    classroom=f'{building.code} {self.rng.randint(1, 3)}0{self.rng.randint(1, 5)}',
+                    schedule=self.rng.choice(SCHEDULES)
+                ))
+        return self.save(CourseOffering, rows)
+
+    # People
+
+    def students(self, programs, faculty, offerings, count):
+        """
+        Create students with their transcripts and enrollments:
+        ``courses_per_student`` per semester, graded in past semesters and
+        in progress in the current one. Offerings' enrolled counts follow.
+        """
+        majors = [program for program in programs if program.program_type == 'MAJ']
+        advisors = {}
+        for member in faculty:
+            advisors.setdefault(member.department_id, []).append(member)
+        by_semester = {}
+        for offering in offerings:
+            by_semester.setdefault(offering.semester, []).append(offering)
+        enrolled = {}
+
+        for first in range(0, count, STUDENT_CHUNK_SIZE):
+            numbers = range(first, min(first + STUDENT_CHUNK_SIZE, count))
+            users = self.save(User, [self.person(len(faculty) + i, 'troy.edu') for i in numbers])
+            rows = []
+            plans = []
+            for i, user in zip(numbers, users):
+                plan = self.plan_enrollments(by_semester)
+                graded = [(hours, GRADE_POINTS[grade]) for _, grade, hours, _ in plan if grade in GRADE_POINTS]
+                hours_graded = sum(hours for hours, _ in graded)
+                gpa = sum(hours * points for hours, points in graded) / hours_graded if hours_graded else None
+                program = self.rng.choice(majors)
+                admitted = date(2020 + i % 5, 8, 15)
+                rows.append(Student(
+                    user_id=user.pk, student_id=f'S{i:07d}', current_program_id=program.pk,
+                    date_of_birth=date(1998 + i % 8, 1 + i % 12, 1 + i % 28),
+                    admission_date=admitted,
+                    expected_graduation=admitted.replace(year=admitted.year + program.duration_years),
+                    degree_type='PG' if program.degree == 'MS' else 'UG',
+                    status=self.rng.choices('AGLW', weights=(85, 8, 4, 3))[0],
+                    advisor_id=self.rng.choice(advisors.get(program.department_id) or faculty).pk,
+                    gpa=round(gpa, 2) if gpa is not None else None,
+                ))
+                plans.append(plan)
+            students = self.save(Student, rows)
+
+            self.save(Transcript, [
+                Transcript(
+                    student_id=student.pk, cumulative_gpa=student.gpa or 0.0,
+                    total_credits_attempted=sum(hours for _, _, hours, _ in plan),
+                    total_credits_earned=sum(earned or 0 for _, _, _, earned in plan),
+                )
+                for student, plan in zip(students, plans)
+            ])
+            enrollments = []
+            for student, plan in zip(students, plans):
+                for offering, grade, hours, earned in plan:
+                    enrolled[offering.pk] = enrolled.get(offering.pk, 0) + 1
+                    enrollments.append(Enrollment(
+                        student_id=student.pk, course_offering_id=offering.pk, grade=grade,
+                        status='registered' if grade == 'IP' else 'dropped' if grade == 'W' else 'completed',
+                        credits_attempted=hours, credits_earned=earned
+                    ))
+            self.save(Enrollment, enrollments)
+
+        for offering in offerings:
+            offering.enrolled = enrolled.get(offering.pk, 0)
+            offering.capacity = max(offering.capacity, offering.enrolled)
+        CourseOffering.objects.bulk_update(offerings, ['enrolled', 'capacity'], batch_size=BATCH_SIZE)
+
+    def plan_enrollments(self, by_semester):
+        """``(offering, grade, credits attempted, credits earned)`` for one student."""
+        plan = []
+        for semester, pool in by_semester.items():
+            for offering in self.rng.sample(pool, min(len(pool), self.courses_per_student)):
+                hours = offering.course.credits
+                if semester.is_current:
+                    plan.append((offering, 'IP', hours, None))
+                else:
+                    grade = self.rng.choice(PAST_GRADES)
+                    plan.append((offering, grade, hours, 0 if grade in ('F', 'W') else hours))
+        return plan
+
+    def announcements(self, count):
+        now = datetime(2025, 1, 20, 9, 0, tzinfo=timezone.utc)
+        audiences = ('ALL', 'ALL', 'STU', 'FAC', 'STA')
+        rows = self.save(Announcement, [
+            Announcement(
+                title=f'{self.rng.choice(ANNOUNCEMENT_TOPICS)} Spring 2025 #{i + 1}',
+                content='Details are posted on troy.edu. Contact the Registrar with questions.',
+                is_urgent=self.rng.random() < 0.1, target_audience=self.rng.choice(audiences),
+                expiration_date=now + timedelta(days=30 + i % 60)
+            )
+            for i in range(count)
+        ])
+        # publish_date is auto_now_add; spread it over the last few months.
+        for i, announcement in enumerate(rows):
+            announcement.publish_date = now - timedelta(days=i % 120, hours=i % 24)
+        Announcement.objects.bulk_update(rows, ['publish_date'], batch_size=BATCH_SIZE)
+        return rows
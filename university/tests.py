@@ -1,3 +1,596 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from . import trigram
+from .caching import catalog_version
+from .exports import iter_csv
+from .fastpath import FlatRowSerializer, iter_json_array
+from .models import (
+    AcademicProgram, Announcement, Building, Course, CourseOffering, Department, Enrollment, ExpertiseTerm,
+    Faculty, Semester, Student, Transcript,
+)
+from .views import CourseOfferingViewSet
+
+
+def make_semester(year, season):
+    return Semester.objects.create(
+        name=f'{season} {year}', code=f'{season}{year}', year=year, season=season,
+        start_date=date(year, 1, 10), end_date=date(year, 5, 10),
+        registration_start=date(year, 1, 1), registration_end=date(year, 1, 9),
+    )
+
+
+def make_student(number, program):
+    user = User.objects.create(username=f'student{number}', email=f'student{number}@troy.edu')
+    student = Student.objects.create(
+        user=user, student_id=f'S{number:05d}', date_of_birth=date(2000, 1, 1),
+        admission_date=date(2020, 8, 1), expected_graduation=date(2024, 5, 1),
+        current_program=program, degree_type='UG',
+    )
+    Transcript.objects.create(student=student)
+    return student
+
+
+class CampusTestCase(TestCase):
+    """Two students, one course offered in two sections; the first student is enrolled in section 1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(
+            name='Computer Science', code='CS', location='MSCX', contact_email='cs@troy.edu'
+        )
+        cls.program = AcademicProgram.objects.create(
+            name='Computer Science', code='BSCS', description='', department=cls.department,
+            program_type='MAJ', total_credits_required=120, duration_years=4,
+        )
+        cls.semester = make_semester(2024, 'FA')
+        cls.course = Course.objects.create(
+            code='CS3310', title='Data Structures', description='', department=cls.department, level=300
+        )
+        cls.offerings = [
+            CourseOffering.objects.create(
+                course=cls.course, semester=cls.semester, section=section, capacity=30, schedule='MWF 10:00'
+            )
+            for section in ('1', '2')
+        ]
+        cls.students = [make_student(number, cls.program) for number in (1, 2)]
+        cls.enrollment = Enrollment.objects.create(
+            student=cls.students[0], course_offering=cls.offerings[0], credits_attempted=3
+        )
+        CourseOffering.objects.filter(pk=cls.offerings[0].pk).update(enrolled=1)
+
+    def setUp(self):
+        cache.clear()
+
+
+class BulkWriteTests(CampusTestCase):
+
+    def bulk(self, method, resource, items):
+        return getattr(self.client, method)(f'/{resource}/bulk/', items, content_type='application/json')
+
+    def test_create_reports_invalid_items_and_writes_the_rest(self):
+        offering = self.offerings[1]
+        response = self.bulk('post', 'enrollments', [
+            {'student_id': self.students[1].pk, 'course_offering_id': offering.pk, 'credits_attempted': 3},
+            {'student_id': 999999, 'course_offering_id': offering.pk, 'credits_attempted': 3},
+            {'student_id': self.students[1].pk, 'course_offering_id': offering.pk, 'credits_attempted': 3},
+            'not an object',
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['succeeded'], 1)
+        results = response.data['results']
+        self.assertIn('id', results[0])
+        self.assertIn('student_id', results[1]['errors'])
+        self.assertIn('non_field_errors', results[2]['errors'])
+        self.assertIn('non_field_errors', results[3]['errors'])
+        offering.refresh_from_db()
+        self.assertEqual(offering.enrolled, 1)
+
+    def test_create_students_with_nested_users(self):
+        response = self.bulk('post', 'students', [{
+            'student_id': 'S00003', 'date_of_birth': '2001-02-03', 'admission_date': '2021-08-01',
+            'expected_graduation': '2025-05-01', 'degree_type': 'UG', 'current_program_id': self.program.pk,
+            'user': {'username': 'student3', 'email': 'student3@troy.edu', 'first_name': 'Ada'},
+        }, {
+            'student_id': 'S00004', 'date_of_birth': '2001-02-03', 'admission_date': '2021-08-01',
+            'expected_graduation': '2025-05-01', 'degree_type': 'UG',
+            'user': {'username': 'student1', 'email': 'dup@troy.edu'},
+        }, {
+            'student_id': 'S00005', 'date_of_birth': '2001-02-03', 'admission_date': '2021-08-01',
+            'expected_graduation': '2025-05-01', 'degree_type': 'UG',
+            'user': {'username': 'student5', 'email': 'student5@troy.edu', 'password': 'secret'},
+        }])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['succeeded'], 1)
+        student = Student.objects.get(student_id='S00003')
+        self.assertEqual(student.user.first_name, 'Ada')
+        self.assertFalse(student.user.has_usable_password())
+        results = response.data['results']
+        self.assertIn('username', results[1]['errors']['user'])
+        self.assertEqual(results[2]['errors']['user'], {'password': ['Passwords cannot be set in bulk.']})
+
+    def test_update_coerces_ids(self):
+        response = self.bulk('patch', 'enrollments', [{'id': str(self.enrollment.pk), 'status': 'completed'}])
+
+        self.assertEqual(response.status_code, 200)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.status, 'completed')
+
+    def test_update_rejects_bad_ids_per_item(self):
+        response = self.bulk('patch', 'enrollments', [
+            {'id': [self.enrollment.pk]},
+            {'id': 'abc'},
+            {'id': 999999},
+            {'status': 'completed'},
+            {'id': self.enrollment.pk, 'status': 'dropped'},
+            {'id': self.enrollment.pk, 'status': 'completed'},
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        errors = [result.get('errors') for result in response.data['results']]
+        self.assertEqual(errors[0], {'id': ['A valid integer is required.']})
+        self.assertEqual(errors[1], {'id': ['A valid integer is required.']})
+        self.assertEqual(errors[2], {'id': ['Not found.']})
+        self.assertEqual(errors[3], {'id': ['This field is required.']})
+        self.assertEqual(errors[4], {'id': ['Duplicate id in batch.']})
+        self.assertEqual(errors[5], {'id': ['Duplicate id in batch.']})
+
+    def test_update_moves_enrolled_counts(self):
+        response = self.bulk('patch', 'enrollments', [
+            {'id': self.enrollment.pk, 'course_offering_id': self.offerings[1].pk},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        enrolled = dict(CourseOffering.objects.values_list('pk', 'enrolled'))
+        self.assertEqual(enrolled, {self.offerings[0].pk: 0, self.offerings[1].pk: 1})
+
+    def test_update_recomputes_transcripts(self):
+        response = self.bulk('patch', 'enrollments', [
+            {'id': self.enrollment.pk, 'grade': 'A', 'status': 'completed', 'credits_earned': 3},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        transcript = Transcript.objects.get(student=self.students[0])
+        self.assertEqual(transcript.total_credits_attempted, 3)
+        self.assertEqual(transcript.total_credits_earned, 3)
+
+
+class ShapedResponseTests(CampusTestCase):
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def test_fields_trim_the_output_and_the_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.get('/offerings/', fields='id,section')
+        self.assertEqual([set(result) for result in results], [{'id', 'section'}] * 2)
+        self.assertNotIn('schedule', ' '.join(query['sql'] for query in queries))
+
+    def test_expand_nests_only_the_named_relations(self):
+        results = self.get('/offerings/', expand='course', fields='id,course.code,semester')
+        self.assertEqual(results[0]['course'], {'code': 'CS3310'})
+        self.assertEqual(results[0]['semester'], self.semester.pk)
+
+        offering = self.client.get(f'/offerings/{self.offerings[0].pk}/', {'expand': 'course.department'}).data
+        self.assertEqual(offering['course']['department']['code'], 'CS')
+        self.assertEqual(offering['semester'], self.semester.pk)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        def count(path, **params):
+            with CaptureQueriesContext(connection) as queries:
+                self.get(path, **params)
+            return len(queries)
+
+        before = count('/offerings/', expand='course.department,semester')
+        enrolled = count('/enrollments/', expand='student,course_offering.course')
+        for section in range(3, 9):
+            offering = CourseOffering.objects.create(
+                course=self.course, semester=self.semester, section=str(section), capacity=30, schedule='TR 9:00'
+            )
+            Enrollment.objects.create(student=self.students[1], course_offering=offering, credits_attempted=3)
+        self.assertEqual(count('/offerings/', expand='course.department,semester'), before)
+        self.assertEqual(count('/enrollments/', expand='student,course_offering.course'), enrolled)
+
+
+class FastListTests(CampusTestCase):
+
+    def fetch(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_rows_are_flat_and_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = self.fetch('/enrollments/fast/')
+        self.assertEqual(rows, [{
+            'id': self.enrollment.pk, 'student': self.students[0].pk, 'student_number': 'S00001',
+            'course_offering': self.offerings[0].pk, 'course_code': 'CS3310', 'section': '1',
+            'semester': 'FA2024', 'enrollment_date': self.enrollment.enrollment_date.isoformat(),
+            'grade': None, 'status': 'registered', 'credits_attempted': 3, 'credits_earned': None, 'is_audit': False,
+        }])
+
+    def test_fields_select_columns(self):
+        rows = self.fetch('/offerings/fast/', fields='section, course_code')
+        self.assertEqual(rows, [{'course_code': 'CS3310', 'section': '1'}, {'course_code': 'CS3310', 'section': '2'}])
+        # Unknown names fall back to every column.
+        every = {name for name, _ in CourseOfferingViewSet.fast_columns}
+        self.assertEqual(set(self.fetch('/offerings/fast/', fields='nope')[0]), every)
+
+    def test_chunks_join_into_one_array(self):
+        rows = [{'n': n} for n in range(5)]
+        for chunk_size in (1, 2, 5, 10):
+            self.assertEqual(json.loads(b''.join(iter_json_array(iter(rows), chunk_size))), rows)
+        self.assertEqual(b''.join(iter_json_array(iter([]))), b'[]')
+
+
+class ExportTests(CampusTestCase):
+
+    def export(self, resource, **params):
+        response = self.client.get(f'/{resource}/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        response, body = self.export('students')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="students.csv"')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['student_id'], row['username']) for row in rows], [
+            ('S00001', 'student1'), ('S00002', 'student2'),
+        ])
+
+    def test_jsonl(self):
+        response, body = self.export('enrollments', **{'as': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['student_id'], row['course_code']) for row in rows], [('S00001', 'CS3310')])
+        _, body = self.export('transcripts', **{'as': 'jsonl'})
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/students/export/', {'as': 'xlsx'}).status_code, 400)
+
+    def test_header_streams_before_the_query_and_rows_in_chunks(self):
+        serializer = FlatRowSerializer((('id', 'id'), ('student_id', 'student_id')))
+        chunks = iter_csv(serializer, Student.objects.order_by('pk'), chunk_size=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(next(chunks), 'id,student_id\r\n')
+        self.assertEqual([chunk.split(',')[1] for chunk in chunks], ['S00001\r\n', 'S00002\r\n'])
+
+
+class KeysetPaginationTests(TestCase):
+    """Semesters page on ``('-year', 'season')``: descending, then ascending."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for year in (2021, 2022, 2023):
+            for season in ('FA', 'SP', 'SU'):
+                make_semester(year, season)
+        cls.expected = list(Semester.objects.order_by('-year', 'season').values_list('code', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def codes(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [semester['code'] for semester in response.data['results']]
+
+    def test_forward_then_back(self):
+        pages = []
+        response = self.client.get('/semesters/', {'page_size': 2})
+        while True:
+            pages.append(self.codes(response))
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual([code for page in pages for code in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2, 1])
+
+        backwards = []
+        while response.data['previous'] is not None:
+            response = self.client.get(response.data['previous'])
+            backwards.append(self.codes(response))
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_page_boundary_within_a_year(self):
+        # The first page ends inside 2023, so the next one must continue with
+        # the later seasons of that year before moving on to 2022.
+        first = self.client.get('/semesters/', {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.codes(first), ['FA2023', 'SP2023'])
+        self.assertEqual(self.codes(second), ['SU2023', 'FA2022'])
+
+    def test_pages_seek_instead_of_offset(self):
+        first = self.client.get('/semesters/', {'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.codes(self.client.get(first.data['next']))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/semesters/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(name='Math and Science Complex', code='MSCX', location='Main')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_conditional_get(self):
+        first = self.client.get('/buildings/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            repeat = self.client.get('/buildings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], first['ETag'])
+
+        since = self.client.get('/buildings/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_cached_body_served_without_queries(self):
+        first = self.client.get('/buildings/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/buildings/')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+
+    def test_writes_invalidate(self):
+        first = self.client.get('/buildings/')
+        self.building.name = 'Science Complex'
+        self.building.save()
+
+        response = self.client.get('/buildings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertContains(response, 'Science Complex')
+
+    def test_other_catalogs_unaffected(self):
+        first = self.client.get('/buildings/')
+        Department.objects.create(name='Physics', code='PHYS', location='MSCX', contact_email='p@troy.edu')
+
+        response = self.client.get('/buildings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_strings_are_cached_separately(self):
+        full = self.client.get('/buildings/')
+        trimmed = self.client.get('/buildings/', {'fields': 'code'})
+        self.assertNotEqual(trimmed['ETag'], full['ETag'])
+        self.assertEqual([set(result) for result in trimmed.data['results']], [{'code'}])
+        self.assertEqual(self.client.get('/buildings/', HTTP_IF_NONE_MATCH=full['ETag'] + ', "other"').status_code, 304)
+
+
+class QueryPlanTests(TestCase):
+    """
+    The assistant's hot queries, shaped as ai/views.py builds them, are
+    served from their indexes. Plans are read from the freshly migrated
+    test database, so they depend on the schema alone.
+    """
+    # ``None`` accepts any index on the table.
+    HOT_QUERIES = (
+        ('current semester', 'semester_current_idx',
+         lambda: Semester.objects.filter(is_current=True)[:1]),
+        ('active student count', 'student_status_idx',
+         lambda: Student.objects.filter(status='A').order_by().values('pk')),
+        ('students by status', 'student_status_idx',
+         lambda: Student.objects.select_related('user', 'current_program').filter(status__in=['L', 'W'])),
+        ('courses by level', 'course_level_idx',
+         lambda: Course.objects.select_related('department').filter(level__in=[300])),
+        ('enrollments by grade', 'enrollment_grade_idx',
+         lambda: Enrollment.objects.select_related(
+             'student__user', 'course_offering__course', 'course_offering__semester'
+         ).filter(grade__in=['A', 'A-'])),
+        ('enrollments by status', 'enrollment_status_idx',
+         lambda: Enrollment.objects.filter(status='completed')),
+        ('recent announcements', 'announcement_recent_idx',
+         lambda: Announcement.objects.select_related('author').order_by('-publish_date')[:5]),
+        ('urgent announcements', 'announcement_urgent_idx',
+         lambda: Announcement.objects.select_related('author').filter(is_urgent=True).order_by('-publish_date')[:5]),
+        ('announcements by audience', 'announcement_audience_idx',
+         lambda: Announcement.objects.select_related('author').filter(
+             target_audience__in=['STU']
+         ).order_by('-publish_date')[:5]),
+        ('faculty expertise postings', None,
+         lambda: ExpertiseTerm.objects.filter(term__in=['machin', 'machin learn']).values_list(
+             'term', 'faculty_id', 'weight'
+         )),
+    )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny tables are cheaper to scan; this asks whether an index
+            # *can* serve the query, not whether today's data favours it.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def full_scan(self, plan, table):
+        """Whether ``plan`` reads every row of ``table`` rather than an index."""
+        if connection.vendor == 'postgresql':
+            return re.search(rf'Seq Scan on {table}\b', plan) is not None
+        return re.search(rf'\bSCAN {table}\b(?! USING (?:COVERING )?INDEX)', plan) is not None
+
+    def uses_index(self, plan, table, index):
+        if index is not None:
+            return re.search(rf'\b{index}\b', plan) is not None
+        if connection.vendor == 'postgresql':
+            return re.search(rf'(?:Bitmap Heap|Index|Index Only) Scan (?:using \S+ )?on {table}\b', plan) is not None
+        return re.search(rf'\bSEARCH {table} USING (?:COVERING )?INDEX', plan) is not None
+
+    @skipUnlessDBFeature('supports_explaining_query_execution')
+    def test_hot_queries_use_their_indexes(self):
+        for label, index, build in self.HOT_QUERIES:
+            with self.subTest(label):
+                queryset = build()
+                table = queryset.model._meta.db_table
+                plan = queryset.explain()
+                self.assertTrue(self.uses_index(plan, table, index), plan)
+                self.assertFalse(self.full_scan(plan, table), plan)
+
+    def test_several_current_semesters_are_allowed(self):
+        # The index speeds lookups up; it is not a uniqueness rule.
+        make_semester(2024, 'FA')
+        make_semester(2025, 'SP')
+        Semester.objects.update(is_current=True)
+        self.assertEqual(Semester.objects.filter(is_current=True).count(), 2)
+
+
+class TrigramIndexTests(TestCase):
+    FIELDS = ('first_name', 'last_name', 'username')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = User.objects.create(username='alovelace', first_name='Ada', last_name='Lovelace')
+        cls.alan = User.objects.create(username='aturing', first_name='Alan', last_name='Turing')
+        User.objects.create(username='ghopper', first_name='Grace', last_name='Hopper')
+
+    def setUp(self):
+        cache.clear()
+        trigram.indexes.clear()
+        patcher = mock.patch.object(trigram, 'VERSION_CHECK_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def match(self, text, **kwargs):
+        return [pk for pk, _ in trigram.trigram_index(User, self.FIELDS).match(text, **kwargs)]
+
+    def names_version(self):
+        return catalog_version(User, trigram.NAMES_VERSION_PREFIX)
+
+    def test_substring_hits_match_icontains(self):
+        for text in ('a', 'ur', 'LOVE', 'hop'):
+            with self.subTest(text):
+                expected = User.objects.filter(trigram.substring_q(self.FIELDS, text)).order_by('pk')
+                self.assertEqual(self.match(text), list(expected.values_list('pk', flat=True)))
+
+    def test_fields_are_matched_separately(self):
+        self.assertEqual(self.match('ada lovelace', typos=False), [])
+        self.assertEqual(self.match('a lov', typos=False), [])
+        self.assertEqual(self.match('lovel', typos=False), [self.ada.pk])
+
+    def test_typos(self):
+        self.assertEqual(self.match('Lovelase'), [self.ada.pk])
+        self.assertEqual(self.match('Lovelase', typos=False), [])
+
+    def test_fuzzy_q_filters_through_relations(self):
+        department = Department.objects.create(
+            name='Computer Science', code='CS', location='MSCX', contact_email='cs@troy.edu'
+        )
+        matches = Department.objects.filter(trigram.fuzzy_q(Department, ('name', 'code'), 'Computr Science'))
+        self.assertEqual(list(matches), [department])
+
+    def test_only_name_changes_rebuild(self):
+        self.match('ada')
+        version = self.names_version()
+
+        self.ada.last_login = date(2024, 1, 1)
+        self.ada.save(update_fields=['last_login'])
+        self.ada.email = 'ada@troy.edu'
+        self.ada.save()
+        User.objects.get(pk=self.alan.pk).save()
+        self.assertEqual(self.names_version(), version)
+
+        self.ada.last_name = 'King'
+        self.ada.save()
+        self.assertNotEqual(self.names_version(), version)
+        self.assertEqual(self.match('king'), [self.ada.pk])
+
+    def test_bulk_writes_bump_names_only_when_renaming(self):
+        department = Department.objects.create(
+            name='Computer Science', code='CS', location='MSCX', contact_email='cs@troy.edu'
+        )
+        version = self.names_version()
+        faculty = self.client.post('/faculty/bulk/', [{
+            'rank': 'PROF', 'office_location': 'MSCX 100', 'phone': '555-0100', 'hire_date': '2010-08-01',
+            'department_id': department.pk, 'user': {'username': 'kjohnson', 'email': 'kj@troy.edu'},
+        }], content_type='application/json')
+        self.assertEqual(faculty.status_code, 201, faculty.data)
+        renamed = self.names_version()
+        self.assertNotEqual(renamed, version)
+
+        pk = faculty.data['results'][0]['id']
+        self.client.patch('/faculty/bulk/', [{'id': pk, 'phone': '555-0199'}], content_type='application/json')
+        self.assertEqual(self.names_version(), renamed)
+        self.client.patch(
+            '/faculty/bulk/', [{'id': pk, 'user': {'last_name': 'Johnson'}}], content_type='application/json'
+        )
+        self.assertNotEqual(self.names_version(), renamed)
+        self.assertEqual(len(self.match('johnson', typos=False)), 1)
+
+
+class ExpertiseSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cs = Department.objects.create(name='Computer Science', code='CS', location='MSCX', contact_email='cs@troy.edu')
+        cls.bio = Department.objects.create(name='Biology', code='BIO', location='MSCB', contact_email='bio@troy.edu')
+        cls.ml = cls.make_faculty('ada', cls.cs, 'Machine learning, neural networks', 'Works on optimization.')
+        cls.learning = cls.make_faculty('alan', cls.cs, 'Learning theory; compilers', '')
+        cls.mentioned = cls.make_faculty('grace', cls.cs, 'Databases', 'Once dabbled in machine learning.')
+        cls.genetics = cls.make_faculty('gregor', cls.bio, 'Genetics and heredity', '')
+
+    @classmethod
+    def make_faculty(cls, username, department, interests, bio):
+        return Faculty.objects.create(
+            user=User.objects.create(username=username), department=department, rank='PROF',
+            office_location='MSCX 100', phone='555-0100', hire_date=date(2010, 8, 1),
+            research_interests=interests, bio=bio,
+        )
+
+    def search(self, query, **params):
+        response = self.client.get('/faculty/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [result['id'] for result in response.data['results']]
+
+    def test_phrases_and_interests_rank_first(self):
+        self.assertEqual(self.search('machine learning'), [self.ml.pk, self.mentioned.pk, self.learning.pk])
+
+    def test_stems_and_synonyms(self):
+        self.assertEqual(self.search('neural network')[:1], [self.ml.pk])
+        self.assertIn(self.ml.pk, self.search('artificial intelligence'))
+        self.assertEqual(self.search('genomics'), [self.genetics.pk])
+        self.assertEqual(self.search('who researches'), [])
+
+    def test_filters_apply_before_the_limit(self):
+        self.assertEqual(self.search('learning', department=self.cs.pk, limit=1), [self.learning.pk])
+        self.assertEqual(self.search('learning', department=self.bio.pk), [])
+        self.assertEqual(self.client.get('/faculty/search/').status_code, 400)
+
+    def test_saves_and_rebuilds_keep_postings_current(self):
+        self.genetics.research_interests = 'Marine biology'
+        self.genetics.save()
+        self.assertEqual(self.search('genetics'), [])
+        self.assertEqual(self.search('oceanography'), [self.genetics.pk])
+
+        Faculty.objects.filter(pk=self.genetics.pk).update(research_interests='Genetics')
+        self.assertEqual(self.search('genetics'), [])
+        out = io.StringIO()
+        call_command('rebuild_expertise_index', stdout=out)
+        self.assertIn('postings', out.getvalue())
+        self.assertEqual(self.search('genetics'), [self.genetics.pk])
+
+    def test_search_reads_postings_not_faculty_text(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('machine learning')
+        self.assertFalse(any('research_interests" LIKE' in query['sql'] for query in queries))
@@ -0,0 +1,216 @@
+"""
+Typo-tolerant, case-insensitive matching on names and codes.
+
+``fuzzy_q(model, fields, text)`` is a drop-in for an OR of
+``<field>__icontains`` filters. It matches substrings as before, and with
+``typos=True`` also near misses ("Computr Science", "Jonson").
+
+On PostgreSQL it compiles to ``icontains`` and pg_trgm's ``%>`` (word
+similarity) operator, both served by the GIN trigram indexes created in
+migration 0006. Every substring match qualifies, as with ``icontains``;
+near misses are capped at the ``MAX_MATCHES`` most similar rows.
+
+Other backends use an in-process trigram index per model and field set.
+It holds each row's casefolded values and an inverted index from
+trigram to primary keys. A lookup reads only the postings of the query's
+trigrams and verifies the candidates; no table is scanned. Each field is
+matched on its own, as ``icontains`` would. Substring hits are preferred,
+all of them returned, and typo matches (at most ``MAX_MATCHES``) are used
+only when there are none.
+
+Indexes rebuild lazily when the model's names version moves. Only the
+``INDEXED_FIELDS`` can be indexed, and only saves that change one of them
+bump that version (see ``signals``); a login or an edit to a bio leaves
+every process's index alone. Writes that skip signals call
+``bump_names``.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .caching import bump_versions, catalog_version
+from .models import Building, Course, Department
+
+# pg_trgm's default word_similarity_threshold.
+SIMILARITY_THRESHOLD = 0.6
+MAX_MATCHES = 1000
+# How long a process trusts its indexes before re-reading catalog versions.
+VERSION_CHECK_INTERVAL = 1.0
+
+WORD_RE = re.compile(r'\w+')
+
+# Fields matched through fuzzy_q, per model; on PostgreSQL these are the
+# columns migration 0006 indexes.
+INDEXED_FIELDS = {
+    Department: ('name', 'code'),
+    Course: ('code', 'title'),
+    Building: ('name', 'code'),
+    User: ('first_name', 'last_name', 'username'),
+}
+NAMES_VERSION_PREFIX = 'catalog:version:names:'
+# Stands in for a deferred field, so a save can't prove it left it alone.
+UNLOADED = object()
+
+
+def bump_names(*models):
+    """Mark the indexed fields of ``models`` as changed."""
+    bump_versions(*models, prefix=NAMES_VERSION_PREFIX)
+
+
+def indexed_names(instance):
+    """The instance's values of its model's ``INDEXED_FIELDS``, as loaded or set."""
+    return tuple(instance.__dict__.get(field, UNLOADED) for field in INDEXED_FIELDS[type(instance)])
+
+
+def word_trigrams(word):
+    """pg_trgm's trigrams of one word: padded with two spaces before, one after."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(text):
+    grams = set()
+    for word in WORD_RE.findall(text.casefold()):
+        grams |= word_trigrams(word)
+    return grams
+
+
+def inner_trigrams(text):
+    """Trigrams every string containing ``text`` must have, padding aside."""
+    grams = set()
+    for word in WORD_RE.findall(text.casefold()):
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self, model, fields):
+        if not set(fields) <= set(INDEXED_FIELDS.get(model, ())):
+            raise ValueError(f'{model._meta.label} {", ".join(fields)} are not in INDEXED_FIELDS')
+        self.model = model
+        self.fields = tuple(fields)
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0.0
+        self.values = {}
+        self.postings = {}
+
+    def current(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked < VERSION_CHECK_INTERVAL:
+            return self
+        version = catalog_version(self.model, NAMES_VERSION_PREFIX)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+        self.checked = now
+        return self
+
+    def build(self, version):
+        values = {}
+        postings = {}
+        rows = self.model._default_manager.order_by().values_list('pk', *self.fields)
+        for pk, *fields in rows.iterator(chunk_size=5000):
+            folded = tuple((value or '').casefold() for value in fields)
+            values[pk] = folded
+            for gram in set().union(*(trigrams(value) for value in folded)):
+                postings.setdefault(gram, []).append(pk)
+        self.values, self.postings, self.version = values, postings, version
+
+    def similarity(self, grams, folded):
+        """The best word similarity of the query's ``grams`` to any of ``folded``."""
+        return max((len(grams & trigrams(value)) / len(grams) for value in folded), default=0.0)
+
+    def match(self, text, typos=True, threshold=SIMILARITY_THRESHOLD, limit=MAX_MATCHES):
+        """
+        ``(pk, score)`` pairs, best first. Substring hits score 1 and are
+        never cut; ``limit`` caps typo matches only.
+        """
+        needle = text.strip().casefold()
+        if not needle:
+            return []
+        values, postings = self.values, self.postings
+        inner = inner_trigrams(needle)
+        if inner:
+            counts = Counter()
+            for gram in inner:
+                counts.update(postings.get(gram, ()))
+            candidates = [pk for pk, count in counts.items() if count == len(inner)]
+        else:
+            # Shorter than a trigram: nothing to look up, so check every value.
+            candidates = values
+        hits = [(pk, 1.0) for pk in candidates if any(needle in value for value in values[pk])]
+        if hits or not typos:
+            return sorted(hits)
+
+        grams = trigrams(needle)
+        counts = Counter()
+        for gram in grams:
+            counts.update(postings.get(gram, ()))
+        needed = math.ceil(threshold * len(grams))
+        scored = []
+        for pk, count in counts.items():
+            if count >= needed:
+                score = self.similarity(grams, values[pk])
+                if score >= threshold:
+                    scored.append((pk, round(score, 4)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+indexes = {}
+indexes_lock = threading.Lock()
+
+
+def trigram_index(model, fields):
+    key = (model, tuple(fields))
+    index = indexes.get(key)
+    if index is None:
+        with indexes_lock:
+            index = indexes.setdefault(key, TrigramIndex(model, fields))
+    return index.current()
+
+
+def substring_q(fields, text, prefix=''):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{prefix}{field}__icontains': text})
+    return condition
+
+
+def fuzzy_q(model, fields, text, through='', typos=True):
+    """
+    ``Q`` for rows whose ``through`` relation (``''`` for the queryset's own
+    model) is a ``model`` row with ``text`` in one of ``fields``.
+    """
+    prefix = f'{through}__' if through else ''
+    text = str(text).strip()
+    if connection.vendor == 'postgresql':
+        condition = substring_q(fields, text, prefix)
+        if not typos:
+            return condition
+        similar = Q()
+        for field in fields:
+            # The lookup itself: django.contrib.postgres isn't installed to register it.
+            similar |= Q(TrigramWordSimilar(F(field), text))
+        similarity = [TrigramWordSimilarity(text, field) for field in fields]
+        best = model._default_manager.filter(similar).annotate(
+            trigram_score=Greatest(*similarity) if len(similarity) > 1 else similarity[0]
+        ).order_by('-trigram_score').values('pk')[:MAX_MATCHES]
+        return condition | Q(**{f'{prefix}pk__in': best})
+    matches = trigram_index(model, fields).match(text, typos=typos)
+    if len(matches) > MAX_MATCHES:
+        # Only substring hits come uncapped; icontains finds them without
+        # a primary key list too long to bind.
+        return substring_q(fields, text, prefix)
+    return Q(**{f'{prefix}pk__in': [pk for pk, _ in matches]})
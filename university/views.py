@@ -1,5 +1,6 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.pagination import _positive_int
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from .models import (
@@ -15,28 +16,82 @@ from .serializers import (
     BuildingSerializer, RoomSerializer,
     SimpleDepartmentSerializer, SimpleFacultySerializer,
     SimpleAcademicProgramSerializer, SimpleCourseSerializer,
-    SimpleSemesterSerializer, SimpleStudentSerializer
+    SimpleSemesterSerializer, SimpleStudentSerializer, FacultySearchResultSerializer
 )
+from .bulk import BulkWriteMixin, EnrollmentBulkWriter, FacultyBulkWriter
+from .caching import CatalogCacheMixin
+from .expertise import rank_faculty
+from .exports import ExportMixin
+from .fastpath import FastListMixin
+from .fieldsets import EXPAND_PARAM, plan_queryset, wants_sparse
 
-class UserViewSet(viewsets.ModelViewSet):
+class ShapedQuerysetMixin:
+    """
+    Fetch only what the response serializer renders.
+
+    Joins come from the serializer's nested relations, and ``?fields=`` /
+    ``?expand=`` narrow the selected columns. Custom detail actions that
+    list related objects go through ``paginated_action_response``.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        return plan_queryset(
+            queryset,
+            self.get_serializer(),
+            restrict=wants_sparse(self.request),
+            extra_fields=getattr(self, 'cursor_ordering', ())
+        )
+
+    def use_simple_serializer(self):
+        """Lists use the flat serializers unless the client asks to expand."""
+        return self.action == 'list' and EXPAND_PARAM not in self.request.query_params
+
+    def paginated_action_response(self, queryset, serializer_class, ordering):
+        context = self.get_serializer_context()
+        queryset = plan_queryset(
+            queryset,
+            serializer_class(context=context),
+            restrict=wants_sparse(self.request),
+            extra_fields=ordering
+        )
+        if self.paginator is None:
+            serializer = serializer_class(queryset, many=True, context=context)
+            return Response(serializer.data)
+        page = self.paginator.paginate_queryset(queryset, self.request, view=self, ordering=ordering)
+        serializer = serializer_class(page, many=True, context=context)
+        return self.paginator.get_paginated_response(serializer.data)
+
+class UserViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('id')
     serializer_class = UserSerializer
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Department.objects.all().order_by('name')
     serializer_class = DepartmentSerializer
+    cursor_ordering = ('name',)
+    cache_dependencies = (Department, Faculty, User)
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleDepartmentSerializer
         return DepartmentSerializer
 
-class FacultyViewSet(viewsets.ModelViewSet):
+class FacultyViewSet(BulkWriteMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Faculty.objects.all().order_by('user__last_name', 'user__first_name')
     serializer_class = FacultySerializer
+    cursor_ordering = ('id',)
+    bulk_writer_class = FacultyBulkWriter
+    bulk_user_field = 'user'
+    bulk_fields = (
+        'department', 'rank', 'office_location', 'office_hours', 'phone',
+        'hire_date', 'research_interests', 'bio',
+    )
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleFacultySerializer
         return FacultySerializer
 
@@ -44,18 +99,90 @@ class FacultyViewSet(viewsets.ModelViewSet):
     def advisees(self, request, pk=None):
         faculty = self.get_object()
         advisees = Student.objects.filter(advisor=faculty)
-        serializer = SimpleStudentSerializer(advisees, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(advisees, SimpleStudentSerializer, ('student_id',))
 
-class StudentViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Faculty ranked by research expertise: ``?q=machine learning``, with
+        ``&department=<id>`` and ``&limit=`` (default 20, at most 100).
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'The q parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = _positive_int(request.query_params.get('limit', 20), strict=True, cutoff=100)
+        except ValueError:
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+        faculty = Faculty.objects.select_related('user', 'department')
+        department = request.query_params.get('department')
+        if department:
+            if not department.isdigit():
+                return Response({'error': 'department must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            faculty = faculty.filter(department_id=department)
+        results = rank_faculty(faculty, query, limit=limit)
+        return Response({
+            'query': query,
+            'count': len(results),
+            'results': FacultySearchResultSerializer(results, many=True).data,
+        })
+
+class StudentViewSet(BulkWriteMixin, ExportMixin, FastListMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all().order_by('user__last_name', 'user__first_name')
     serializer_class = StudentSerializer
+    cursor_ordering = ('student_id',)
+    bulk_user_field = 'user'
+    bulk_fields = (
+        'student_id', 'date_of_birth', 'admission_date', 'expected_graduation',
+        'current_program', 'degree_type', 'status', 'advisor',
+    )
+    fast_columns = (
+        ('id', 'id'),
+        ('student_id', 'student_id'),
+        ('first_name', 'user__first_name'),
+        ('last_name', 'user__last_name'),
+        ('email', 'user__email'),
+        ('program', 'current_program__code'),
+        ('degree_type', 'degree_type'),
+        ('status', 'status'),
+        ('advisor', 'advisor_id'),
+        ('gpa', 'gpa'),
+        ('admission_date', 'admission_date'),
+        ('expected_graduation', 'expected_graduation'),
+    )
+    export_filename = 'students'
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student_id'),
+        ('username', 'user__username'),
+        ('first_name', 'user__first_name'),
+        ('last_name', 'user__last_name'),
+        ('email', 'user__email'),
+        ('date_of_birth', 'date_of_birth'),
+        ('program_code', 'current_program__code'),
+        ('program_name', 'current_program__name'),
+        ('degree_type', 'degree_type'),
+        ('status', 'status'),
+        ('gpa', 'gpa'),
+        ('advisor_first_name', 'advisor__user__first_name'),
+        ('advisor_last_name', 'advisor__user__last_name'),
+        ('admission_date', 'admission_date'),
+        ('expected_graduation', 'expected_graduation'),
+    )
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleStudentSerializer
         return StudentSerializer
 
+    @action(detail=False, methods=['get'])
+    def fast(self, request):
+        return self.fast_list_response(request)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        return self.export_response(request)
+
     @action(detail=True, methods=['get'])
     def transcript(self, request, pk=None):
         student = self.get_object()
@@ -67,15 +194,18 @@ class StudentViewSet(viewsets.ModelViewSet):
     def enrollments(self, request, pk=None):
         student = self.get_object()
         enrollments = Enrollment.objects.filter(student=student)
-        serializer = EnrollmentSerializer(enrollments, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(
+            enrollments, EnrollmentSerializer, ('student_id', 'course_offering_id')
+        )
 
-class AcademicProgramViewSet(viewsets.ModelViewSet):
+class AcademicProgramViewSet(CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = AcademicProgram.objects.all().order_by('department', 'name')
     serializer_class = AcademicProgramSerializer
+    cursor_ordering = ('code',)
+    cache_dependencies = (AcademicProgram, Department, Faculty, User)
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleAcademicProgramSerializer
         return AcademicProgramSerializer
 
@@ -83,22 +213,28 @@ class AcademicProgramViewSet(viewsets.ModelViewSet):
     def courses(self, request, pk=None):
         program = self.get_object()
         program_courses = ProgramCourse.objects.filter(program=program)
-        serializer = ProgramCourseSerializer(program_courses, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(
+            program_courses, ProgramCourseSerializer, ('program_id', 'course_id')
+        )
 
     @action(detail=True, methods=['get'])
     def students(self, request, pk=None):
         program = self.get_object()
         students = Student.objects.filter(current_program=program)
-        serializer = SimpleStudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(students, SimpleStudentSerializer, ('student_id',))
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(BulkWriteMixin, CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all().order_by('code')
     serializer_class = CourseSerializer
+    cursor_ordering = ('code',)
+    cache_dependencies = (Course, Department, Faculty, User)
+    bulk_fields = (
+        'code', 'title', 'description', 'department', 'credits', 'level',
+        'is_core', 'is_active', 'learning_outcomes',
+    )
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleCourseSerializer
         return CourseSerializer
 
@@ -106,47 +242,77 @@ class CourseViewSet(viewsets.ModelViewSet):
     def offerings(self, request, pk=None):
         course = self.get_object()
         offerings = CourseOffering.objects.filter(course=course)
-        serializer = CourseOfferingSerializer(offerings, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(
+            offerings, CourseOfferingSerializer, ('course_id', 'semester_id', 'section')
+        )
 
     @action(detail=True, methods=['get'])
     def prerequisites(self, request, pk=None):
         course = self.get_object()
         prerequisites = course.prerequisites.all()
-        serializer = SimpleCourseSerializer(prerequisites, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(prerequisites, SimpleCourseSerializer, ('code',))
 
-class ProgramCourseViewSet(viewsets.ModelViewSet):
+class ProgramCourseViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = ProgramCourse.objects.all()
     serializer_class = ProgramCourseSerializer
+    cursor_ordering = ('program_id', 'course_id')
 
-class SemesterViewSet(viewsets.ModelViewSet):
+class SemesterViewSet(CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Semester.objects.all().order_by('-year', 'season')
     serializer_class = SemesterSerializer
+    cursor_ordering = ('-year', 'season')
+    cache_dependencies = (Semester,)
 
     def get_serializer_class(self):
-        if self.action in ['list']:
+        if self.use_simple_serializer():
             return SimpleSemesterSerializer
         return SemesterSerializer
 
     @action(detail=False, methods=['get'])
     def current(self, request):
+        return self.cached_response(self.current_semester, request)
+
+    def current_semester(self, request):
         current_semester = Semester.objects.filter(is_current=True).first()
         if not current_semester:
             return Response({'detail': 'No current semester set'}, status=status.HTTP_404_NOT_FOUND)
         serializer = self.get_serializer(current_semester)
         return Response(serializer.data)
 
-class CourseOfferingViewSet(viewsets.ModelViewSet):
+class CourseOfferingViewSet(BulkWriteMixin, FastListMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = CourseOffering.objects.all().order_by('course', 'section')
     serializer_class = CourseOfferingSerializer
+    cursor_ordering = ('course_id', 'semester_id', 'section')
+    bulk_fields = (
+        'course', 'semester', 'instructor', 'section', 'capacity',
+        'classroom', 'schedule', 'is_active',
+    )
+    fast_columns = (
+        ('id', 'id'),
+        ('course', 'course_id'),
+        ('course_code', 'course__code'),
+        ('course_title', 'course__title'),
+        ('semester', 'semester__code'),
+        ('section', 'section'),
+        ('instructor', 'instructor_id'),
+        ('capacity', 'capacity'),
+        ('enrolled', 'enrolled'),
+        ('classroom', 'classroom'),
+        ('schedule', 'schedule'),
+        ('is_active', 'is_active'),
+    )
+
+    @action(detail=False, methods=['get'])
+    def fast(self, request):
+        return self.fast_list_response(request)
 
     @action(detail=True, methods=['get'])
     def enrollments(self, request, pk=None):
         offering = self.get_object()
         enrollments = Enrollment.objects.filter(course_offering=offering)
-        serializer = EnrollmentSerializer(enrollments, many=True)
-        return Response(serializer.data)
+        return self.paginated_action_response(
+            enrollments, EnrollmentSerializer, ('student_id', 'course_offering_id')
+        )
 
     @action(detail=True, methods=['post'])
     def enroll(self, request, pk=None):
@@ -177,9 +343,57 @@ class CourseOfferingViewSet(viewsets.ModelViewSet):
         serializer = EnrollmentSerializer(enrollment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(BulkWriteMixin, ExportMixin, FastListMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    cursor_ordering = ('student_id', 'course_offering_id')
+    bulk_writer_class = EnrollmentBulkWriter
+    bulk_fields = (
+        'student', 'course_offering', 'grade', 'status', 'credits_attempted',
+        'credits_earned', 'is_audit',
+    )
+    fast_columns = (
+        ('id', 'id'),
+        ('student', 'student_id'),
+        ('student_number', 'student__student_id'),
+        ('course_offering', 'course_offering_id'),
+        ('course_code', 'course_offering__course__code'),
+        ('section', 'course_offering__section'),
+        ('semester', 'course_offering__semester__code'),
+        ('enrollment_date', 'enrollment_date'),
+        ('grade', 'grade'),
+        ('status', 'status'),
+        ('credits_attempted', 'credits_attempted'),
+        ('credits_earned', 'credits_earned'),
+        ('is_audit', 'is_audit'),
+    )
+    export_filename = 'enrollments'
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student__student_id'),
+        ('student_first_name', 'student__user__first_name'),
+        ('student_last_name', 'student__user__last_name'),
+        ('course_code', 'course_offering__course__code'),
+        ('course_title', 'course_offering__course__title'),
+        ('section', 'course_offering__section'),
+        ('semester', 'course_offering__semester__code'),
+        ('instructor_first_name', 'course_offering__instructor__user__first_name'),
+        ('instructor_last_name', 'course_offering__instructor__user__last_name'),
+        ('enrollment_date', 'enrollment_date'),
+        ('grade', 'grade'),
+        ('status', 'status'),
+        ('credits_attempted', 'credits_attempted'),
+        ('credits_earned', 'credits_earned'),
+        ('is_audit', 'is_audit'),
+    )
+
+    @action(detail=False, methods=['get'])
+    def fast(self, request):
+        return self.fast_list_response(request)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        return self.export_response(request)
 
     @action(detail=True, methods=['patch'])
     def update_grade(self, request, pk=None):
@@ -199,20 +413,44 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(enrollment)
         return Response(serializer.data)
 
-class TranscriptViewSet(mixins.RetrieveModelMixin,
-                      mixins.ListModelMixin,
-                      viewsets.GenericViewSet):
+class TranscriptViewSet(ExportMixin,
+                        ShapedQuerysetMixin,
+                        mixins.RetrieveModelMixin,
+                        mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
     queryset = Transcript.objects.all()
     serializer_class = TranscriptSerializer
+    cursor_ordering = ('student_id',)
+    export_filename = 'transcripts'
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student__student_id'),
+        ('first_name', 'student__user__first_name'),
+        ('last_name', 'student__user__last_name'),
+        ('program_code', 'student__current_program__code'),
+        ('total_credits_attempted', 'total_credits_attempted'),
+        ('total_credits_earned', 'total_credits_earned'),
+        ('cumulative_gpa', 'cumulative_gpa'),
+        ('last_updated', 'last_updated'),
+    )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        return self.export_response(request)
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Announcement.objects.all().order_by('-publish_date')
     serializer_class = AnnouncementSerializer
+    cursor_ordering = ('-publish_date',)
 
-class BuildingViewSet(viewsets.ModelViewSet):
+class BuildingViewSet(CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Building.objects.all().order_by('name')
     serializer_class = BuildingSerializer
+    cursor_ordering = ('code',)
+    cache_dependencies = (Building,)
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(CatalogCacheMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Room.objects.all().order_by('building', 'room_number')
-    serializer_class = RoomSerializer
\ No newline at end of file
+    serializer_class = RoomSerializer
+    cursor_ordering = ('building_id', 'room_number')
+    cache_dependencies = (Room, Building)